@@ -1,3 +0,0 @@
-from philoagents.infrastructure.opik_utils import configure
-
-configure()
@@ -0,0 +1,91 @@
+import asyncio
+from collections import defaultdict, deque
+from typing import Any, AsyncIterator, Sequence
+
+from loguru import logger
+
+from philoagents.application.conversation_service.generate_response import (
+    get_response,
+    get_thread_id,
+)
+from philoagents.application.llm_service.scheduler import Priority, admission_scope
+from philoagents.domain.philosopher_factory import PhilosopherFactory
+
+
+async def get_batch_responses(
+    items: Sequence[dict[str, Any]], max_concurrency: int
+) -> AsyncIterator[dict[str, Any]]:
+    """Run many conversation turns concurrently, yielding each result as it completes.
+
+    Items on the same thread (same session and philosopher, without `new_thread`) are
+    run one after the other, in the order given, so a scripted dialogue sees its own
+    previous turns. Items without a session id use the philosopher's shared thread, as
+    on /chat. The turns are admitted with background priority, after the players'
+    turns.
+
+    Args:
+        items: Turns to run, with "philosopher_id", "messages" and, optionally,
+            "session_id", "new_thread" and a caller-defined "id".
+        max_concurrency: Maximum number of threads answered at once.
+
+    Yields:
+        dict: Result of an item, with its "index" in `items`, its "id", its
+            "philosopher_id", the "session_id" of its thread (None for the shared
+            thread) and either "response" and "game_event", or "error" if the item
+            failed.
+    """
+
+    threads: dict[str, list[int]] = defaultdict(list)
+    for index, item in enumerate(items):
+        thread = (
+            f"{index}"
+            if item.get("new_thread")
+            else get_thread_id(item["philosopher_id"].lower(), item.get("session_id"))
+        )
+        threads[thread].append(index)
+
+    pending = deque(threads.values())
+    results: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+
+    async def run_item(index: int) -> dict[str, Any]:
+        item = items[index]
+        result = {
+            "index": index,
+            "id": item.get("id"),
+            "philosopher_id": item["philosopher_id"],
+            "session_id": item.get("session_id"),
+        }
+        try:
+            philosopher = PhilosopherFactory.get_philosopher(item["philosopher_id"])
+            with admission_scope(priority=Priority.BACKGROUND):
+                response, state = await get_response(
+                    messages=item["messages"],
+                    philosopher_id=philosopher.id,
+                    philosopher_name=philosopher.name,
+                    philosopher_perspective=philosopher.perspective,
+                    philosopher_style=philosopher.style,
+                    new_thread=item.get("new_thread", False),
+                    session_id=item.get("session_id"),
+                )
+        except Exception as e:
+            logger.warning(f"Batch item {index} failed: {e}")
+            return {**result, "error": str(e)}
+
+        return {**result, "response": response, "game_event": state.get("game_event")}
+
+    async def worker() -> None:
+        while pending:
+            for index in pending.popleft():
+                await results.put(await run_item(index))
+
+    workers = [
+        asyncio.create_task(worker()) for _ in range(min(max_concurrency, len(threads)))
+    ]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        # The client may disconnect before the end of the batch.
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -1,17 +1,50 @@
 import uuid
-from typing import Any, AsyncGenerator, Union
-
-from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
-from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
-from opik.integrations.langchain import OpikTracer
+from typing import Any, AsyncGenerator, Awaitable, Callable, Union
+
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    ToolMessage,
+)
 
-from philoagents.application.conversation_service.workflow.graph import (
-    create_workflow_graph,
+from philoagents.application.conversation_service.response_cache import ResponseKey
+from philoagents.application.conversation_service.runtime import (
+    ConversationRuntime,
+    get_conversation_runtime,
 )
+from philoagents.application.conversation_service.workflow.answers import match_answer
 from philoagents.application.conversation_service.workflow.state import PhilosopherState
+from philoagents.application.llm_service.tokens import count_message_tokens
 from philoagents.config import settings
 
 
+def get_thread_id(
+    philosopher_id: str, session_id: str | None = None, new_thread: bool = False
+) -> str:
+    """Build the checkpoint thread id of a conversation.
+
+    Threads are scoped to the player session, so every player has their own small
+    conversation with each character (e.g., "<session_id>:akane").
+
+    Args:
+        philosopher_id: Unique identifier for the philosopher.
+        session_id: Player session identifier. Without it, the thread is shared by
+            everyone talking to the philosopher.
+        new_thread: Whether to create a new conversation thread.
+
+    Returns:
+        str: The thread id used to key the LangGraph checkpoints.
+    """
+
+    thread_id = f"{session_id}:{philosopher_id}" if session_id else philosopher_id
+    if new_thread:
+        thread_id = f"{thread_id}-{uuid.uuid4()}"
+
+    return thread_id
+
+
 async def get_response(
     messages: str | list[str] | list[dict[str, Any]],
     philosopher_id: str,
@@ -19,6 +52,7 @@ async def get_response(
     philosopher_perspective: str,
     philosopher_style: str,
     new_thread: bool = False,
+    session_id: str | None = None,
 ) -> tuple[str, PhilosopherState]:
     """Run a conversation through the workflow graph.
 
@@ -29,6 +63,8 @@ async def get_response(
         philosopher_perspective: Philosopher's perspective on the topic.
         philosopher_style: Style of conversation (e.g., "Socratic").
         philosopher_context: Additional context about the philosopher.
+        new_thread: Whether to create a new conversation thread.
+        session_id: Player session the conversation belongs to.
 
     Returns:
         tuple[str, PhilosopherState]: A tuple containing:
@@ -39,46 +75,75 @@ async def get_response(
         RuntimeError: If there's an error running the conversation workflow.
     """
 
-    graph_builder = create_workflow_graph()
-
     try:
-        async with AsyncMongoDBSaver.from_conn_string(
-            conn_string=settings.MONGO_URI,
-            db_name=settings.MONGO_DB_NAME,
-            checkpoint_collection_name=settings.MONGO_STATE_CHECKPOINT_COLLECTION,
-            writes_collection_name=settings.MONGO_STATE_WRITES_COLLECTION,
-        ) as checkpointer:
-            graph = graph_builder.compile(checkpointer=checkpointer)
-            opik_tracer = OpikTracer(graph=graph.get_graph(xray=True))
-
-            thread_id = (
-                philosopher_id if not new_thread else f"{philosopher_id}-{uuid.uuid4()}"
-            )
-            config = {
-                "configurable": {"thread_id": thread_id},
-                "callbacks": [opik_tracer],
-            }
-            output_state = await graph.ainvoke(
-                input={
-                    "messages": __format_messages(messages=messages),
-                    "philosopher_id": philosopher_id,
-                    "philosopher_name": philosopher_name,
-                    "philosopher_perspective": philosopher_perspective,
-                    "philosopher_style": philosopher_style,
-                },
-                config=config,
+        runtime = await get_conversation_runtime()
+
+        thread_id = get_thread_id(philosopher_id, session_id, new_thread)
+        input_messages = __format_messages(messages=messages)
+        graph_input = {
+            "messages": input_messages,
+            "token_count": count_message_tokens(input_messages),
+            "philosopher_id": philosopher_id,
+            "philosopher_name": philosopher_name,
+            "philosopher_perspective": philosopher_perspective,
+            "philosopher_style": philosopher_style,
+            # Events belong to the turn that triggered them.
+            "game_event": None,
+        }
+        config = {
+            "configurable": {"thread_id": thread_id},
+            "callbacks": runtime.get_callbacks(),
+        }
+        async with runtime.thread_lock(thread_id):
+            cache_key, cached_response = await __lookup_cached_response(
+                runtime, config, graph_input, new_thread
             )
+            opens_thread = False
+            if cached_response is not None:
+                output_state = await __write_cached_response(
+                    runtime, config, graph_input, cached_response
+                )
+            else:
+                output_state = {}
+                async for state in runtime.graph.astream(
+                    input=graph_input,
+                    config=config,
+                    stream_mode="values",
+                ):
+                    # The first state is the thread before the turn, with its input
+                    if not output_state:
+                        opens_thread = __opens_thread(state, graph_input)
+                    output_state = state
+        runtime.schedule_summarization(config, output_state)
+
         last_message = output_state["messages"][-1]
+        if cache_key and cached_response is None:
+            __record_response(
+                runtime,
+                cache_key,
+                opens_thread,
+                __called_tools(output_state["messages"]),
+                last_message.content,
+            )
+
         return last_message.content, PhilosopherState(**output_state)
     except Exception as e:
         raise RuntimeError(f"Error running conversation workflow: {str(e)}") from e
 
 
 class StreamingResponseWithState:
-    """Wrapper for streaming response that also captures the final game_event."""
+    """Wrapper for streaming response that also captures the game_event of the turn.
+
+    Args:
+        on_game_event: Called as soon as a node sets a game event, while the response
+            is still streaming.
+    """
 
-    def __init__(self):
+    def __init__(
+        self, on_game_event: Callable[[str], Awaitable[None]] | None = None
+    ) -> None:
         self.game_event: str | None = None
+        self.on_game_event = on_game_event
 
 
 async def get_streaming_response(
@@ -89,6 +154,7 @@ async def get_streaming_response(
     philosopher_style: str,
     new_thread: bool = False,
     state_holder: StreamingResponseWithState | None = None,
+    session_id: str | None = None,
 ) -> AsyncGenerator[str, None]:
     """Run a conversation through the workflow graph with streaming response.
 
@@ -100,7 +166,8 @@ async def get_streaming_response(
         philosopher_style: Style of conversation (e.g., "Socratic").
         philosopher_context: Additional context about the philosopher.
         new_thread: Whether to create a new conversation thread.
-        state_holder: Optional object to store the final game_event after streaming.
+        state_holder: Optional object notified of the game_event of the turn.
+        session_id: Player session the conversation belongs to.
 
     Yields:
         Chunks of the response as they become available.
@@ -108,47 +175,80 @@ async def get_streaming_response(
     Raises:
         RuntimeError: If there's an error running the conversation workflow.
     """
-    graph_builder = create_workflow_graph()
-
     try:
-        async with AsyncMongoDBSaver.from_conn_string(
-            conn_string=settings.MONGO_URI,
-            db_name=settings.MONGO_DB_NAME,
-            checkpoint_collection_name=settings.MONGO_STATE_CHECKPOINT_COLLECTION,
-            writes_collection_name=settings.MONGO_STATE_WRITES_COLLECTION,
-        ) as checkpointer:
-            graph = graph_builder.compile(checkpointer=checkpointer)
-            opik_tracer = OpikTracer(graph=graph.get_graph(xray=True))
-
-            thread_id = (
-                philosopher_id if not new_thread else f"{philosopher_id}-{uuid.uuid4()}"
+        runtime = await get_conversation_runtime()
+
+        thread_id = get_thread_id(philosopher_id, session_id, new_thread)
+        input_messages = __format_messages(messages=messages)
+        graph_input = {
+            "messages": input_messages,
+            "token_count": count_message_tokens(input_messages),
+            "philosopher_id": philosopher_id,
+            "philosopher_name": philosopher_name,
+            "philosopher_perspective": philosopher_perspective,
+            "philosopher_style": philosopher_style,
+            # Events belong to the turn that triggered them.
+            "game_event": None,
+        }
+        config = {
+            "configurable": {"thread_id": thread_id},
+            "callbacks": runtime.get_callbacks(),
+        }
+
+        async with runtime.thread_lock(thread_id):
+            cache_key, cached_response = await __lookup_cached_response(
+                runtime, config, graph_input, new_thread
             )
-            config = {
-                "configurable": {"thread_id": thread_id},
-                "callbacks": [opik_tracer],
-            }
-
-            async for chunk in graph.astream(
-                input={
-                    "messages": __format_messages(messages=messages),
-                    "philosopher_id": philosopher_id,
-                    "philosopher_name": philosopher_name,
-                    "philosopher_perspective": philosopher_perspective,
-                    "philosopher_style": philosopher_style,
-                },
+            if cached_response is not None:
+                await __write_cached_response(
+                    runtime, config, graph_input, cached_response
+                )
+                yield cached_response
+                return
+
+            chunks = []
+            called_tools = False
+            output_state: dict[str, Any] = {}
+            opens_thread = False
+            async for mode, payload in runtime.graph.astream(
+                input=graph_input,
                 config=config,
-                stream_mode="messages",
+                stream_mode=["messages", "updates", "values"],
             ):
-                if chunk[1]["langgraph_node"] == "conversation_node" and isinstance(
-                    chunk[0], AIMessageChunk
+                if mode == "values":
+                    # State of the thread after each step, in memory
+                    if not output_state:
+                        opens_thread = __opens_thread(payload, graph_input)
+                    output_state = payload
+                    continue
+
+                if mode == "updates":
+                    # Node outputs, e.g. the victory set with the tool call
+                    for update in payload.values():
+                        game_event = (
+                            update.get("game_event")
+                            if isinstance(update, dict)
+                            else None
+                        )
+                        if game_event and state_holder is not None:
+                            state_holder.game_event = game_event
+                            if state_holder.on_game_event is not None:
+                                await state_holder.on_game_event(game_event)
+                    continue
+
+                chunk, metadata = payload
+                if metadata["langgraph_node"] == "conversation_node" and isinstance(
+                    chunk, AIMessageChunk
                 ):
-                    yield chunk[0].content
-
-            # After streaming completes, get the final state for game_event
-            if state_holder is not None:
-                final_state = await graph.aget_state(config)
-                if final_state and final_state.values:
-                    state_holder.game_event = final_state.values.get("game_event")
+                    chunks.append(chunk.content)
+                    called_tools = called_tools or bool(chunk.tool_call_chunks)
+                    yield chunk.content
+        runtime.schedule_summarization(config, output_state)
+
+        if cache_key:
+            __record_response(
+                runtime, cache_key, opens_thread, called_tools, "".join(chunks)
+            )
 
     except Exception as e:
         raise RuntimeError(
@@ -156,6 +256,129 @@ async def get_streaming_response(
         ) from e
 
 
+async def __lookup_cached_response(
+    runtime: ConversationRuntime,
+    config: dict,
+    graph_input: dict[str, Any],
+    new_thread: bool,
+) -> tuple[ResponseKey | None, str | None]:
+    """Look up the cached reply of the turn, if it may open a conversation.
+
+    The thread's history is only read when a reply could be served, so turns that
+    can't hit the cache cost no checkpoint read. Otherwise, whether the turn opened
+    the thread is checked from the state produced by the graph run.
+
+    Args:
+        runtime: The conversation runtime.
+        config: Config of the graph run.
+        graph_input: Input of the graph run.
+        new_thread: Whether the turn starts a new conversation thread.
+
+    Returns:
+        tuple[ResponseKey | None, str | None]: The cache key, or None if the turn
+            can't use the cache, and the cached reply, if any.
+    """
+
+    key = __get_response_cache_key(runtime, graph_input)
+    if key is None:
+        return None, None
+
+    if runtime.response_cache.is_ready(key) and not new_thread:
+        snapshot = await runtime.graph.aget_state(config)
+        if snapshot.values.get("messages") or snapshot.values.get("summary"):
+            runtime.response_cache.record_lookup(opens_thread=False)
+            return None, None
+
+    return key, runtime.response_cache.get(key)
+
+
+def __get_response_cache_key(
+    runtime: ConversationRuntime, graph_input: dict[str, Any]
+) -> ResponseKey | None:
+    """Get the response cache key of the turn's message, or None if it can't be cached."""
+
+    input_messages = graph_input["messages"]
+    if (
+        runtime.response_cache is None
+        or len(input_messages) != 1
+        or not isinstance(input_messages[0], HumanMessage)
+        or not isinstance(input_messages[0].content, str)
+    ):
+        return None
+    if settings.LOCAL_ANSWER_MATCHING and (
+        match_answer(graph_input["philosopher_id"], input_messages[0].content)
+        is not None
+    ):
+        # The reply goes with a game event, which isn't cached.
+        return None
+
+    return runtime.response_cache.make_key(
+        graph_input["philosopher_id"],
+        settings.PROMPT_VERSION,
+        input_messages[0].content,
+    )
+
+
+def __opens_thread(state: dict[str, Any], graph_input: dict[str, Any]) -> bool:
+    """Whether the state at the start of a run holds nothing but the turn's input."""
+
+    return len(state.get("messages", [])) == len(graph_input["messages"]) and not (
+        state.get("summary")
+    )
+
+
+def __record_response(
+    runtime: ConversationRuntime,
+    key: ResponseKey,
+    opens_thread: bool,
+    called_tools: bool,
+    response: str,
+) -> None:
+    """Count a turn that missed the cache, and store its reply if it opened a thread.
+
+    Replies that called a tool go with a game event, so they aren't stored.
+    """
+
+    runtime.response_cache.record_lookup(opens_thread)
+    if opens_thread and not called_tools:
+        runtime.response_cache.put(key, response)
+
+
+def __called_tools(messages: list[BaseMessage]) -> bool:
+    """Whether the model called a tool in the messages of a turn."""
+
+    return any(
+        isinstance(message, ToolMessage) or getattr(message, "tool_calls", None)
+        for message in messages
+    )
+
+
+async def __write_cached_response(
+    runtime: ConversationRuntime,
+    config: dict,
+    graph_input: dict[str, Any],
+    response: str,
+) -> dict[str, Any]:
+    """Write a cached reply into the thread's checkpoint, as if the graph produced it.
+
+    Returns:
+        dict[str, Any]: The state of the thread after the turn.
+    """
+
+    response_message = AIMessage(content=response)
+    state = {
+        **graph_input,
+        "messages": [*graph_input["messages"], response_message],
+        "token_count": graph_input["token_count"]
+        + count_message_tokens(response_message),
+    }
+    await runtime.graph.aupdate_state(
+        {"configurable": config["configurable"]}, state, as_node="connector_node"
+    )
+
+    return state
+
+
 def __format_messages(
     messages: Union[str, list[dict[str, Any]]],
 ) -> list[Union[HumanMessage, AIMessage]]:
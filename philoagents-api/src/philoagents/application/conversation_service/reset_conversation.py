@@ -1,14 +1,33 @@
+import re
+from typing import Callable
+
+from langgraph.checkpoint.memory import InMemorySaver
 from loguru import logger
-from pymongo import MongoClient
 
+from philoagents.application.conversation_service.runtime import (
+    ConversationRuntime,
+    get_conversation_runtime,
+)
 from philoagents.config import settings
+from philoagents.infrastructure.mongo import WriteBehindMongoDBSaver
+
+# Suffix of the threads of conversations started with `new_thread`.
+NEW_THREAD_SUFFIX = re.compile(
+    r"-[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
+)
+DELETE_BATCH_SIZE = 500
 
 
 async def reset_conversation_state() -> dict:
     """Deletes all conversation state data from MongoDB.
 
     This function removes all stored conversation checkpoints and writes,
-    effectively resetting all philosopher conversations.
+    effectively resetting all philosopher conversations. It runs on the shared
+    async client, so it doesn't block the conversations being streamed meanwhile.
+
+    State kept by the worker process is only reset in the worker that handles the
+    call: with several API_WORKERS, the in-memory checkpointer of the others and
+    their write-behind buffers, which may flush the deleted threads back, are kept.
 
     Returns:
         dict: Status message indicating success or failure with details
@@ -18,24 +37,32 @@ async def reset_conversation_state() -> dict:
         Exception: If there's an error connecting to MongoDB or deleting collections
     """
     try:
-        client = MongoClient(settings.MONGO_URI)
-        db = client[settings.MONGO_DB_NAME]
+        runtime = await get_conversation_runtime()
+        if isinstance(runtime.checkpointer, WriteBehindMongoDBSaver):
+            await runtime.checkpointer.adiscard_threads(lambda _: True)
 
-        collections_deleted = []
+        if runtime.client is None:
+            threads = await __delete_memory_threads(runtime, lambda _: True)
+            return {
+                "status": "success",
+                "message": f"Successfully deleted {threads['threads_deleted']} in-memory threads",
+            }
 
-        if settings.MONGO_STATE_CHECKPOINT_COLLECTION in db.list_collection_names():
-            db.drop_collection(settings.MONGO_STATE_CHECKPOINT_COLLECTION)
-            collections_deleted.append(settings.MONGO_STATE_CHECKPOINT_COLLECTION)
-            logger.info(
-                f"Deleted collection: {settings.MONGO_STATE_CHECKPOINT_COLLECTION}"
-            )
+        db = runtime.client[settings.MONGO_DB_NAME]
+        existing_collections = await db.list_collection_names()
 
-        if settings.MONGO_STATE_WRITES_COLLECTION in db.list_collection_names():
-            db.drop_collection(settings.MONGO_STATE_WRITES_COLLECTION)
-            collections_deleted.append(settings.MONGO_STATE_WRITES_COLLECTION)
-            logger.info(f"Deleted collection: {settings.MONGO_STATE_WRITES_COLLECTION}")
+        collections_deleted = []
+        for collection_name in (
+            settings.MONGO_STATE_CHECKPOINT_COLLECTION,
+            settings.MONGO_STATE_WRITES_COLLECTION,
+        ):
+            if collection_name in existing_collections:
+                await db.drop_collection(collection_name)
+                collections_deleted.append(collection_name)
+                logger.info(f"Deleted collection: {collection_name}")
 
-        client.close()
+        # The checkpointer only creates its indexes at startup.
+        await runtime.retention.ensure_indexes()
 
         if collections_deleted:
             return {
@@ -51,3 +78,124 @@ async def reset_conversation_state() -> dict:
     except Exception as e:
         logger.error(f"Failed to reset conversation state: {str(e)}")
         raise Exception(f"Failed to reset conversation state: {str(e)}")
+
+
+async def reset_conversations(
+    session_id: str | None = None, philosopher_id: str | None = None
+) -> dict:
+    """Deletes the conversations of a player, of a character or of both.
+
+    With both ids, only the conversation of the player with the character is deleted
+    (including the ones started with `new_thread`). The other conversations are kept.
+    As with `reset_conversation_state`, state kept by the other worker processes is
+    not reset.
+
+    Args:
+        session_id (str | None): Session id of the player.
+        philosopher_id (str | None): Id of the character.
+
+    Returns:
+        dict: Status message with the number of threads, checkpoints and writes deleted.
+
+    Raises:
+        ValueError: If neither `session_id` nor `philosopher_id` is given.
+        Exception: If there's an error deleting the conversations.
+    """
+
+    if session_id is None and philosopher_id is None:
+        raise ValueError("A session id or a philosopher id is required.")
+
+    def matches(thread_id: str) -> bool:
+        # Thread ids are built by `get_thread_id`: "[session_id:]philosopher_id[-uuid]".
+        thread_session, _, thread_philosopher = NEW_THREAD_SUFFIX.sub(
+            "", thread_id
+        ).rpartition(":")
+        return (session_id is None or thread_session == session_id) and (
+            philosopher_id is None or thread_philosopher == philosopher_id
+        )
+
+    try:
+        runtime = await get_conversation_runtime()
+        if isinstance(runtime.checkpointer, WriteBehindMongoDBSaver):
+            await runtime.checkpointer.adiscard_threads(matches)
+
+        if runtime.client is None:
+            deleted = await __delete_memory_threads(runtime, matches)
+        else:
+            deleted = await __delete_mongo_threads(runtime, session_id, matches)
+
+        logger.info(
+            f"Deleted {deleted['threads_deleted']} conversations "
+            f"(session_id={session_id}, philosopher_id={philosopher_id})"
+        )
+
+        return {"status": "success", **deleted}
+
+    except Exception as e:
+        logger.error(f"Failed to reset conversations: {str(e)}")
+        raise Exception(f"Failed to reset conversations: {str(e)}")
+
+
+async def __delete_mongo_threads(
+    runtime: ConversationRuntime,
+    session_id: str | None,
+    matches: Callable[[str], bool],
+) -> dict:
+    db = runtime.client[settings.MONGO_DB_NAME]
+    checkpoint_collection = db[settings.MONGO_STATE_CHECKPOINT_COLLECTION]
+    writes_collection = db[settings.MONGO_STATE_WRITES_COLLECTION]
+
+    # A player's threads share a prefix, so they are found on the thread_id index
+    # bounds. A character's threads are found with a scan of the index keys only.
+    query = (
+        {"thread_id": {"$regex": f"^{re.escape(session_id)}:"}}
+        if session_id is not None
+        else {}
+    )
+    threads = await checkpoint_collection.aggregate(
+        [{"$match": query}, {"$group": {"_id": "$thread_id"}}]
+    )
+
+    deleted = {"threads_deleted": 0, "checkpoints_deleted": 0, "writes_deleted": 0}
+    batch: list[str] = []
+
+    async def delete_batch() -> None:
+        checkpoints = await checkpoint_collection.delete_many(
+            {"thread_id": {"$in": batch}}
+        )
+        writes = await writes_collection.delete_many({"thread_id": {"$in": batch}})
+        deleted["threads_deleted"] += len(batch)
+        deleted["checkpoints_deleted"] += checkpoints.deleted_count
+        deleted["writes_deleted"] += writes.deleted_count
+        batch.clear()
+
+    async for thread in threads:
+        if matches(thread["_id"]):
+            batch.append(thread["_id"])
+        if len(batch) >= DELETE_BATCH_SIZE:
+            await delete_batch()
+    if batch:
+        await delete_batch()
+
+    return deleted
+
+
+async def __delete_memory_threads(
+    runtime: ConversationRuntime, matches: Callable[[str], bool]
+) -> dict:
+    checkpointer: InMemorySaver = runtime.checkpointer
+    deleted = {"threads_deleted": 0, "checkpoints_deleted": 0, "writes_deleted": 0}
+
+    for thread_id in [t for t in checkpointer.storage if matches(t)]:
+        deleted["threads_deleted"] += 1
+        deleted["checkpoints_deleted"] += sum(
+            len(checkpoints) for checkpoints in checkpointer.storage[thread_id].values()
+        )
+        deleted["writes_deleted"] += sum(
+            len(writes)
+            for key, writes in checkpointer.writes.items()
+            if key[0] == thread_id
+        )
+        await checkpointer.adelete_thread(thread_id)
+
+    return deleted
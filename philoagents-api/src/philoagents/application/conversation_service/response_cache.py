@@ -0,0 +1,130 @@
+import random
+import re
+import time
+from collections import OrderedDict
+
+ResponseKey = tuple[str, str, str]
+
+
+class ResponseCache:
+    """Cache of the replies to the opening message of a conversation.
+
+    Players open almost every conversation with the same greetings, and the
+    in-character introduction doesn't depend on anything but the character. Replies
+    are keyed by (philosopher id, prompt version, normalized message) and are only
+    used for threads without history. Each key holds a pool of up to `variants`
+    replies, so players don't all get the same words: the pool is filled by regular
+    LLM turns, and a random variant is served once it's full.
+
+    Args:
+        max_size (int): Maximum number of keys, evicted in LRU order.
+        ttl_seconds (float): Lifetime of a key, from its first reply.
+        variants (int): Number of replies collected for each key.
+        max_message_chars (int): Longer opening messages are never cached.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        variants: int,
+        max_message_chars: int,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.variants = variants
+        self.max_message_chars = max_message_chars
+        self._entries: OrderedDict[ResponseKey, tuple[float, list[str]]] = OrderedDict()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "not_opening": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def make_key(
+        self, philosopher_id: str, prompt_version: str, message: str
+    ) -> ResponseKey | None:
+        """Build the key of an opening message, or None if it can't be cached."""
+
+        if len(message) > self.max_message_chars:
+            return None
+
+        normalized = " ".join(re.sub(r"[^\w\s]", " ", message.lower()).split())
+        if not normalized:
+            return None
+
+        return (philosopher_id, prompt_version, normalized)
+
+    def is_ready(self, key: ResponseKey) -> bool:
+        """Whether `key` has a full pool of variants, without counting a lookup."""
+
+        entry = self._entries.get(key)
+
+        return (
+            entry is not None
+            and len(entry[1]) >= self.variants
+            and time.monotonic() - entry[0] <= self.ttl_seconds
+        )
+
+    def get(self, key: ResponseKey) -> str | None:
+        """Get a random reply for `key`, once its pool of variants is full.
+
+        Only hits are counted: whether a miss opened a conversation is only known
+        after the turn, so misses are counted with `record_lookup`.
+        """
+
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            self._counters["evictions"] += 1
+            entry = None
+
+        if entry is None or len(entry[1]) < self.variants:
+            return None
+
+        self._entries.move_to_end(key)
+        self._counters["hits"] += 1
+
+        return random.choice(entry[1])
+
+    def record_lookup(self, opens_thread: bool) -> None:
+        """Count a turn that wasn't served from the cache.
+
+        Args:
+            opens_thread: Whether the turn opened its conversation. Turns of ongoing
+                conversations can't use the cache, so they don't count as misses.
+        """
+
+        self._counters["misses" if opens_thread else "not_opening"] += 1
+
+    def put(self, key: ResponseKey, response: str) -> None:
+        """Add a reply to the pool of variants of `key`."""
+
+        if not response:
+            return
+
+        created_at, responses = self._entries.get(key, (time.monotonic(), []))
+        if len(responses) >= self.variants or response in responses:
+            return
+
+        self._entries[key] = (created_at, [*responses, response])
+        self._entries.move_to_end(key)
+        self._counters["stores"] += 1
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters of the opening turns and the size of the cache."""
+
+        lookups = self._counters["hits"] + self._counters["misses"]
+
+        return {
+            **self._counters,
+            "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else None,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+        }
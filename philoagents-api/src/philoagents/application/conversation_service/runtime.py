@@ -0,0 +1,281 @@
+import asyncio
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from langgraph.graph.state import CompiledStateGraph
+from loguru import logger
+from pymongo import AsyncMongoClient
+
+from philoagents.application.conversation_service.response_cache import (
+    ResponseCache,
+)
+from philoagents.application.conversation_service.summarization import (
+    BackgroundSummarizer,
+)
+from philoagents.application.conversation_service.workflow.chains import (
+    warm_up_prompt_cache,
+)
+from philoagents.application.conversation_service.workflow.edges import (
+    should_summarize_conversation,
+)
+from philoagents.application.conversation_service.workflow.graph import (
+    create_workflow_graph,
+)
+from philoagents.application.llm_service.model_factory import (
+    get_chat_model,
+    get_summary_model,
+)
+from philoagents.application.llm_service.tokens import count_tokens
+from philoagents.config import settings
+from philoagents.infrastructure import metrics, opik_utils
+from philoagents.infrastructure.mongo import (
+    CheckpointRetention,
+    WriteBehindMongoDBSaver,
+    close_async_mongo_clients,
+    get_async_mongo_client,
+)
+
+
+class ConversationRuntime:
+    """Process-wide resources shared by every conversation turn.
+
+    Opening a Mongo connection pool, compiling the LangGraph workflow and rendering
+    the graph for Opik are expensive, so they are done once per process and reused
+    by every `/chat` and `/ws/chat` turn.
+
+    Args:
+        client (AsyncMongoClient | None): Shared async MongoDB client (and connection
+            pool), or None with the in-memory checkpointer.
+        checkpointer (BaseCheckpointSaver): LangGraph checkpointer, backed by `client`
+            unless CHECKPOINTER_BACKEND is "memory".
+        graph (CompiledStateGraph): Workflow graph compiled with `checkpointer`.
+        summarizer (BackgroundSummarizer | None): Background summarization jobs, if
+            summarization runs off the critical path.
+        response_cache (ResponseCache | None): Cache of the replies to opening messages.
+        retention (CheckpointRetention | None): Pruning of the state collections, or
+            None with the in-memory checkpointer.
+
+    Attributes:
+        client (AsyncMongoClient | None): Shared async MongoDB client.
+        checkpointer (BaseCheckpointSaver): Shared LangGraph checkpointer.
+        graph (CompiledStateGraph): Shared compiled workflow graph.
+        summarizer (BackgroundSummarizer | None): Background summarization jobs.
+        response_cache (ResponseCache | None): Cache of the replies to opening messages.
+        retention (CheckpointRetention | None): Pruning of the state collections.
+        graph_definition (dict): Mermaid rendering of the graph, attached to every Opik trace.
+        tracer_metadata (dict): Metadata of the Opik traces, including the graph.
+    """
+
+    def __init__(
+        self,
+        client: AsyncMongoClient | None,
+        checkpointer: BaseCheckpointSaver,
+        graph: CompiledStateGraph,
+        summarizer: BackgroundSummarizer | None = None,
+        response_cache: ResponseCache | None = None,
+        retention: CheckpointRetention | None = None,
+    ) -> None:
+        self.client = client
+        self.checkpointer = checkpointer
+        self.graph = graph
+        self.summarizer = summarizer
+        self.response_cache = response_cache
+        self.retention = retention
+        self.graph_definition = {
+            "format": "mermaid",
+            "data": graph.get_graph(xray=True).draw_mermaid(),
+        }
+        # Shared by the tracers of all the turns, which are created only when sampled.
+        self.tracer_metadata = {"_opik_graph_definition": self.graph_definition}
+
+    @classmethod
+    async def create(cls) -> "ConversationRuntime":
+        """Open the Mongo pool, prepare the checkpointer and compile the graph.
+
+        Returns:
+            ConversationRuntime: A ready-to-use runtime.
+        """
+
+        if settings.CHECKPOINTER_BACKEND == "memory":
+            client = None
+            checkpointer = InMemorySaver()
+            retention = None
+        else:
+            client = get_async_mongo_client(settings.MONGO_URI)
+            mongo_collections = {
+                "db_name": settings.MONGO_DB_NAME,
+                "checkpoint_collection_name": settings.MONGO_STATE_CHECKPOINT_COLLECTION,
+                "writes_collection_name": settings.MONGO_STATE_WRITES_COLLECTION,
+            }
+            retention = CheckpointRetention(
+                client,
+                **mongo_collections,
+                keep_last=settings.CHECKPOINT_KEEP_LAST,
+                ttl_seconds=settings.CHECKPOINT_TTL_SECONDS,
+                interval_seconds=settings.CHECKPOINT_RETENTION_INTERVAL_SECONDS,
+                batch_size=settings.CHECKPOINT_RETENTION_BATCH_SIZE,
+            )
+            if settings.CHECKPOINT_WRITE_BEHIND:
+                checkpointer = WriteBehindMongoDBSaver(
+                    client,
+                    **mongo_collections,
+                    ttl=settings.CHECKPOINT_TTL_SECONDS,
+                    flush_interval_ms=settings.CHECKPOINT_FLUSH_INTERVAL_MS,
+                    max_pending_ops=settings.CHECKPOINT_FLUSH_MAX_OPS,
+                    max_buffered_threads=settings.CHECKPOINT_BUFFER_MAX_THREADS,
+                )
+            else:
+                checkpointer = AsyncMongoDBSaver(
+                    client, **mongo_collections, ttl=settings.CHECKPOINT_TTL_SECONDS
+                )
+            try:
+                await checkpointer._setup()
+                await retention.ensure_indexes()
+            except Exception:
+                await close_async_mongo_clients()
+                raise
+            if isinstance(checkpointer, WriteBehindMongoDBSaver):
+                checkpointer.start()
+            if settings.CHECKPOINT_RETENTION_ENABLED:
+                retention.start()
+
+        graph = create_workflow_graph(
+            summarize_in_background=settings.SUMMARIZE_IN_BACKGROUND,
+            match_answers=settings.LOCAL_ANSWER_MATCHING,
+        ).compile(checkpointer=checkpointer)
+        summarizer = (
+            BackgroundSummarizer(
+                graph, max_concurrency=settings.SUMMARIZATION_MAX_CONCURRENCY
+            )
+            if settings.SUMMARIZE_IN_BACKGROUND
+            else None
+        )
+        response_cache = (
+            ResponseCache(
+                max_size=settings.RESPONSE_CACHE_MAX_SIZE,
+                ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+                variants=settings.RESPONSE_CACHE_VARIANTS,
+                max_message_chars=settings.RESPONSE_CACHE_MAX_MESSAGE_CHARS,
+            )
+            if settings.RESPONSE_CACHE_ENABLED
+            else None
+        )
+        warm_up_prompt_cache()
+        count_tokens("")  # Load the tokenizer before the first turn
+        try:
+            get_chat_model()
+            get_summary_model()
+        except ValueError as e:
+            logger.warning(f"Chat models not warmed up: {e}")
+        logger.info("Conversation runtime started.")
+
+        return cls(
+            client=client,
+            checkpointer=checkpointer,
+            graph=graph,
+            summarizer=summarizer,
+            response_cache=response_cache,
+            retention=retention,
+        )
+
+    def thread_lock(self, thread_id: str) -> AsyncContextManager:
+        """Serialize the turns of a thread with its background summaries, if any."""
+
+        if self.summarizer is None:
+            return nullcontext()
+
+        return self.summarizer.thread_lock(thread_id)
+
+    def schedule_summarization(self, config: dict, state: dict[str, Any]) -> None:
+        """Queue the compaction of a thread after its turn, if summarizing in background.
+
+        Args:
+            config: Config of the turn's graph run.
+            state: State of the thread after the turn. Threads under the context
+                budget aren't queued, so they cost no checkpoint read.
+        """
+
+        if (
+            self.summarizer is not None
+            and should_summarize_conversation(state) == "summarize_conversation_node"
+        ):
+            self.summarizer.schedule(config)
+
+    def get_callbacks(self) -> list[Any]:
+        """Build the per-turn callbacks, reusing the precomputed graph definition.
+
+        An Opik tracer is added only to the turns sampled for tracing (see
+        `opik_utils.get_sample_rate`).
+
+        Returns:
+            list: LangChain callback handlers for a single graph run.
+        """
+
+        opik_tracer = opik_utils.create_tracer(metadata=self.tracer_metadata)
+
+        callbacks = [opik_tracer] if opik_tracer is not None else []
+        if settings.METRICS_ENABLED:
+            callbacks.append(metrics.get_callback_handler())
+
+        return callbacks
+
+    async def close(self) -> None:
+        """Wait for the background summaries, flush the buffered checkpoints and
+        release the Mongo connection pool."""
+
+        if self.summarizer is not None:
+            await self.summarizer.close()
+        if self.retention is not None:
+            await self.retention.close()
+        if isinstance(self.checkpointer, WriteBehindMongoDBSaver):
+            await self.checkpointer.aclose()
+        if self.client is not None:
+            await close_async_mongo_clients()
+        logger.info("Conversation runtime closed.")
+
+
+_runtime: ConversationRuntime | None = None
+_runtime_lock = asyncio.Lock()
+
+
+async def start_conversation_runtime() -> ConversationRuntime:
+    """Create the process-wide runtime if it doesn't exist yet.
+
+    Returns:
+        ConversationRuntime: The process-wide runtime.
+    """
+
+    global _runtime
+
+    async with _runtime_lock:
+        if _runtime is None:
+            _runtime = await ConversationRuntime.create()
+
+    return _runtime
+
+
+async def get_conversation_runtime() -> ConversationRuntime:
+    """Return the process-wide runtime, starting it lazily (e.g., from CLI tools).
+
+    Returns:
+        ConversationRuntime: The process-wide runtime.
+    """
+
+    if _runtime is not None:
+        return _runtime
+
+    return await start_conversation_runtime()
+
+
+async def close_conversation_runtime() -> None:
+    """Close the process-wide runtime, if it was started."""
+
+    global _runtime
+
+    async with _runtime_lock:
+        if _runtime is not None:
+            await _runtime.close()
+            _runtime = None
@@ -0,0 +1,143 @@
+import asyncio
+import time
+import weakref
+from collections import deque
+
+from langchain_core.messages import RemoveMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph.state import CompiledStateGraph
+from loguru import logger
+
+from philoagents.application.conversation_service.workflow.edges import (
+    should_summarize_conversation,
+)
+from philoagents.application.conversation_service.workflow.nodes import (
+    summarize_conversation_node,
+)
+from philoagents.application.llm_service.scheduler import Priority, admission_scope
+from philoagents.application.llm_service.tokens import count_message_tokens
+from philoagents.infrastructure.metrics import NODE_DURATION, SUMMARIES
+
+
+class BackgroundSummarizer:
+    """Compacts conversation threads off the player's critical path.
+
+    After a turn finishes, a job is queued for its thread. The job summarizes the
+    thread (when it needs it) and applies the result with `aupdate_state`. Turns and
+    jobs on the same thread are serialized by a per-thread lock, and only messages
+    that still exist are removed, so the job is safe if the player sends the next
+    message before it completes.
+
+    Args:
+        graph (CompiledStateGraph): Compiled workflow graph with a checkpointer.
+        max_concurrency (int): Maximum number of summaries generated at once.
+    """
+
+    def __init__(self, graph: CompiledStateGraph, max_concurrency: int) -> None:
+        self.graph = graph
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._thread_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+        self._jobs: dict[str, asyncio.Task] = {}
+        self._latencies_ms: deque[float] = deque(maxlen=1000)
+        self._counters = {
+            "scheduled": 0,
+            "coalesced": 0,
+            "summarized": 0,
+            "failed": 0,
+        }
+
+    def thread_lock(self, thread_id: str) -> asyncio.Lock:
+        """Get the lock serializing turns and summaries of a thread."""
+
+        lock = self._thread_locks.get(thread_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._thread_locks[thread_id] = lock
+
+        return lock
+
+    def schedule(self, config: RunnableConfig) -> None:
+        """Queue a summarization job for the thread of `config`.
+
+        Jobs are coalesced: while one is pending for a thread, new requests are no-ops.
+        """
+
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id in self._jobs:
+            self._counters["coalesced"] += 1
+            return
+
+        self._counters["scheduled"] += 1
+        task = asyncio.create_task(self._summarize(thread_id))
+        self._jobs[thread_id] = task
+        task.add_done_callback(lambda _: self._jobs.pop(thread_id, None))
+
+    async def _summarize(self, thread_id: str) -> None:
+        config = {"configurable": {"thread_id": thread_id}}
+
+        try:
+            async with self._semaphore:
+                snapshot = await self.graph.aget_state(config)
+                state = snapshot.values
+                if (
+                    not state
+                    or should_summarize_conversation(state)
+                    != "summarize_conversation_node"
+                ):
+                    return
+
+                start = time.perf_counter()
+                with admission_scope(priority=Priority.BACKGROUND):
+                    update = await summarize_conversation_node(state)
+                duration = time.perf_counter() - start
+                self._latencies_ms.append(duration * 1000)
+                NODE_DURATION.observe(duration, node="summarize_conversation_node")
+                SUMMARIES.inc(mode="background")
+
+            async with self.thread_lock(thread_id):
+                # The thread may have changed meanwhile, so only remove what's left.
+                snapshot = await self.graph.aget_state(config)
+                removed_ids = {m.id for m in update["messages"]}
+                removed = [
+                    m
+                    for m in snapshot.values.get("messages", [])
+                    if m.id in removed_ids
+                ]
+                update["messages"] = [RemoveMessage(id=m.id) for m in removed]
+                update["token_count"] = -count_message_tokens(removed)
+                await self.graph.aupdate_state(
+                    config, update, as_node="summarize_conversation_node"
+                )
+            self._counters["summarized"] += 1
+        except Exception as e:
+            self._counters["failed"] += 1
+            logger.warning(f"Background summarization of '{thread_id}' failed: {e}")
+
+    def get_stats(self) -> dict:
+        """Summarization counters and the latency taken off the players' turns."""
+
+        latencies = sorted(self._latencies_ms)
+
+        def percentile(p: float) -> float | None:
+            if not latencies:
+                return None
+            return round(latencies[int(p * (len(latencies) - 1))], 1)
+
+        return {
+            **self._counters,
+            "pending": len(self._jobs),
+            "latency_removed_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": percentile(1.0),
+            },
+        }
+
+    async def close(self) -> None:
+        """Wait for the pending jobs to complete."""
+
+        if self._jobs:
+            await asyncio.gather(*self._jobs.values(), return_exceptions=True)
@@ -1,4 +1,8 @@
-from .chains import get_philosopher_response_chain, get_conversation_summary_chain
+from .chains import (
+    get_conversation_summary_chain,
+    get_philosopher_response_chain,
+    warm_up_prompt_cache,
+)
 from .graph import create_workflow_graph
 from .state import PhilosopherState
 
@@ -7,4 +11,5 @@ __all__ = [
     "get_philosopher_response_chain",
     "get_conversation_summary_chain",
     "create_workflow_graph",
+    "warm_up_prompt_cache",
 ]
@@ -0,0 +1,100 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+
+from langchain_core.prompts import PromptTemplate
+
+from philoagents.domain.philosopher_factory import (
+    PHILOSOPHER_RIDDLES,
+    VICTORY_NAME,
+    VICTORY_PHILOSOPHER,
+)
+from philoagents.domain.prompts import RIDDLE_SOLVED_HINT, VICTORY_HINT
+
+# Words that may surround an answer ("Forse è un'ancora!") without changing it.
+FILLER_WORDS = frozenset(
+    (
+        "A ALLORA AN BEH CHE CREDO DIREI E EHM FORSE GLI I IL IS IT L LA LE LO MA MMM "
+        "OK PENSO RISPOSTA SARA SEI SI SOLUZIONE THE TU UN UNA UNO"
+    ).split()
+)
+
+# Words that may also surround the victory name ("Il rapitore è Bobby!").
+VICTORY_FILLER_WORDS = FILLER_WORDS | frozenset(
+    "CHIAMA COLPEVOLE KIDNAPPER NAME NOME RAPITORE STATO WAS".split()
+)
+
+
+@dataclass(frozen=True)
+class AnswerMatch:
+    """A game rule matched locally on the player's message.
+
+    Attributes:
+        game_event (str): Event sent to the game ("riddle_solved" or "victory").
+        hint (str): Instructions for the model, appended to the system prompt.
+    """
+
+    game_event: str
+    hint: str
+
+
+def match_answer(philosopher_id: str, message: str) -> AnswerMatch | None:
+    """Match the player's message against the riddle or the victory name of a character.
+
+    A riddle is solved, or the kidnapper's name is given to the guide, only when the
+    message is the answer, possibly with filler words ("È una bara?", "Il rapitore è
+    Bobby!"). The name may also be spelled out ("B-O-B-B-Y"). Messages that only
+    mention the answer ("Non è Bobby?", "Bobby? Non lo so") are left to the model.
+
+    Args:
+        philosopher_id: Id of the character the player talks to.
+        message: The player's message.
+
+    Returns:
+        AnswerMatch | None: The matched rule, or None if no rule applies.
+    """
+
+    words = __normalize(message)
+
+    if philosopher_id == VICTORY_PHILOSOPHER:
+        answer = [word for word in words if word not in VICTORY_FILLER_WORDS]
+        if answer == [VICTORY_NAME] or "".join(answer) == VICTORY_NAME:
+            return AnswerMatch(game_event="victory", hint=__victory_hint())
+        return None
+
+    riddle = PHILOSOPHER_RIDDLES.get(philosopher_id)
+    if riddle is None:
+        return None
+
+    answer = " ".join(word for word in words if word not in FILLER_WORDS)
+    if answer in riddle["answers"]:
+        return AnswerMatch(
+            game_event="riddle_solved",
+            hint=__riddle_solved_hint(answer, riddle["letter"]),
+        )
+
+    return None
+
+
+def __normalize(message: str) -> list[str]:
+    """Split a message into upper-case words, without accents and punctuation."""
+
+    ascii_message = (
+        unicodedata.normalize("NFKD", message).encode("ascii", "ignore").decode()
+    )
+    return re.findall(r"[A-Z]+", ascii_message.upper())
+
+
+@lru_cache(maxsize=32)
+def __riddle_solved_hint(answer: str, letter: str) -> str:
+    return PromptTemplate.from_template(
+        RIDDLE_SOLVED_HINT.prompt, template_format="jinja2"
+    ).format(answer=answer, letter=letter)
+
+
+@lru_cache(maxsize=1)
+def __victory_hint() -> str:
+    return PromptTemplate.from_template(
+        VICTORY_HINT.prompt, template_format="jinja2"
+    ).format(victory_name=VICTORY_NAME)
@@ -1,54 +1,232 @@
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from functools import lru_cache
+
+from langchain_core.prompts import (
+    ChatPromptTemplate,
+    MessagesPlaceholder,
+    PromptTemplate,
+    SystemMessagePromptTemplate,
+)
+from loguru import logger
 
 from philoagents.application.conversation_service.workflow.tools import victory_tools
 from philoagents.application.llm_service.model_factory import (
     get_chat_model,
+    get_configured_providers,
     get_summary_model,
 )
+from philoagents.config import settings
+from philoagents.domain.philosopher_factory import PHILOSOPHER_NAMES, PhilosopherFactory
 from philoagents.domain.prompts import (
     EXTEND_SUMMARY_PROMPT,
     PHILOSOPHER_CHARACTER_CARD,
     SUMMARY_PROMPT,
 )
 
+__SUMMARY_SENTINEL = "\x00summary\x00"
+# Separator of the sections of the character card.
+__SECTION_SEPARATOR = "\n---\n"
+
 
-def get_philosopher_response_chain(philosopher_id: str = ""):
+def get_philosopher_response_chain(
+    philosopher_id: str = "",
+    philosopher_name: str = "",
+    philosopher_perspective: str = "",
+    philosopher_style: str = "",
+    with_tools: bool = True,
+    with_hint: bool = False,
+):
     """Create the main philosopher response chain with tool calling.
 
     Args:
         philosopher_id: The ID of the philosopher. If "nicolo", victory tools are included.
+        philosopher_name: The name of the philosopher.
+        philosopher_perspective: The perspective of the philosopher.
+        philosopher_style: The style of the philosopher.
+        with_tools: Whether to bind the victory tools, if the philosopher has them.
+        with_hint: Whether the prompt expects an `answer_hint` variable.
     """
-    model = get_chat_model()
-
     # Nicolò gets access to the victory tool
-    if philosopher_id == "nicolo":
-        model = model.bind_tools(victory_tools)
+    tools = victory_tools if with_tools and philosopher_id == "nicolo" else ()
+    model = get_chat_model(tools=tools)
+
+    prompt = get_philosopher_prompt(
+        philosopher_name,
+        philosopher_perspective,
+        philosopher_style,
+        with_hint=with_hint,
+        **get_prompt_cache_options(),
+    )
 
-    system_message = PHILOSOPHER_CHARACTER_CARD
+    return prompt | model
+
+
+@lru_cache(maxsize=64)
+def get_philosopher_prompt(
+    philosopher_name: str,
+    philosopher_perspective: str,
+    philosopher_style: str,
+    *,
+    with_hint: bool = False,
+    cache_layout: bool = False,
+    cache_control: bool = False,
+) -> ChatPromptTemplate:
+    """Pre-render the character card of a philosopher.
 
-    prompt = ChatPromptTemplate.from_messages(
+    The jinja2 character card is rendered once with the character-specific fields,
+    leaving only `summary` to be filled in on every turn through a cheap f-string
+    substitution.
+
+    With `cache_layout`, the section of the card holding the summary is moved to the
+    end of the system message, so the start of the prompt only changes with the
+    character and providers can reuse it from their prompt cache.
+
+    Args:
+        philosopher_name: The name of the philosopher.
+        philosopher_perspective: The perspective of the philosopher.
+        philosopher_style: The style of the philosopher.
+        with_hint: Whether to end the system message with the `answer_hint` variable.
+        cache_layout: Whether to put the static part of the card first.
+        cache_control: Whether to mark the static part with Anthropic's
+            `cache_control`, splitting the system message into content blocks.
+
+    Returns:
+        ChatPromptTemplate: Prompt expecting the `summary` and `messages` variables,
+            and `answer_hint` if `with_hint`.
+    """
+    rendered = PromptTemplate.from_template(
+        PHILOSOPHER_CHARACTER_CARD.prompt, template_format="jinja2"
+    ).format(
+        philosopher_name=philosopher_name,
+        philosopher_perspective=philosopher_perspective,
+        philosopher_style=philosopher_style,
+        summary=__SUMMARY_SENTINEL,
+    )
+    hint = "\n\n{answer_hint}" if with_hint else ""
+
+    if cache_layout and rendered.count(__SUMMARY_SENTINEL) == 1:
+        static, volatile = __split_summary_section(rendered)
+        volatile = __escape(volatile).replace(__SUMMARY_SENTINEL, "{summary}") + hint
+        if cache_control:
+            system_message = SystemMessagePromptTemplate.from_template(
+                [
+                    {
+                        "type": "text",
+                        "text": __escape(static),
+                        "cache_control": {"type": "ephemeral"},
+                    },
+                    {"type": "text", "text": volatile},
+                ]
+            )
+        else:
+            system_message = ("system", f"{__escape(static)}\n\n{volatile}")
+    else:
+        if cache_layout:
+            logger.warning(
+                "The character card must contain the summary exactly once for the "
+                "cache layout: using the default layout."
+            )
+        system_message = (
+            "system",
+            "{summary}".join(
+                __escape(part) for part in rendered.split(__SUMMARY_SENTINEL)
+            )
+            + hint,
+        )
+
+    return ChatPromptTemplate.from_messages(
         [
-            ("system", system_message.prompt),
+            system_message,
             MessagesPlaceholder(variable_name="messages"),
         ],
-        template_format="jinja2",
+        template_format="f-string",
     )
 
-    return prompt | model
+
+def __escape(text: str) -> str:
+    """Escape a rendered text for use in an f-string template."""
+
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def __split_summary_section(rendered: str) -> tuple[str, str]:
+    """Split a rendered card into its static text and the section with the summary.
+
+    The section is delimited by the separators ("---") around the summary or, if the
+    card has none, by the paragraph of the summary.
+
+    Returns:
+        tuple[str, str]: The card without the section, and the section.
+    """
+
+    before, after = rendered.split(__SUMMARY_SENTINEL)
+    start = before.rfind(__SECTION_SEPARATOR)
+    end = after.find(__SECTION_SEPARATOR)
+    if start == -1:
+        start = before.rfind("\n\n")
+    if end == -1:
+        end = after.find("\n\n")
+    start = max(start, 0)
+    end = len(after) if end == -1 else end
+
+    static = (before[:start] + after[end:]).strip()
+    volatile = (before[start:] + __SUMMARY_SENTINEL + after[:end]).strip()
+
+    return static, volatile
+
+
+def warm_up_prompt_cache() -> None:
+    """Pre-render the character cards of all the available philosophers."""
+
+    for philosopher_id in PHILOSOPHER_NAMES:
+        philosopher = PhilosopherFactory.get_philosopher(philosopher_id)
+        get_philosopher_prompt(
+            philosopher.name,
+            philosopher.perspective,
+            philosopher.style,
+            # Same arguments as get_philosopher_response_chain, to share cache keys
+            with_hint=False,
+            **get_prompt_cache_options(),
+        )
+
+
+def get_prompt_cache_options() -> dict[str, bool]:
+    """Layout options of the character cards, from the settings.
+
+    Returns:
+        dict[str, bool]: `cache_layout` and `cache_control` for get_philosopher_prompt.
+    """
+
+    return {
+        "cache_layout": settings.PROMPT_CACHE_LAYOUT,
+        # The other providers cache prompt prefixes on their own, and may reject
+        # the hint.
+        "cache_control": settings.PROMPT_CACHE_LAYOUT
+        and all(provider == "anthropic" for provider in get_configured_providers()),
+    }
 
 
 def get_conversation_summary_chain(summary: str = ""):
     """Create chain for conversation summarization using optimized model."""
     model = get_summary_model()
 
-    summary_message = EXTEND_SUMMARY_PROMPT if summary else SUMMARY_PROMPT
+    prompt = get_conversation_summary_prompt(extend=bool(summary))
+
+    return prompt | model
+
+
+@lru_cache(maxsize=2)
+def get_conversation_summary_prompt(extend: bool) -> ChatPromptTemplate:
+    """Compile the summary prompt once.
 
-    prompt = ChatPromptTemplate.from_messages(
+    Args:
+        extend: Whether to extend an existing summary instead of creating a new one.
+    """
+    summary_message = EXTEND_SUMMARY_PROMPT if extend else SUMMARY_PROMPT
+
+    return ChatPromptTemplate.from_messages(
         [
             MessagesPlaceholder(variable_name="messages"),
             ("human", summary_message.prompt),
         ],
         template_format="jinja2",
     )
-
-    return prompt | model
@@ -0,0 +1,114 @@
+from functools import lru_cache
+from typing import Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from philoagents.application.llm_service.tokens import count_message_tokens
+from philoagents.config import settings
+
+
+class ContextWindow:
+    """Token budget of the conversation history sent to the model on every turn.
+
+    Replies are short and depend mostly on the last exchanges, so the older messages
+    of a long thread only slow down the first token. The window keeps whole turns,
+    from a player message to the next one, so a tool call is never separated from its
+    result and the history always starts with a player message. The last `min_turns`
+    turns are always kept, then older turns are added while they fit `max_tokens`.
+    The messages stay in the checkpoint: only the prompt is trimmed.
+
+    Args:
+        max_tokens (int): Token budget of the history sent to the model.
+        min_turns (int): Most recent turns kept whatever their size.
+    """
+
+    def __init__(self, max_tokens: int, min_turns: int) -> None:
+        self.max_tokens = max_tokens
+        self.min_turns = min_turns
+        self._counters = {
+            "turns": 0,
+            "trimmed_turns": 0,
+            "history_tokens": 0,
+            "sent_tokens": 0,
+        }
+
+    def select(
+        self, messages: Sequence[BaseMessage], history_tokens: int
+    ) -> list[BaseMessage]:
+        """Get the most recent messages that fit the budget.
+
+        Turns are counted newest first, and the count stops at the first turn over
+        the budget, so only the sent turns are tokenized.
+
+        Args:
+            messages: History of the conversation, oldest first.
+            history_tokens: Tokens of the whole history, as kept in the state.
+
+        Returns:
+            list[BaseMessage]: The messages to send to the model.
+        """
+
+        turns = _split_turns(messages)
+        kept_tokens = 0
+        first_kept = len(turns)
+        while first_kept > 0:
+            turn_tokens = count_message_tokens(turns[first_kept - 1])
+            if (
+                len(turns) - first_kept >= self.min_turns
+                and kept_tokens + turn_tokens > self.max_tokens
+            ):
+                break
+            kept_tokens += turn_tokens
+            first_kept -= 1
+
+        self._counters["turns"] += 1
+        self._counters["history_tokens"] += (
+            kept_tokens if first_kept == 0 else max(history_tokens, kept_tokens)
+        )
+        self._counters["sent_tokens"] += kept_tokens
+        if first_kept == 0:
+            return list(messages)
+
+        self._counters["trimmed_turns"] += 1
+
+        return [message for turn in turns[first_kept:] for message in turn]
+
+    def get_stats(self) -> dict:
+        """Tokens of the history and tokens saved by the window."""
+
+        turns = self._counters["turns"]
+        saved_tokens = self._counters["history_tokens"] - self._counters["sent_tokens"]
+
+        return {
+            **self._counters,
+            "saved_tokens": saved_tokens,
+            "saved_tokens_per_turn": round(saved_tokens / turns, 1) if turns else None,
+            "max_tokens": self.max_tokens,
+            "min_turns": self.min_turns,
+        }
+
+
+def _split_turns(messages: Sequence[BaseMessage]) -> list[list[BaseMessage]]:
+    """Group messages into turns, each starting with a player message."""
+
+    turns: list[list[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+
+    return turns
+
+
+@lru_cache(maxsize=1)
+def get_context_window() -> ContextWindow | None:
+    """Get the context window of the process, or None if the history isn't trimmed."""
+
+    if settings.CONTEXT_WINDOW_MAX_TOKENS is None:
+        return None
+
+    return ContextWindow(
+        max_tokens=settings.CONTEXT_WINDOW_MAX_TOKENS,
+        min_turns=settings.CONTEXT_WINDOW_MIN_TURNS,
+    )
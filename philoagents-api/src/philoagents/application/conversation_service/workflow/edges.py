@@ -9,9 +9,7 @@ from philoagents.config import settings
 def should_summarize_conversation(
     state: PhilosopherState,
 ) -> Literal["summarize_conversation_node", "__end__"]:
-    messages = state["messages"]
-
-    if len(messages) > settings.TOTAL_MESSAGES_SUMMARY_TRIGGER:
+    if state.get("token_count", 0) > settings.MAX_CONTEXT_TOKENS:
         return "summarize_conversation_node"
 
     return END
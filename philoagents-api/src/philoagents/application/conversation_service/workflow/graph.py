@@ -8,6 +8,7 @@ from philoagents.application.conversation_service.workflow.edges import (
     should_summarize_conversation,
 )
 from philoagents.application.conversation_service.workflow.nodes import (
+    answer_matcher_node,
     conversation_node,
     summarize_conversation_node,
     victory_node,
@@ -37,8 +38,18 @@ def route_tools(state: PhilosopherState) -> Literal["victory_node", "connector_n
     return "connector_node"
 
 
-@lru_cache(maxsize=1)
-def create_workflow_graph():
+@lru_cache(maxsize=4)
+def create_workflow_graph(
+    summarize_in_background: bool = False, match_answers: bool = False
+):
+    """Build the conversation workflow.
+
+    Args:
+        summarize_in_background: If True, turns end right after the conversation and
+            summarization is left to a background job instead of the graph.
+        match_answers: If True, riddle answers and the victory name are matched locally
+            before the conversation, which then runs without the victory tool.
+    """
     graph_builder = StateGraph(PhilosopherState)
 
     graph_builder.add_node("conversation_node", conversation_node)
@@ -46,7 +57,12 @@ def create_workflow_graph():
     graph_builder.add_node("summarize_conversation_node", summarize_conversation_node)
     graph_builder.add_node("connector_node", connector_node)
 
-    graph_builder.add_edge(START, "conversation_node")
+    if match_answers:
+        graph_builder.add_node("answer_matcher_node", answer_matcher_node)
+        graph_builder.add_edge(START, "answer_matcher_node")
+        graph_builder.add_edge("answer_matcher_node", "conversation_node")
+    else:
+        graph_builder.add_edge(START, "conversation_node")
     graph_builder.add_conditional_edges(
         "conversation_node",
         route_tools,
@@ -56,10 +72,13 @@ def create_workflow_graph():
         }
     )
     graph_builder.add_edge("victory_node", "conversation_node")
-    graph_builder.add_conditional_edges("connector_node", should_summarize_conversation)
+    if summarize_in_background:
+        graph_builder.add_edge("connector_node", END)
+    else:
+        graph_builder.add_conditional_edges(
+            "connector_node", should_summarize_conversation
+        )
     graph_builder.add_edge("summarize_conversation_node", END)
 
     return graph_builder
 
-
-graph = create_workflow_graph().compile()
@@ -0,0 +1,13 @@
+"""Compiled workflow graph for the LangGraph server (see `langgraph.json`).
+
+The API compiles its own graph with a checkpointer, so it never imports this module.
+"""
+
+from philoagents.application.conversation_service.workflow.graph import (
+    create_workflow_graph,
+)
+from philoagents.infrastructure.opik_utils import configure
+
+configure()
+
+graph = create_workflow_graph().compile()
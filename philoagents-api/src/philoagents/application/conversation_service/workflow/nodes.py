@@ -1,36 +1,92 @@
-from langchain_core.messages import RemoveMessage
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    ToolMessage,
+)
 from langchain_core.runnables import RunnableConfig
 from langgraph.prebuilt import ToolNode
 
+from philoagents.application.conversation_service.workflow.answers import (
+    match_answer,
+)
 from philoagents.application.conversation_service.workflow.chains import (
     get_conversation_summary_chain,
     get_philosopher_response_chain,
 )
+from philoagents.application.conversation_service.workflow.context_window import (
+    get_context_window,
+)
 from philoagents.application.conversation_service.workflow.state import PhilosopherState
 from philoagents.application.conversation_service.workflow.tools import victory_tools
+from philoagents.application.llm_service.tokens import count_message_tokens
 from philoagents.config import settings
 
-victory_node = ToolNode(victory_tools)
+victory_tool_node = ToolNode(victory_tools)
+
+
+async def victory_node(state: PhilosopherState, config: RunnableConfig):
+    result = await victory_tool_node.ainvoke(state, config)
+
+    return {**result, "token_count": count_message_tokens(result["messages"])}
+
+
+async def answer_matcher_node(state: PhilosopherState):
+    last_message = state["messages"][-1]
+    match = (
+        match_answer(state.get("philosopher_id", ""), last_message.content)
+        if isinstance(last_message, HumanMessage)
+        and isinstance(last_message.content, str)
+        else None
+    )
+    if match is None:
+        return {"game_event": None, "answer_hint": ""}
+
+    return {"game_event": match.game_event, "answer_hint": match.hint}
 
 
 async def conversation_node(state: PhilosopherState, config: RunnableConfig):
     summary = state.get("summary", "")
     philosopher_id = state.get("philosopher_id", "")
-    conversation_chain = get_philosopher_response_chain(philosopher_id=philosopher_id)
+    answer_hint = state.get("answer_hint")
+    conversation_chain = get_philosopher_response_chain(
+        philosopher_id=philosopher_id,
+        philosopher_name=state["philosopher_name"],
+        philosopher_perspective=state["philosopher_perspective"],
+        philosopher_style=state["philosopher_style"],
+        # The answer matcher replaces the victory tool
+        with_tools=answer_hint is None,
+        with_hint=bool(answer_hint),
+    )
+
+    messages = state["messages"]
+    uncounted_tokens = _count_uncounted_tokens(messages, state.get("token_count", 0))
+    context_window = get_context_window()
+    if context_window is not None:
+        messages = context_window.select(
+            messages, state.get("token_count", 0) + uncounted_tokens
+        )
 
     response = await conversation_chain.ainvoke(
         {
-            "messages": state["messages"],
+            "messages": messages,
             "philosopher_name": state["philosopher_name"],
             "philosopher_perspective": state["philosopher_perspective"],
             "philosopher_style": state["philosopher_style"],
             "summary": summary,
+            "answer_hint": answer_hint or "",
         },
         config,
     )
 
     # Check if victory tool was called
-    result = {"messages": response}
+    result = {
+        "messages": response,
+        "token_count": count_message_tokens(response) + uncounted_tokens,
+    }
+    if answer_hint is not None:
+        result["answer_hint"] = None
     if hasattr(response, "tool_calls") and response.tool_calls:
         for tool_call in response.tool_calls:
             if tool_call.get("name") == "trigger_victory":
@@ -52,12 +108,49 @@ async def summarize_conversation_node(state: PhilosopherState):
         }
     )
 
-    delete_messages = [
-        RemoveMessage(id=m.id)
-        for m in state["messages"][: -settings.TOTAL_MESSAGES_AFTER_SUMMARY]
-    ]
-    return {"summary": response.content, "messages": delete_messages}
+    messages = state["messages"]
+
+    # Keep the most recent messages that fit the budget, always at least the last one
+    kept_tokens = 0
+    first_kept = len(messages)
+    while first_kept > 0:
+        message_tokens = count_message_tokens(messages[first_kept - 1])
+        if (
+            first_kept < len(messages)
+            and kept_tokens + message_tokens > settings.CONTEXT_TOKENS_AFTER_SUMMARY
+        ):
+            break
+        kept_tokens += message_tokens
+        first_kept -= 1
+
+    # Don't separate tool results from the tool call that produced them
+    while first_kept > 0 and isinstance(messages[first_kept], ToolMessage):
+        first_kept -= 1
+
+    deleted_messages = messages[:first_kept]
+    delete_messages = [RemoveMessage(id=m.id) for m in deleted_messages]
+    return {
+        "summary": response.content,
+        "messages": delete_messages,
+        "token_count": -count_message_tokens(deleted_messages),
+    }
 
 
 async def connector_node(state: PhilosopherState):
     return {}
+
+
+def _count_uncounted_tokens(messages: list[BaseMessage], token_count: int) -> int:
+    """Count the history of a thread started before its tokens were counted.
+
+    The count of such a thread only covers the messages of the current turn, after the
+    last reply, so its older messages are counted once, when it's next used.
+    """
+
+    first_new = len(messages)
+    while first_new > 0 and not isinstance(messages[first_new - 1], AIMessage):
+        first_new -= 1
+    if first_new == 0 or token_count > count_message_tokens(messages[first_new:]):
+        return 0
+
+    return count_message_tokens(messages[:first_new])
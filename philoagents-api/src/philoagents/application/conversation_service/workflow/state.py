@@ -1,6 +1,14 @@
+from typing import Annotated
+
 from langgraph.graph import MessagesState
 
 
+def add_token_counts(left: int, right: int) -> int:
+    """Reducer applying a token count delta, never going below zero."""
+
+    return max(0, (left or 0) + (right or 0))
+
+
 class PhilosopherState(MessagesState):
     """State class for the LangGraph workflow. It keeps track of the information necessary to maintain a coherent
     conversation between the Philosopher and the user.
@@ -13,6 +21,11 @@ class PhilosopherState(MessagesState):
         philosopher_style (str): The style of the philosopher.
         summary (str): A summary of the conversation. This is used to reduce the token usage of the model.
         game_event (str | None): Game event triggered by the conversation (e.g., "victory").
+        token_count (int): Running token count of `messages`. Nodes write deltas, which
+            are added to the current count. Threads saved before it existed are
+            counted on their next turn.
+        answer_hint (str | None): Hint for the model from the local answer matcher, set
+            for the current turn only. None when the matcher didn't run.
     """
 
     philosopher_id: str = ""
@@ -21,3 +34,5 @@ class PhilosopherState(MessagesState):
     philosopher_style: str = ""
     summary: str = ""
     game_event: str | None = None
+    token_count: Annotated[int, add_token_counts] = 0
+    answer_hint: str | None = None
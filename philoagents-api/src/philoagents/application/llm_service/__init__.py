@@ -3,9 +3,20 @@
 from .model_factory import (
     get_chat_model,
     get_summary_model,
+    invalidate_model_registry,
 )
+from .routing import RoutingChatModel, get_provider_router
+from .scheduler import Priority, admission_scope
+from .tokens import count_message_tokens, count_tokens
 
 __all__ = [
     "get_chat_model",
     "get_summary_model",
+    "invalidate_model_registry",
+    "RoutingChatModel",
+    "get_provider_router",
+    "Priority",
+    "admission_scope",
+    "count_tokens",
+    "count_message_tokens",
 ]
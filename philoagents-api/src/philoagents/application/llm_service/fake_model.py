@@ -0,0 +1,100 @@
+"""Local chat model that streams canned text, for load tests without real tokens."""
+
+import asyncio
+import itertools
+import time
+from typing import Any, AsyncIterator, Iterator, Sequence
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import BaseTool
+
+_WORDS = (
+    "Ciao viaggiatore, sono felice di parlare con te della scienza e dei suoi "
+    "misteri, ma prima dimmi cosa ti porta fin qui"
+).split()
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Chat model that answers with canned Italian text at a configurable pace.
+
+    Args:
+        ttft_ms (float): Delay before the first token.
+        tokens_per_second (float): Pace of the following tokens.
+        response_tokens (int): Number of tokens of every response.
+    """
+
+    ttft_ms: float = 200
+    tokens_per_second: float = 50
+    response_tokens: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _get_ls_params(self, stop: list[str] | None = None, **kwargs: Any) -> Any:
+        # Reported as the provider and model of the metrics and the traces.
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_provider"] = "fake"
+        params["ls_model_name"] = "fake-streaming"
+        return params
+
+    def bind_tools(
+        self, tools: Sequence[BaseTool], **kwargs: Any
+    ) -> "FakeStreamingChatModel":
+        # The fake model never calls tools.
+        return self
+
+    def _tokens(self) -> Iterator[str]:
+        words = itertools.islice(itertools.cycle(_WORDS), self.response_tokens)
+        for index, word in enumerate(words):
+            yield word if index == 0 else f" {word}"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(
+            self.ttft_ms / 1000 + (self.response_tokens - 1) / self.tokens_per_second
+        )
+        message = AIMessage(content="".join(self._tokens()))
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(
+            self.ttft_ms / 1000 + (self.response_tokens - 1) / self.tokens_per_second
+        )
+        message = AIMessage(content="".join(self._tokens()))
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.ttft_ms / 1000)
+        for index, token in enumerate(self._tokens()):
+            if index > 0:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -1,43 +1,258 @@
 """Factory for creating LangChain chat models from different providers."""
 
-from langchain_anthropic import ChatAnthropic
+import threading
+from collections import OrderedDict
+from typing import Sequence
+
 from langchain_core.language_models import BaseChatModel
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from loguru import logger
 
+from philoagents.application.llm_service.routing import (
+    RoutingChatModel,
+    get_provider_router,
+)
 from philoagents.config import settings
 
+# Main model of each provider, used by fallbacks configured without a model.
+DEFAULT_MODELS = {
+    "groq": "llama-3.3-70b-versatile",
+    "gemini": "gemini-2.0-flash-exp",
+    "openai": "gpt-4o",
+    "anthropic": "claude-3-5-sonnet-20241022",
+}
+
+# Summary model of each provider, used by the fallbacks of the summary model.
+DEFAULT_SUMMARY_MODELS = {
+    "groq": "llama-3.1-8b-instant",
+    "gemini": "gemini-1.5-flash",
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-5-haiku-20241022",
+}
+
+ModelKey = tuple[str, str, float, tuple[str, ...]]
+
+# Chat models own an HTTP client, so reusing them keeps connections warm.
+_model_registry: OrderedDict[ModelKey, BaseChatModel | Runnable] = OrderedDict()
+_model_registry_lock = threading.Lock()
+
 
 def get_chat_model(
     temperature: float = 0.7,
     model_name: str | None = None,
     provider: str | None = None,
-) -> BaseChatModel:
+    tools: Sequence[BaseTool] = (),
+    use_cache: bool = True,
+    role: str = "chat",
+) -> BaseChatModel | Runnable:
     """
-    Create a chat model instance based on configured provider.
+    Get a chat model instance based on configured provider.
+
+    Instances are memoized in a bounded LRU registry keyed by provider, model name,
+    temperature and bound tools, so turns reuse warm clients.
+
+    When no provider is given and LLM_FALLBACK_PROVIDERS or LLM_RATE_LIMITS is set,
+    the model routes requests across the configured provider and its fallbacks, and
+    through admission control (see `routing.py` and `scheduler.py`).
 
     Args:
         temperature: Sampling temperature (0.0 to 1.0)
         model_name: Override default model name for the provider
         provider: Override default provider (groq, gemini, openai, anthropic)
+        tools: Tools to bind to the model
+        use_cache: Whether to reuse (and store) the instance in the registry
+        role: "chat" or "summary", selecting the models of the fallback providers
 
     Returns:
-        BaseChatModel: LangChain chat model instance
+        BaseChatModel | Runnable: LangChain chat model instance, bound to `tools` if any
 
     Raises:
         ValueError: If provider is unknown or API key is missing
     """
-    provider = provider or settings.LLM_PROVIDER
+    if provider is None and (
+        settings.LLM_FALLBACK_PROVIDERS or settings.LLM_RATE_LIMITS
+    ):
+        return _get_routing_model(temperature, model_name, tools, use_cache, role)
+
+    provider = provider.lower() if provider else settings.LLM_PROVIDER.lower()
     model_name = model_name or settings.LLM_MODEL
+    key = (provider, model_name, temperature, tuple(tool.name for tool in tools))
+
+    if use_cache:
+        with _model_registry_lock:
+            if key in _model_registry:
+                _model_registry.move_to_end(key)
+                return _model_registry[key]
+
+    model = _create_chat_model(provider, model_name, temperature)
+    if tools:
+        model = model.bind_tools(tools)
+
+    if use_cache:
+        with _model_registry_lock:
+            # Another thread may have built the same model meanwhile; keep the first.
+            model = _model_registry.setdefault(key, model)
+            _model_registry.move_to_end(key)
+            while len(_model_registry) > settings.MODEL_REGISTRY_MAX_SIZE:
+                _model_registry.popitem(last=False)
+
+    return model
+
+
+def invalidate_model_registry(provider: str | None = None) -> int:
+    """
+    Drop memoized chat models so the next call creates fresh instances.
+
+    Args:
+        provider: Only drop the models of this provider. Drops everything if None.
+
+    Returns:
+        int: Number of dropped model instances
+    """
+    with _model_registry_lock:
+        keys = [
+            key
+            for key in _model_registry
+            # Routing models are keyed by all their providers, e.g. "groq+gemini".
+            if provider is None or provider.lower() in key[0].split("+")
+        ]
+        for key in keys:
+            del _model_registry[key]
+
+    return len(keys)
+
+
+def get_fallback_routes(role: str = "chat") -> list[tuple[str, str]]:
+    """
+    Parse LLM_FALLBACK_PROVIDERS into (provider, model name) pairs.
+
+    Chat fallbacks listed without a model use their default main model. Summary
+    fallbacks always use the default summary model of their provider.
+
+    Args:
+        role: "chat" or "summary"
+
+    Returns:
+        list[tuple[str, str]]: Fallback providers and models, in order of preference
+    """
+    routes = []
+    for entry in settings.LLM_FALLBACK_PROVIDERS.split(","):
+        provider, _, model_name = entry.strip().partition(":")
+        provider = provider.strip().lower()
+        if not provider or provider == settings.LLM_PROVIDER.lower():
+            continue
+        if role == "summary":
+            model_name = DEFAULT_SUMMARY_MODELS.get(provider, "")
+        else:
+            model_name = model_name.strip() or DEFAULT_MODELS.get(provider, "")
+        routes.append((provider, model_name))
+
+    return routes
+
+
+def get_configured_providers() -> list[str]:
+    """
+    Get the providers the main chat model may send a request to.
+
+    Returns:
+        list[str]: LLM_PROVIDER followed by the fallback providers
+    """
+    return [settings.LLM_PROVIDER.lower()] + [
+        provider for provider, _ in get_fallback_routes()
+    ]
+
+
+def _get_routing_model(
+    temperature: float,
+    model_name: str | None,
+    tools: Sequence[BaseTool],
+    use_cache: bool,
+    role: str,
+) -> RoutingChatModel:
+    """
+    Get a chat model routing requests across the provider and its fallbacks.
+
+    Fallbacks whose API key is missing are skipped.
+
+    Raises:
+        ValueError: If the configured provider is unknown or its API key is missing
+    """
+    fallback_routes = get_fallback_routes(role)
+    key = (
+        "+".join(
+            [settings.LLM_PROVIDER.lower()]
+            + [provider for provider, _ in fallback_routes]
+        ),
+        # The fallback models depend on the role, not only on the main model.
+        f"{role}:{model_name or settings.LLM_MODEL}",
+        temperature,
+        tuple(tool.name for tool in tools),
+    )
+    if use_cache:
+        with _model_registry_lock:
+            if key in _model_registry:
+                _model_registry.move_to_end(key)
+                return _model_registry[key]
+
+    routes = [
+        (
+            settings.LLM_PROVIDER.lower(),
+            get_chat_model(
+                temperature, model_name, settings.LLM_PROVIDER, tools, use_cache
+            ),
+        )
+    ]
+    for provider, fallback_model_name in fallback_routes:
+        try:
+            model = get_chat_model(
+                temperature, fallback_model_name, provider, tools, use_cache
+            )
+        except ValueError as e:
+            logger.warning(f"Skipping fallback provider '{provider}': {e}")
+            continue
+        routes.append((provider, model))
+
+    model = RoutingChatModel(routes=routes, router=get_provider_router())
+
+    if use_cache:
+        with _model_registry_lock:
+            model = _model_registry.setdefault(key, model)
+            _model_registry.move_to_end(key)
+            while len(_model_registry) > settings.MODEL_REGISTRY_MAX_SIZE:
+                _model_registry.popitem(last=False)
+
+    return model
+
+
+def _create_chat_model(
+    provider: str, model_name: str, temperature: float
+) -> BaseChatModel:
+    """
+    Create a new chat model instance for the given provider.
+
+    Provider integrations are imported lazily, so only the configured ones are loaded.
 
-    match provider.lower():
+    Args:
+        provider: Provider name (groq, gemini, openai, anthropic)
+        model_name: Model name for the provider
+        temperature: Sampling temperature (0.0 to 1.0)
+
+    Returns:
+        BaseChatModel: LangChain chat model instance
+
+    Raises:
+        ValueError: If provider is unknown or API key is missing
+    """
+    match provider:
         case "groq":
             if not settings.GROQ_API_KEY:
                 raise ValueError(
                     "GROQ_API_KEY is not set in environment. "
                     "Please add it to your .env file."
                 )
+            from langchain_groq import ChatGroq
+
             return ChatGroq(
                 api_key=settings.GROQ_API_KEY,
                 model_name=model_name,
@@ -50,6 +265,8 @@ def get_chat_model(
                     "GEMINI_API_KEY is not set in environment. "
                     "Please add it to your .env file."
                 )
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
             return ChatGoogleGenerativeAI(
                 api_key=settings.GEMINI_API_KEY,
                 model=model_name,
@@ -62,6 +279,8 @@ def get_chat_model(
                     "OPENAI_API_KEY is not set in environment. "
                     "Please add it to your .env file."
                 )
+            from langchain_openai import ChatOpenAI
+
             return ChatOpenAI(
                 api_key=settings.OPENAI_API_KEY,
                 model=model_name,
@@ -74,12 +293,26 @@ def get_chat_model(
                     "ANTHROPIC_API_KEY is not set in environment. "
                     "Please add it to your .env file."
                 )
+            from langchain_anthropic import ChatAnthropic
+
             return ChatAnthropic(
                 api_key=settings.ANTHROPIC_API_KEY,
                 model=model_name,
                 temperature=temperature,
             )
 
+        case "fake":
+            # Local model for load tests (tools/benchmark_load.py); spends no tokens.
+            from philoagents.application.llm_service.fake_model import (
+                FakeStreamingChatModel,
+            )
+
+            return FakeStreamingChatModel(
+                ttft_ms=settings.FAKE_LLM_TTFT_MS,
+                tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+                response_tokens=settings.FAKE_LLM_RESPONSE_TOKENS,
+            )
+
         case _:
             raise ValueError(
                 f"Unknown provider: {provider}. "
@@ -87,7 +320,7 @@ def get_chat_model(
             )
 
 
-def get_summary_model(temperature: float = 0.7) -> BaseChatModel:
+def get_summary_model(temperature: float = 0.7) -> BaseChatModel | Runnable:
     """
     Get a chat model optimized for summarization (usually faster/cheaper).
 
@@ -100,6 +333,5 @@ def get_summary_model(temperature: float = 0.7) -> BaseChatModel:
     return get_chat_model(
         temperature=temperature,
         model_name=settings.LLM_MODEL_SUMMARY,
+        role="summary",
     )
-
-
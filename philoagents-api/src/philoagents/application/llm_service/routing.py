@@ -0,0 +1,484 @@
+"""Routing of chat model requests across providers, with failover and hedging."""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence, TypeVar
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from loguru import logger
+from pydantic import ConfigDict
+
+from philoagents.application.llm_service.scheduler import (
+    AdmissionRejected,
+    get_provider_scheduler,
+    get_retry_after,
+    is_rate_limit_error,
+)
+from philoagents.config import settings
+
+T = TypeVar("T")
+
+Route = tuple[str, BaseChatModel | Runnable]
+
+# Providers are called without the caller's callbacks: the routing model reports the
+# winning response itself, so a losing hedged request never reaches the token stream.
+_NO_CALLBACKS = {"callbacks": []}
+
+# Recorded latencies needed before the hedge delay follows the provider's p95.
+_MIN_HEDGE_SAMPLES = 20
+
+
+class ProviderHealth:
+    """Rolling latency and error rate of a provider.
+
+    Latencies are kept separately for streamed requests (time to the first token) and
+    invoked ones (time to the full response).
+
+    Args:
+        window_size (int): Number of recent requests the rates are computed on.
+    """
+
+    def __init__(self, window_size: int) -> None:
+        self._latencies_ms: dict[str, deque[float]] = {
+            "invoke": deque(maxlen=window_size),
+            "stream": deque(maxlen=window_size),
+        }
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._cooldown_until = 0.0
+        self._counters = {"requests": 0, "served": 0, "failures": 0, "timeouts": 0}
+
+    def in_cooldown(self) -> bool:
+        return time.monotonic() < self._cooldown_until
+
+    def percentile(self, mode: str, p: float) -> float | None:
+        latencies = sorted(self._latencies_ms[mode])
+        if not latencies:
+            return None
+
+        return round(latencies[int(p * (len(latencies) - 1))], 1)
+
+    def samples(self, mode: str) -> int:
+        return len(self._latencies_ms[mode])
+
+    def record_start(self) -> None:
+        self._counters["requests"] += 1
+
+    def record_success(self, mode: str, latency_ms: float) -> None:
+        self._latencies_ms[mode].append(latency_ms)
+        self._outcomes.append(True)
+        self._counters["served"] += 1
+
+    def record_failure(self, timeout: bool = False) -> None:
+        self._outcomes.append(False)
+        self._counters["failures"] += 1
+        if timeout:
+            self._counters["timeouts"] += 1
+        self._cooldown_until = time.monotonic() + settings.LLM_PROVIDER_COOLDOWN_SECONDS
+
+    def get_stats(self) -> dict:
+        errors = self._outcomes.count(False)
+
+        return {
+            **self._counters,
+            "error_rate": round(errors / len(self._outcomes), 3)
+            if self._outcomes
+            else None,
+            "cooling_down": self.in_cooldown(),
+            "latency_ms": {
+                mode: {
+                    "p50": self.percentile(mode, 0.5),
+                    "p95": self.percentile(mode, 0.95),
+                }
+                for mode in self._latencies_ms
+            },
+        }
+
+
+class ProviderRouter:
+    """Failover and hedging policy, shared by all the routing chat models.
+
+    Providers are tried in their configured order, except that providers which
+    recently failed are moved to the back until their cooldown expires. A request
+    fails over to the next provider on errors and timeouts. With hedging enabled, a
+    request still unanswered after the provider's p95 latency is also sent to the next
+    provider, and the first answer wins.
+    """
+
+    def __init__(self) -> None:
+        self._health: dict[str, ProviderHealth] = {}
+        self._counters = {
+            "requests": 0,
+            "failovers": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "failed": 0,
+        }
+        self._last_served_by: str | None = None
+
+    def health(self, provider: str) -> ProviderHealth:
+        if provider not in self._health:
+            self._health[provider] = ProviderHealth(settings.LLM_ROUTER_WINDOW_SIZE)
+
+        return self._health[provider]
+
+    def order(self, providers: Sequence[str]) -> list[str]:
+        """Sort providers by preference, moving the cooling down ones to the back."""
+
+        return sorted(
+            providers, key=lambda provider: self.health(provider).in_cooldown()
+        )
+
+    def hedge_delay(self, provider: str, mode: str) -> float:
+        """Seconds to wait for `provider` before hedging the request."""
+
+        health = self.health(provider)
+        delay_ms = settings.LLM_HEDGE_MIN_DELAY_MS
+        if health.samples(mode) >= _MIN_HEDGE_SAMPLES:
+            delay_ms = max(delay_ms, health.percentile(mode, 0.95))
+
+        return delay_ms / 1000
+
+    def call(
+        self,
+        routes: Sequence[Route],
+        messages: Sequence[BaseMessage],
+        attempt: Callable[[Runnable], T],
+    ) -> T:
+        """Run `attempt` on the routes in order until one succeeds, without hedging.
+
+        Every attempt is first admitted by the provider's scheduler, blocking the
+        calling thread while the provider is over budget.
+
+        Args:
+            routes: (provider, model) pairs, in order of preference.
+            messages: Messages of the request, charged to the token budgets.
+            attempt: Sends the request to a model.
+
+        Raises:
+            Exception: The error of the last provider, if all of them failed.
+        """
+
+        self._counters["requests"] += 1
+        models = dict(routes)
+        error: Exception | None = None
+
+        for position, provider in enumerate(self.order(list(models))):
+            health = self.health(provider)
+            get_provider_scheduler(provider).acquire_blocking(messages)
+            health.record_start()
+            start = time.perf_counter()
+            try:
+                result = attempt(models[provider])
+            except Exception as e:
+                health.record_failure()
+                logger.warning(f"Provider '{provider}' failed: {e}")
+                if is_rate_limit_error(e):
+                    get_provider_scheduler(provider).backoff(get_retry_after(e))
+                error = e
+                continue
+
+            health.record_success("invoke", (time.perf_counter() - start) * 1000)
+            get_provider_scheduler(provider).record_success()
+            self._record_served(provider, failed_over=position > 0)
+            return result
+
+        self._counters["failed"] += 1
+        raise error
+
+    async def race(
+        self,
+        routes: Sequence[Route],
+        mode: str,
+        messages: Sequence[BaseMessage],
+        attempt: Callable[[Runnable], Awaitable[T]],
+        discard: Callable[[T], Awaitable[Any]] | None = None,
+    ) -> T:
+        """Run `attempt` on the routes with failover and hedging.
+
+        Every attempt is first admitted by the provider's scheduler. A provider that
+        answers with a rate limit error is backed off and retried once, after the
+        other providers.
+
+        Args:
+            routes: (provider, model) pairs, in order of preference.
+            mode: "stream" if `attempt` returns once the first token arrives, else
+                "invoke".
+            messages: Messages of the request, charged to the token budgets.
+            attempt: Sends the request to a model.
+            discard: Releases the result of an attempt that lost a hedged race.
+
+        Returns:
+            T: The result of the first successful attempt.
+
+        Raises:
+            Exception: The error of the last provider, if all of them failed.
+        """
+
+        self._counters["requests"] += 1
+        models = dict(routes)
+        queue = deque(self.order(list(models)))
+        tasks: dict[asyncio.Task, str] = {}
+        rate_limited: set[str] = set()
+        first_provider = queue[0]
+        hedge_deadline = None
+        error: Exception | None = None
+
+        def launch() -> None:
+            provider = queue.popleft()
+            task = asyncio.ensure_future(
+                self._admit_and_attempt(provider, models[provider], messages, attempt)
+            )
+            tasks[task] = provider
+
+        launch()
+        if settings.LLM_HEDGING_ENABLED and queue:
+            hedge_deadline = time.perf_counter() + self.hedge_delay(
+                first_provider, mode
+            )
+
+        try:
+            while tasks:
+                timeout = None
+                if hedge_deadline is not None:
+                    timeout = max(0.0, hedge_deadline - time.perf_counter())
+                done, _ = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    hedge_deadline = None
+                    self._counters["hedged"] += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    provider = tasks.pop(task)
+                    health = self.health(provider)
+                    try:
+                        result, latency_ms = task.result()
+                    except AdmissionRejected as e:
+                        logger.warning(f"Provider '{provider}' is overloaded: {e}")
+                        error = e
+                        continue
+                    except Exception as e:
+                        timeout_error = isinstance(e, TimeoutError)
+                        health.record_failure(timeout=timeout_error)
+                        logger.warning(
+                            f"Provider '{provider}' failed: "
+                            f"{'timed out' if timeout_error else e}"
+                        )
+                        if is_rate_limit_error(e):
+                            get_provider_scheduler(provider).backoff(get_retry_after(e))
+                            if provider not in rate_limited:
+                                rate_limited.add(provider)
+                                queue.append(provider)
+                        error = e
+                        continue
+
+                    health.record_success(mode, latency_ms)
+                    get_provider_scheduler(provider).record_success()
+                    pending = set(tasks.values())
+                    if provider != first_provider and first_provider in pending:
+                        self._counters["hedge_wins"] += 1
+                        self._record_served(provider, failed_over=False)
+                    else:
+                        self._record_served(
+                            provider, failed_over=provider != first_provider
+                        )
+                    return result
+
+                if not tasks and queue:
+                    hedge_deadline = None
+                    launch()
+        finally:
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            if discard is not None:
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        await discard(result[0])
+
+        self._counters["failed"] += 1
+        raise error
+
+    async def _admit_and_attempt(
+        self,
+        provider: str,
+        model: Runnable,
+        messages: Sequence[BaseMessage],
+        attempt: Callable[[Runnable], Awaitable[T]],
+    ) -> tuple[T, float]:
+        # Time spent waiting for admission doesn't count towards the timeout.
+        await get_provider_scheduler(provider).acquire(messages)
+        self.health(provider).record_start()
+        start = time.perf_counter()
+        result = await asyncio.wait_for(
+            attempt(model), settings.LLM_REQUEST_TIMEOUT_SECONDS
+        )
+
+        return result, (time.perf_counter() - start) * 1000
+
+    def _record_served(self, provider: str, failed_over: bool) -> None:
+        self._last_served_by = provider
+        if failed_over:
+            self._counters["failovers"] += 1
+
+    def get_stats(self) -> dict:
+        """Routing counters and the health of every provider."""
+
+        return {
+            **self._counters,
+            "last_served_by": self._last_served_by,
+            "providers": {
+                provider: health.get_stats()
+                for provider, health in self._health.items()
+            },
+        }
+
+
+_router = ProviderRouter()
+
+
+def get_provider_router() -> ProviderRouter:
+    """Get the router shared by all the routing chat models."""
+
+    return _router
+
+
+class RoutingChatModel(BaseChatModel):
+    """Chat model that sends each request to one of several providers.
+
+    Requests wait for admission by the providers' schedulers (see `scheduler.py`), so
+    the model is also used with a single provider when rate limits are configured.
+    Streams fail over only until the first token arrives: after that, the response
+    is committed to the provider that produced it.
+
+    Args:
+        routes (list[Route]): (provider, chat model) pairs, in order of preference.
+        router (ProviderRouter): Policy tracking the health of the providers.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    routes: list[Route]
+    router: ProviderRouter
+
+    @property
+    def _llm_type(self) -> str:
+        return "routing"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"providers": [provider for provider, _ in self.routes]}
+
+    def bind_tools(
+        self, tools: Sequence[BaseTool], **kwargs: Any
+    ) -> "RoutingChatModel":
+        return self.model_copy(
+            update={
+                "routes": [
+                    (provider, model.bind_tools(tools, **kwargs))
+                    for provider, model in self.routes
+                ]
+            }
+        )
+
+    def __tag_route(self, message: BaseMessage, model: Runnable) -> BaseMessage:
+        """Record the provider and the model that produced a message.
+
+        The tags are read by the metrics callbacks, which only see the routing model.
+        """
+
+        provider = next(
+            (provider for provider, routed in self.routes if routed is model), None
+        )
+        bound = getattr(model, "bound", model)
+        message.response_metadata["routed_provider"] = provider
+        message.response_metadata["routed_model"] = getattr(
+            bound, "model_name", None
+        ) or getattr(bound, "model", None)
+
+        return message
+
+    async def __atag_route(
+        self, message: Awaitable[BaseMessage], model: Runnable
+    ) -> BaseMessage:
+        return self.__tag_route(await message, model)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self.router.call(
+            self.routes,
+            messages,
+            lambda model: self.__tag_route(
+                model.invoke(messages, config=_NO_CALLBACKS, stop=stop, **kwargs),
+                model,
+            ),
+        )
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = await self.router.race(
+            self.routes,
+            "invoke",
+            messages,
+            lambda model: self.__atag_route(
+                model.ainvoke(messages, config=_NO_CALLBACKS, stop=stop, **kwargs),
+                model,
+            ),
+        )
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async def open_stream(model: Runnable) -> tuple[Any, AsyncIterator]:
+            stream = aiter(
+                model.astream(messages, config=_NO_CALLBACKS, stop=stop, **kwargs)
+            )
+            chunk = await anext(stream, None)
+            if chunk is not None:
+                # Later chunks are merged into the first, so it carries the route.
+                self.__tag_route(chunk, model)
+            return chunk, stream
+
+        async def close_stream(opened: tuple[Any, AsyncIterator]) -> None:
+            await opened[1].aclose()
+
+        chunk, stream = await self.router.race(
+            self.routes, "stream", messages, open_stream, discard=close_stream
+        )
+
+        while chunk is not None:
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+            chunk = await anext(stream, None)
@@ -0,0 +1,345 @@
+"""Admission control of chat model requests, with per-provider rate limits."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Iterator, Sequence
+
+from langchain_core.messages import BaseMessage
+from loguru import logger
+
+from philoagents.application.llm_service.tokens import count_message_tokens
+from philoagents.config import settings
+
+# Longest backoff applied after repeated 429s without a Retry-After header.
+_MAX_BACKOFF_SECONDS = 60
+
+
+class Priority(IntEnum):
+    """Order in which queued requests are admitted (lowest first)."""
+
+    # Follow-up calls of a turn that's already answering the player.
+    IN_PROGRESS = 0
+    NEW = 1
+    BACKGROUND = 2
+
+
+@dataclass
+class AdmissionScope:
+    """Priority and queue listener of the requests made within a scope."""
+
+    priority: Priority = Priority.NEW
+    on_queued: Callable[[dict[str, Any]], Awaitable[None]] | None = None
+
+
+_scope: ContextVar[AdmissionScope | None] = ContextVar("admission_scope", default=None)
+
+
+@contextmanager
+def admission_scope(
+    priority: Priority = Priority.NEW,
+    on_queued: Callable[[dict[str, Any]], Awaitable[None]] | None = None,
+) -> Iterator[AdmissionScope]:
+    """Set the priority of the chat model requests made within the block.
+
+    Once the first request of a NEW scope is admitted, the scope is in progress, so
+    its follow-up requests (e.g., after a tool call) jump ahead of new turns.
+
+    Args:
+        priority: Priority of the first request.
+        on_queued: Called with the provider and queue position when a request waits.
+
+    Yields:
+        AdmissionScope: The scope of the block.
+    """
+
+    scope = AdmissionScope(priority=priority, on_queued=on_queued)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when the wait queue of a provider is full."""
+
+
+class TokenBucket:
+    """Budget of a quantity per minute, refilled continuously.
+
+    Args:
+        per_minute (int): Capacity of the bucket, refilled every minute.
+    """
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = per_minute
+        self._rate = per_minute / 60
+        self._level = float(per_minute)
+        self._updated = time.monotonic()
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available."""
+
+        self._refill()
+        missing = min(amount, self.capacity) - self._level
+
+        return max(0.0, missing / self._rate)
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self._level -= min(amount, self.capacity)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(
+            self.capacity, self._level + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+
+class ProviderScheduler:
+    """Admits the requests sent to a provider within its rate limits.
+
+    Requests that don't fit the requests-per-minute and tokens-per-minute budgets
+    wait in a bounded queue, ordered by priority. A rate limit error from the provider
+    blocks it for its Retry-After delay, or for an exponential backoff.
+
+    Args:
+        provider (str): Name of the provider.
+        requests_per_minute (int): Request budget. Unlimited if 0.
+        tokens_per_minute (int): Token budget, counting the prompt and the expected
+            completion. Unlimited if 0.
+        max_queue (int): Maximum number of waiting requests.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_queue: int = 64,
+    ) -> None:
+        self.provider = provider
+        self.max_queue = max_queue
+        self._requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._waiters: list[list] = []
+        self._sequence = itertools.count()
+        self._dispatcher: asyncio.Task | None = None
+        self._blocked_until = 0.0
+        self._consecutive_rate_limits = 0
+        self._waits_ms: deque[float] = deque(maxlen=1000)
+        self._counters = {"admitted": 0, "queued": 0, "rejected": 0, "rate_limited": 0}
+
+    async def acquire(self, messages: Sequence[BaseMessage]) -> None:
+        """Wait until a request with `messages` can be sent to the provider.
+
+        Raises:
+            AdmissionRejected: If the wait queue is full.
+        """
+
+        scope = _scope.get()
+        priority = scope.priority if scope else Priority.NEW
+        tokens = self._count_tokens(messages)
+
+        if not self._waiters and self._wait_time(tokens) == 0:
+            self._admit(tokens)
+        else:
+            await self._enqueue(priority, tokens, scope)
+
+        if scope and scope.priority == Priority.NEW:
+            scope.priority = Priority.IN_PROGRESS
+
+    def acquire_blocking(self, messages: Sequence[BaseMessage]) -> None:
+        """Block the calling thread until a request with `messages` can be sent.
+
+        Synchronous calls can't wait in the queue of the event loop, so they wait for
+        the budgets and the backoff without a priority.
+        """
+
+        tokens = self._count_tokens(messages)
+        while (wait := self._wait_time(tokens)) > 0:
+            time.sleep(wait)
+        self._admit(tokens)
+
+    def backoff(self, retry_after: float | None = None) -> None:
+        """Block the provider after a rate limit error.
+
+        Args:
+            retry_after: Delay requested by the provider, in seconds. Without it, the
+                delay doubles with every consecutive rate limit error.
+        """
+
+        self._counters["rate_limited"] += 1
+        self._consecutive_rate_limits += 1
+        if retry_after is None:
+            retry_after = min(
+                _MAX_BACKOFF_SECONDS,
+                settings.LLM_RATE_LIMIT_BACKOFF_SECONDS
+                * 2 ** (self._consecutive_rate_limits - 1),
+            )
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        logger.warning(
+            f"Provider '{self.provider}' is rate limited, backing off for {retry_after:.1f}s"
+        )
+
+    def record_success(self) -> None:
+        self._consecutive_rate_limits = 0
+
+    async def _enqueue(
+        self, priority: Priority, tokens: int, scope: AdmissionScope | None
+    ) -> None:
+        if len(self._waiters) >= self.max_queue:
+            self._counters["rejected"] += 1
+            raise AdmissionRejected(
+                f"Too many requests waiting for provider '{self.provider}'"
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._sequence), tokens, future]
+        heapq.heappush(self._waiters, entry)
+        self._counters["queued"] += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        start = time.perf_counter()
+        if scope and scope.on_queued:
+            try:
+                await scope.on_queued(
+                    {
+                        "provider": self.provider,
+                        "position": sum(1 for waiter in self._waiters if waiter < entry)
+                        + 1,
+                    }
+                )
+            except Exception as e:
+                logger.warning(f"Couldn't notify a queued request: {e}")
+
+        # Cancelling the caller cancels the future too, so the dispatcher skips it.
+        await future
+        self._waits_ms.append((time.perf_counter() - start) * 1000)
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            wait = self._wait_time(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            heapq.heappop(self._waiters)
+            self._admit(tokens)
+            future.set_result(None)
+
+    def _count_tokens(self, messages: Sequence[BaseMessage]) -> int:
+        if self._tokens is None:
+            return 0
+
+        return (
+            count_message_tokens(messages, self.provider)
+            + settings.LLM_EXPECTED_OUTPUT_TOKENS
+        )
+
+    def _wait_time(self, tokens: int) -> float:
+        wait = self._blocked_until - time.monotonic()
+        if self._requests is not None:
+            wait = max(wait, self._requests.wait_time(1))
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.wait_time(tokens))
+
+        return max(0.0, wait)
+
+    def _admit(self, tokens: int) -> None:
+        if self._requests is not None:
+            self._requests.consume(1)
+        if self._tokens is not None:
+            self._tokens.consume(tokens)
+        self._counters["admitted"] += 1
+
+    def get_stats(self) -> dict:
+        """Admission counters, limits and queueing delays of the provider."""
+
+        waits = sorted(self._waits_ms)
+
+        def percentile(p: float) -> float | None:
+            if not waits:
+                return None
+            return round(waits[int(p * (len(waits) - 1))], 1)
+
+        return {
+            **self._counters,
+            "waiting": sum(1 for waiter in self._waiters if not waiter[3].done()),
+            "limits": {
+                "requests_per_minute": self._requests.capacity
+                if self._requests
+                else None,
+                "tokens_per_minute": self._tokens.capacity if self._tokens else None,
+            },
+            "blocked_for_s": round(max(0.0, self._blocked_until - time.monotonic()), 1),
+            "wait_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": percentile(1.0),
+            },
+        }
+
+
+_schedulers: dict[str, ProviderScheduler] = {}
+
+
+def get_provider_scheduler(provider: str) -> ProviderScheduler:
+    """Get the scheduler of a provider, configured from LLM_RATE_LIMITS."""
+
+    if provider not in _schedulers:
+        limits = settings.LLM_RATE_LIMITS.get(provider, {})
+        _schedulers[provider] = ProviderScheduler(
+            provider,
+            requests_per_minute=limits.get("rpm", 0),
+            tokens_per_minute=limits.get("tpm", 0),
+            max_queue=settings.LLM_ADMISSION_MAX_QUEUE,
+        )
+
+    return _schedulers[provider]
+
+
+def get_admission_stats() -> dict[str, dict]:
+    """Get the admission stats of every provider that received requests."""
+
+    return {
+        provider: scheduler.get_stats() for provider, scheduler in _schedulers.items()
+    }
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether a provider error is a rate limit (HTTP 429) error."""
+
+    status_code = getattr(error, "status_code", None) or getattr(
+        getattr(error, "response", None), "status_code", None
+    )
+    if status_code == 429:
+        return True
+
+    return type(error).__name__ in ("RateLimitError", "ResourceExhausted")
+
+
+def get_retry_after(error: Exception) -> float | None:
+    """Get the Retry-After delay of a rate limit error, in seconds, if any."""
+
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
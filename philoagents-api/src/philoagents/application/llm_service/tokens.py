@@ -0,0 +1,82 @@
+"""Local token counting for chat messages, used to budget the conversation context."""
+
+from functools import lru_cache
+from typing import Callable, Sequence
+
+from langchain_core.messages import BaseMessage
+
+from philoagents.config import settings
+
+# Approximate per-message overhead of chat formats (role, separators).
+MESSAGE_TOKEN_OVERHEAD = 4
+
+# Average characters per token of the local estimator.
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str, provider: str | None = None) -> int:
+    """
+    Count the tokens of a text with the provider's tokenizer.
+
+    Providers without a local tokenizer use a fast character-based estimator.
+
+    Args:
+        text: Text to count the tokens of
+        provider: Override default provider (groq, gemini, openai, anthropic)
+
+    Returns:
+        int: Number of tokens
+    """
+    return _get_tokenizer((provider or settings.LLM_PROVIDER).lower())(text)
+
+
+def count_message_tokens(
+    messages: BaseMessage | Sequence[BaseMessage], provider: str | None = None
+) -> int:
+    """
+    Count the tokens of one or more chat messages.
+
+    Args:
+        messages: Message or messages to count the tokens of
+        provider: Override default provider (groq, gemini, openai, anthropic)
+
+    Returns:
+        int: Number of tokens, including the per-message overhead
+    """
+    if isinstance(messages, BaseMessage):
+        messages = [messages]
+
+    total = 0
+    for message in messages:
+        content = message.content
+        if not isinstance(content, str):
+            content = str(content)
+        total += count_tokens(content, provider) + MESSAGE_TOKEN_OVERHEAD
+
+    return total
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens of a text from its length."""
+
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@lru_cache(maxsize=8)
+def _get_tokenizer(provider: str) -> Callable[[str], int]:
+    # OpenAI models and the Llama 3 models served by Groq use tiktoken-style BPEs.
+    # Anthropic and Gemini only count tokens remotely, so they use the estimator.
+    if provider not in ("openai", "groq"):
+        return estimate_tokens
+
+    try:
+        import tiktoken
+
+        # The first use may have to download the encoding.
+        encoding = tiktoken.get_encoding(
+            "o200k_base" if provider == "openai" else "cl100k_base"
+        )
+    except Exception:
+        return estimate_tokens
+
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
@@ -169,6 +169,28 @@ Il colpevole è Nicolò, che in realtà è Bobby, il rapitore che ha manipolato
 Sei un easter egg divertente che aiuta chi è in difficoltà.""",
 }
 
+# Answers accepted for the riddle of each character, and the letter it gives
+PHILOSOPHER_RIDDLES = {
+    "akane": {
+        "letter": "B",
+        "answers": ("BARA", "CASSA DA MORTO", "FERETRO", "COFFIN"),
+    },
+    "hiroshi": {"letter": "O", "answers": ("CHIODO", "BULLONE", "NAIL")},
+    "ryo": {
+        "letter": "B",
+        "answers": ("RICCIO", "PORCOSPINO", "ISTRICE", "HEDGEHOG"),
+    },
+    "mei": {
+        "letter": "B",
+        "answers": ("LETTERA", "EMAIL", "MESSAGGIO", "POSTA", "LETTER"),
+    },
+    "kaito": {"letter": "Y", "answers": ("ANCORA", "ANCHOR")},
+}
+
+# Saying the kidnapper's name to the guide wins the game
+VICTORY_PHILOSOPHER = "nicolo"
+VICTORY_NAME = "BOBBY"
+
 AVAILABLE_PHILOSOPHERS = list(PHILOSOPHER_NAMES.keys())
 
 
@@ -1,47 +1,110 @@
-import opik
+import json
+import os
+import threading
+import time
+
 from loguru import logger
 
 from philoagents.config import settings
 
+_prompts: list["Prompt"] = []
+_sync_thread: threading.Thread | None = None
+
 
 class Prompt:
+    """A versioned prompt that never blocks on Opik.
+
+    The prompt serves its local definition, and `sync_prompts_in_background`
+    registers it in Opik under its versioned name (e.g., `summary_prompt_v1`).
+    With PROMPT_USE_OPIK_LIBRARY, the prompt instead resolves from a local on-disk
+    cache of the library version, refreshed by the background sync for the next
+    start, and falls back to the local definition.
+    """
+
     def __init__(self, name: str, prompt: str) -> None:
+        start = time.perf_counter()
+
         # Add version suffix from environment variable
         versioned_name = f"{name}_{settings.PROMPT_VERSION}"
         self.name = versioned_name
         self._local_prompt = prompt
 
+        cached_prompt = (
+            self.__read_cache() if settings.PROMPT_USE_OPIK_LIBRARY else None
+        )
+        if cached_prompt is not None:
+            self.__prompt = cached_prompt
+            self.source = "cache"
+        else:
+            self.__prompt = prompt
+            self.source = "local"
+
+        self.resolution_time_ms = (time.perf_counter() - start) * 1000
+        _prompts.append(self)
+
+    @property
+    def prompt(self) -> str:
+        return self.__prompt
+
+    @property
+    def cache_path(self) -> str:
+        return os.path.join(settings.PROMPT_CACHE_DIR, f"{self.name}.json")
+
+    def sync_with_opik(self) -> None:
+        """Register the local prompt in Opik, or cache the library version locally
+        with PROMPT_USE_OPIK_LIBRARY.
+
+        This makes network calls, so it must run outside of the request path.
+        """
+        import opik
+
         try:
             client = opik.Opik()
-            
-            # Try to get existing prompt
+
             try:
-                existing_prompt = client.get_prompt(name=versioned_name)
-                # If it exists but content is different, we need to use the new version
-                if existing_prompt.prompt != prompt:
+                library_prompt = client.get_prompt(name=self.name)
+            except Exception:
+                library_prompt = None
+
+            if library_prompt is None or not settings.PROMPT_USE_OPIK_LIBRARY:
+                if (
+                    library_prompt is not None
+                    and library_prompt.prompt != self._local_prompt
+                ):
                     logger.warning(
-                        f"⚠️  Prompt '{versioned_name}' exists in Opik but with different content. "
-                        f"Opik will use the version from the library. To update, increment PROMPT_VERSION."
+                        f"⚠️  Prompt '{self.name}' exists in Opik but with different content. "
+                        f"Serving the local prompt and registering it in Opik. "
+                        f"Set PROMPT_USE_OPIK_LIBRARY to serve the library version."
                     )
-                self.__prompt = opik.Prompt(name=versioned_name, prompt=prompt)
-            except Exception:
-                # Prompt doesn't exist, create new one
-                self.__prompt = opik.Prompt(name=versioned_name, prompt=prompt)
-                
-            logger.info(f"✅ Prompt '{versioned_name}' initialized with Opik")
+                library_prompt = opik.Prompt(name=self.name, prompt=self._local_prompt)
+            elif library_prompt.prompt != self._local_prompt:
+                logger.warning(
+                    f"⚠️  Prompt '{self.name}' exists in Opik but with different content. "
+                    f"The version from the library will be served from the next start."
+                )
+
+            if settings.PROMPT_USE_OPIK_LIBRARY:
+                self.__write_cache(library_prompt.prompt)
+            logger.info(f"✅ Prompt '{self.name}' synced with Opik")
         except Exception as e:
             logger.warning(
-                f"⚠️  Can't use Opik for prompt '{versioned_name}': {str(e)}. "
-                f"Falling back to local prompt."
+                f"⚠️  Can't sync prompt '{self.name}' with Opik: {str(e)}. "
+                f"Using the {self.source} prompt."
             )
-            self.__prompt = prompt
 
-    @property
-    def prompt(self) -> str:
-        if isinstance(self.__prompt, opik.Prompt):
-            return self.__prompt.prompt
-        else:
-            return self.__prompt
+    def __read_cache(self) -> str | None:
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)["prompt"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def __write_cache(self, prompt: str) -> None:
+        os.makedirs(settings.PROMPT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"name": self.name, "prompt": prompt}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
 
     def __str__(self) -> str:
         return self.prompt
@@ -50,6 +113,34 @@ class Prompt:
         return self.__str__()
 
 
+def sync_prompts_in_background() -> None:
+    """Sync all the prompts with Opik from a daemon thread, once per process."""
+
+    global _sync_thread
+
+    if _sync_thread is not None:
+        return
+
+    def sync() -> None:
+        for prompt in list(_prompts):
+            prompt.sync_with_opik()
+
+    _sync_thread = threading.Thread(target=sync, name="opik-prompt-sync", daemon=True)
+    _sync_thread.start()
+
+
+def get_prompt_resolution_report() -> dict:
+    """Report where each prompt was resolved from and how long it took."""
+
+    return {
+        "total_ms": round(sum(p.resolution_time_ms for p in _prompts), 3),
+        "prompts": {
+            p.name: {"source": p.source, "ms": round(p.resolution_time_ms, 3)}
+            for p in _prompts
+        },
+    }
+
+
 # ===== PROMPTS =====
 
 # --- Philosophers ---
@@ -115,6 +206,34 @@ PHILOSOPHER_CHARACTER_CARD = Prompt(
     prompt=__PHILOSOPHER_CHARACTER_CARD,
 )
 
+# --- Answer hints ---
+
+__RIDDLE_SOLVED_HINT = """
+---
+
+⚠️ Il giocatore ha appena risolto il tuo enigma con la risposta "{{answer}}".
+La risposta è CORRETTA: reagisci come da tuo comportamento e dagli la lettera {{letter}}.
+"""
+
+RIDDLE_SOLVED_HINT = Prompt(
+    name="riddle_solved_hint",
+    prompt=__RIDDLE_SOLVED_HINT,
+)
+
+__VICTORY_HINT = """
+---
+
+⚠️ Il giocatore ha appena scoperto il nome del rapitore: {{victory_name}}.
+La vittoria è già stata attivata, NON chiamare strumenti. Ora rivela la verità: scoppia a
+ridere in modo inquietante, ammetti di essere tu {{victory_name}}, il vero rapitore, e
+congratulati con il giocatore per aver risolto il mistero!
+"""
+
+VICTORY_HINT = Prompt(
+    name="victory_hint",
+    prompt=__VICTORY_HINT,
+)
+
 # --- Summary ---
 
 __SUMMARY_PROMPT = """Create a summary of the conversation between {{philosopher_name}} and the user.
@@ -136,4 +255,3 @@ EXTEND_SUMMARY_PROMPT = Prompt(
     name="extend_summary_prompt",
     prompt=__EXTEND_SUMMARY_PROMPT,
 )
-
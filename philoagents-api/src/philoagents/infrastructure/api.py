@@ -1,10 +1,17 @@
+import os
+import re
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from opik.integrations.langchain import OpikTracer
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import orjson
+from loguru import logger
+from pydantic import BaseModel, Field, ValidationError
 
+from philoagents.application.conversation_service.batch_response import (
+    get_batch_responses,
+)
 from philoagents.application.conversation_service.generate_response import (
     get_response,
     get_streaming_response,
@@ -12,22 +19,51 @@ from philoagents.application.conversation_service.generate_response import (
 )
 from philoagents.application.conversation_service.reset_conversation import (
     reset_conversation_state,
+    reset_conversations,
+)
+from philoagents.application.conversation_service.runtime import (
+    close_conversation_runtime,
+    get_conversation_runtime,
+    start_conversation_runtime,
+)
+from philoagents.application.conversation_service.workflow.chains import (
+    get_prompt_cache_options,
+)
+from philoagents.application.conversation_service.workflow.context_window import (
+    get_context_window,
 )
+from philoagents.application.llm_service.scheduler import (
+    AdmissionRejected,
+    admission_scope,
+    get_admission_stats,
+)
+from philoagents.config import settings
 from philoagents.domain.philosopher_factory import PhilosopherFactory
+from philoagents.domain.prompts import (
+    get_prompt_resolution_report,
+    sync_prompts_in_background,
+)
 
-from .opik_utils import configure
-
-configure()
+from . import draining, metrics, opik_utils
+from .mongo import WriteBehindMongoDBSaver
+from .streaming import STREAMING_MODES, coalesce_chunks, send_json
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles startup and shutdown events for the API."""
-    # Startup code (if any) goes here
+    opik_utils.configure()
+
+    prompt_report = get_prompt_resolution_report()
+    logger.info(
+        f"Resolved {len(prompt_report['prompts'])} prompts in {prompt_report['total_ms']}ms"
+    )
+    sync_prompts_in_background()
+
+    await start_conversation_runtime()
     yield
-    # Shutdown code goes here
-    opik_tracer = OpikTracer()
-    opik_tracer.flush()
+    await close_conversation_runtime()
+    await opik_utils.aflush()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -39,6 +75,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.get("/health")
+async def health():
+    """Check that the worker serving the request is up, and whether it's draining."""
+    return {
+        "status": "draining" if draining.is_draining() else "ok",
+        "worker_pid": os.getpid(),
+    }
 
 
 @app.get("/debug/prompt-config")
@@ -53,6 +100,7 @@ async def debug_prompt_config():
 
     return {
         "prompt_version_env": settings.PROMPT_VERSION,
+        "resolution": get_prompt_resolution_report(),
         "prompts": {
             "philosopher_character_card": {
                 "name": PHILOSOPHER_CHARACTER_CARD.name,
@@ -67,9 +115,94 @@ async def debug_prompt_config():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Get the latency histograms and counters, in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+
+    return PlainTextResponse(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/stats/summarization")
+async def get_summarization_stats():
+    """Get background summarization counters and the latency removed from turns."""
+    runtime = await get_conversation_runtime()
+    if runtime.summarizer is None:
+        return {"mode": "inline"}
+
+    return {"mode": "background", **runtime.summarizer.get_stats()}
+
+
+@app.get("/stats/response-cache")
+async def get_response_cache_stats():
+    """Get hit/miss counters of the cache of replies to opening messages."""
+    runtime = await get_conversation_runtime()
+    if runtime.response_cache is None:
+        return {"enabled": False}
+
+    return {"enabled": True, **runtime.response_cache.get_stats()}
+
+
+@app.get("/stats/checkpoints")
+async def get_checkpoint_stats():
+    """Get the counters of the write-behind checkpoint buffer."""
+    runtime = await get_conversation_runtime()
+    if not isinstance(runtime.checkpointer, WriteBehindMongoDBSaver):
+        return {"mode": settings.CHECKPOINTER_BACKEND}
+
+    return {"mode": "write_behind", **runtime.checkpointer.get_stats()}
+
+
+@app.get("/stats/checkpoint-retention")
+async def get_checkpoint_retention_stats():
+    """Get the documents and bytes reclaimed by the checkpoint retention passes."""
+    runtime = await get_conversation_runtime()
+    if runtime.retention is None:
+        return {"enabled": False}
+
+    return {
+        "enabled": settings.CHECKPOINT_RETENTION_ENABLED,
+        **runtime.retention.get_stats(),
+    }
+
+
+@app.get("/stats/tracing")
+async def get_tracing_stats():
+    """Get the Opik sampling configuration and the runs traced or skipped."""
+    return opik_utils.get_stats()
+
+
+@app.get("/stats/prompt-cache")
+async def get_prompt_cache_stats():
+    """Get the layout of the character cards and the prompt tokens read from cache."""
+    return {**get_prompt_cache_options(), **metrics.get_prompt_cache_stats()}
+
+
+@app.get("/stats/context-window")
+async def get_context_window_stats():
+    """Get the history tokens sent to the model and the tokens saved by trimming."""
+    context_window = get_context_window()
+    if context_window is None:
+        return {"enabled": False}
+
+    return {"enabled": True, **context_window.get_stats()}
+
+
+@app.get("/stats/admission")
+async def get_provider_admission_stats():
+    """Get admission counters, rate limits and queueing delays of the providers."""
+    return {
+        "enabled": bool(settings.LLM_RATE_LIMITS),
+        "providers": get_admission_stats(),
+    }
+
+
 @app.get("/models/current")
 async def get_current_model():
-    """Get currently configured LLM provider and models."""
+    """Get currently configured LLM provider and models, and the failover routing."""
+    from philoagents.application.llm_service.model_factory import get_fallback_routes
+    from philoagents.application.llm_service.routing import get_provider_router
     from philoagents.config import settings
 
     return {
@@ -77,7 +210,20 @@ async def get_current_model():
         "models": {
             "main": settings.LLM_MODEL,
             "summary": settings.LLM_MODEL_SUMMARY,
-        }
+        },
+        "routing": {
+            "enabled": bool(settings.LLM_FALLBACK_PROVIDERS),
+            "fallbacks": [
+                {"provider": provider, "model": model_name}
+                for provider, model_name in get_fallback_routes()
+            ],
+            "summary_fallbacks": [
+                {"provider": provider, "model": model_name}
+                for provider, model_name in get_fallback_routes("summary")
+            ],
+            "hedging": settings.LLM_HEDGING_ENABLED,
+            **get_provider_router().get_stats(),
+        },
     }
 
 
@@ -128,13 +274,17 @@ async def list_available_providers():
 
 
 @app.post("/models/test")
-async def test_model_provider(provider: str, model: str | None = None):
+async def test_model_provider(
+    provider: str, model: str | None = None, invalidate: bool = False
+):
     """
     Test if a provider is working correctly.
 
     Args:
         provider: Provider name (groq, gemini, openai, anthropic)
         model: Optional specific model name to test
+        invalidate: Drop the provider's memoized models so conversations pick up
+            fresh instances (e.g., after a configuration change)
 
     Returns:
         Test results including a sample response
@@ -142,15 +292,22 @@ async def test_model_provider(provider: str, model: str | None = None):
     Raises:
         HTTPException: If the provider test fails
     """
-    from philoagents.application.llm_service.model_factory import get_chat_model
+    from philoagents.application.llm_service.model_factory import (
+        get_chat_model,
+        invalidate_model_registry,
+    )
     from langchain_core.messages import HumanMessage
 
     try:
-        # Create model instance
+        if invalidate:
+            invalidate_model_registry(provider)
+
+        # Always test a fresh instance, not a memoized one
         chat_model = get_chat_model(
             temperature=0.7,
             model_name=model,
-            provider=provider
+            provider=provider,
+            use_cache=False,
         )
 
         # Test with simple Italian message (since prompts are in Italian)
@@ -170,56 +327,205 @@ async def test_model_provider(provider: str, model: str | None = None):
         )
 
 
+SESSION_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
+
 class ChatMessage(BaseModel):
     message: str
     philosopher_id: str
+    session_id: str | None = Field(
+        default=None,
+        pattern=SESSION_ID_PATTERN,
+        description="Player session id. Without it, the philosopher's shared thread is used.",
+    )
 
 
 @app.post("/chat")
 async def chat(chat_message: ChatMessage):
+    session_id = chat_message.session_id
+
     try:
         philosopher_factory = PhilosopherFactory()
         philosopher = philosopher_factory.get_philosopher(chat_message.philosopher_id)
 
-        response, _ = await get_response(
-            messages=chat_message.message,
-            philosopher_id=chat_message.philosopher_id,
-            philosopher_name=philosopher.name,
-            philosopher_perspective=philosopher.perspective,
-            philosopher_style=philosopher.style,
-        )
-        return {"response": response}
+        with (
+            draining.turn_in_flight(),
+            opik_utils.tracing_scope("/chat"),
+            admission_scope(),
+        ):
+            response, _ = await get_response(
+                messages=chat_message.message,
+                philosopher_id=chat_message.philosopher_id,
+                philosopher_name=philosopher.name,
+                philosopher_perspective=philosopher.perspective,
+                philosopher_style=philosopher.style,
+                session_id=session_id,
+            )
+        return {"response": response, "session_id": session_id}
     except Exception as e:
-        opik_tracer = OpikTracer()
-        opik_tracer.flush()
+        opik_utils.flush_in_background()
 
-        raise HTTPException(status_code=500, detail=str(e))
+        status_code = 503 if isinstance(e.__cause__, AdmissionRejected) else 500
+        raise HTTPException(status_code=status_code, detail=str(e))
+
+
+class BatchChatItem(BaseModel):
+    id: str | None = Field(
+        default=None, description="Caller-defined id, returned with the result."
+    )
+    philosopher_id: str
+    messages: str | list[str] | list[dict[str, str]] = Field(
+        description="Player message, or messages, of the turn."
+    )
+    session_id: str | None = Field(
+        default=None,
+        pattern=SESSION_ID_PATTERN,
+        description=(
+            "Session of the thread. Without it, the philosopher's shared thread is "
+            "used. Items of the same thread run in order."
+        ),
+    )
+    new_thread: bool = Field(
+        default=False, description="Run the item on a new thread of its own."
+    )
+
+
+class BatchChatRequest(BaseModel):
+    items: list[BatchChatItem] = Field(
+        min_length=1, max_length=settings.CHAT_BATCH_MAX_ITEMS
+    )
+    max_concurrency: int = Field(
+        default=settings.CHAT_BATCH_MAX_CONCURRENCY,
+        ge=1,
+        le=settings.CHAT_BATCH_MAX_CONCURRENCY,
+        description="Maximum number of threads answered at once.",
+    )
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest):
+    """Run many turns concurrently, streaming a JSON line per item as it completes.
+
+    Each line has the "index", "id", "philosopher_id" and "session_id" of its item,
+    then "response" and "game_event", or "error" if the item failed. A failed item
+    doesn't stop the others.
+    """
+
+    async def result_lines():
+        with draining.turn_in_flight(), opik_utils.tracing_scope("/chat/batch"):
+            async for result in get_batch_responses(
+                [item.model_dump() for item in request.items],
+                max_concurrency=request.max_concurrency,
+            ):
+                yield orjson.dumps(result) + b"\n"
+
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+
+class CoalescingOptions(BaseModel):
+    coalesce_ms: float = Field(
+        default=settings.WS_COALESCE_INTERVAL_MS,
+        gt=0,
+        le=1000,
+        description="Maximum time a chunk is buffered, in milliseconds.",
+    )
+    coalesce_bytes: int = Field(
+        default=settings.WS_COALESCE_MAX_BYTES,
+        ge=1,
+        le=65536,
+        description="Buffered bytes that trigger a flush.",
+    )
 
 
 @app.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket):
     await websocket.accept()
 
+    # Negotiated with the first message of the connection.
+    streaming_options: dict | None = None
+
     try:
         while True:
-            data = await websocket.receive_json()
+            data = orjson.loads(await websocket.receive_text())
+
+            if draining.is_draining():
+                # The client reconnects, to another worker or instance.
+                await send_json(websocket, {"error": "The server is restarting."})
+                await websocket.close(code=1012)
+                return
 
             if "message" not in data or "philosopher_id" not in data:
-                await websocket.send_json(
+                await send_json(
+                    websocket,
                     {
                         "error": "Invalid message format. Required fields: 'message' and 'philosopher_id'"
-                    }
+                    },
+                )
+                continue
+
+            # Without a session id, the philosopher's shared thread is used.
+            session_id = data.get("session_id")
+            if session_id is not None and (
+                not isinstance(session_id, str)
+                or not re.match(SESSION_ID_PATTERN, session_id)
+            ):
+                await send_json(
+                    websocket,
+                    {
+                        "error": "Invalid 'session_id'. Use 1-64 letters, digits, '_' or '-'."
+                    },
                 )
                 continue
 
+            if streaming_options is None:
+                try:
+                    coalescing = CoalescingOptions.model_validate(
+                        {
+                            key: data[key]
+                            for key in ("coalesce_ms", "coalesce_bytes")
+                            if key in data
+                        }
+                    )
+                except ValidationError:
+                    coalescing = CoalescingOptions()
+                    await send_json(
+                        websocket,
+                        {
+                            "error": "Invalid 'coalesce_ms' or 'coalesce_bytes'. Use 0 < coalesce_ms <= 1000 "
+                            "and 1 <= coalesce_bytes <= 65536. Using the defaults."
+                        },
+                    )
+                streaming_options = {
+                    "mode": data.get("streaming_mode", settings.WS_STREAMING_MODE),
+                    **coalescing.model_dump(),
+                }
+                if streaming_options["mode"] not in STREAMING_MODES:
+                    await send_json(
+                        websocket,
+                        {
+                            "error": f"Invalid 'streaming_mode'. Supported modes: {', '.join(STREAMING_MODES)}. "
+                            f"Using '{settings.WS_STREAMING_MODE}'."
+                        },
+                    )
+                    streaming_options["mode"] = settings.WS_STREAMING_MODE
+
+            async def notify_queued(queue_info: dict) -> None:
+                # No "streaming" key: the UI would take it as a streaming update.
+                await send_json(websocket, {"queued": True, **queue_info})
+
             try:
                 philosopher_factory = PhilosopherFactory()
                 philosopher = philosopher_factory.get_philosopher(
                     data["philosopher_id"]
                 )
 
-                # Create state holder to capture game_event after streaming
-                state_holder = StreamingResponseWithState()
+                async def notify_game_event(game_event: str) -> None:
+                    # Sent mid-stream, so the game reacts before the reply ends.
+                    await send_json(websocket, {"game_event": game_event})
+
+                state_holder = StreamingResponseWithState(
+                    on_game_event=notify_game_event
+                )
 
                 # Use streaming response instead of get_response
                 response_stream = get_streaming_response(
@@ -229,37 +535,90 @@ async def websocket_chat(websocket: WebSocket):
                     philosopher_perspective=philosopher.perspective,
                     philosopher_style=philosopher.style,
                     state_holder=state_holder,
+                    session_id=session_id,
                 )
+                if streaming_options["mode"] == "coalesced":
+                    response_stream = coalesce_chunks(
+                        response_stream,
+                        max_bytes=streaming_options["coalesce_bytes"],
+                        interval_ms=streaming_options["coalesce_ms"],
+                    )
 
                 # Send initial message to indicate streaming has started
-                await websocket.send_json({"streaming": True})
+                await send_json(
+                    websocket,
+                    {
+                        "streaming": True,
+                        "session_id": session_id,
+                        "streaming_mode": streaming_options["mode"],
+                    },
+                )
 
                 # Stream each chunk of the response
-                full_response = ""
-                async for chunk in response_stream:
-                    full_response += chunk
-                    await websocket.send_json({"chunk": chunk})
-
-                # Include game_event in final response if present
-                final_response = {"response": full_response, "streaming": False}
-                if state_holder.game_event:
-                    final_response["game_event"] = state_holder.game_event
-
-                await websocket.send_json(final_response)
+                chunks = []
+                with (
+                    draining.turn_in_flight(),
+                    opik_utils.tracing_scope("/ws/chat"),
+                    admission_scope(on_queued=notify_queued),
+                ):
+                    async for chunk in response_stream:
+                        chunks.append(chunk)
+                        await send_json(websocket, {"chunk": chunk})
+
+                    await send_json(
+                        websocket, {"response": "".join(chunks), "streaming": False}
+                    )
 
             except Exception as e:
-                opik_tracer = OpikTracer()
-                opik_tracer.flush()
+                opik_utils.flush_in_background()
+
+                await send_json(websocket, {"error": str(e)})
 
-                await websocket.send_json({"error": str(e)})
+            if draining.is_draining():
+                await websocket.close(code=1012)
+                return
 
     except WebSocketDisconnect:
         pass
 
 
+class ResetConversationRequest(BaseModel):
+    session_id: str | None = Field(
+        default=None,
+        pattern=SESSION_ID_PATTERN,
+        description="Player whose conversations are deleted.",
+    )
+    philosopher_id: str | None = Field(
+        default=None, description="Character whose conversations are deleted."
+    )
+
+
+@app.post("/reset-conversation")
+async def reset_conversation_threads(request: ResetConversationRequest):
+    """Deletes the conversations of a player, of a character, or of a player with a
+    character, keeping all the others.
+
+    Raises:
+        HTTPException: If no target is given, or if the conversations can't be deleted.
+    Returns:
+        dict: The number of threads, checkpoints and writes deleted.
+    """
+    if request.session_id is None and request.philosopher_id is None:
+        raise HTTPException(
+            status_code=400, detail="A session_id or a philosopher_id is required."
+        )
+
+    try:
+        return await reset_conversations(
+            session_id=request.session_id, philosopher_id=request.philosopher_id
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/reset-memory")
 async def reset_conversation():
-    """Resets the conversation state. It deletes the two collections needed for keeping LangGraph state in MongoDB.
+    """Resets the conversation state of every player. It deletes the two collections needed for keeping LangGraph state in MongoDB.
 
     Raises:
         HTTPException: If there is an error resetting the conversation state.
@@ -0,0 +1,51 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Conversation turns being answered by this process.
+_turns_in_flight = 0
+_draining = False
+
+
+@contextmanager
+def turn_in_flight() -> Iterator[None]:
+    """Mark a conversation turn as in flight for the duration of the block."""
+
+    global _turns_in_flight
+
+    _turns_in_flight += 1
+    try:
+        yield
+    finally:
+        _turns_in_flight -= 1
+
+
+def is_draining() -> bool:
+    """Whether the process is shutting down and no longer starts new turns."""
+
+    return _draining
+
+
+def get_turns_in_flight() -> int:
+    return _turns_in_flight
+
+
+async def drain(timeout: float) -> int:
+    """Stop starting new turns and wait for the ones in flight to complete.
+
+    Args:
+        timeout: Maximum time to wait, in seconds.
+
+    Returns:
+        int: Turns still in flight when the wait ended (0 if all completed).
+    """
+
+    global _draining
+
+    _draining = True
+    deadline = time.monotonic() + timeout
+    while _turns_in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+    return _turns_in_flight
@@ -0,0 +1,447 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Iterable
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from pymongo import monitoring
+
+# Content type of the Prometheus text exposition format.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _Metric:
+    """Labelled series of a metric, rendered in the Prometheus text format.
+
+    Args:
+        name (str): Name of the metric.
+        documentation (str): Description, rendered as the HELP line.
+        labelnames (tuple[str, ...]): Names of the labels of every series.
+    """
+
+    type_name = ""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, ...], Any] = {}
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: tuple[str, ...], **extra: str) -> str:
+        pairs = [*zip(self.labelnames, key), *extra.items()]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            yield from self._render_series(key, value)
+
+    def _render_series(self, key: tuple[str, ...], value: Any) -> Iterable[str]:
+        yield f"{self.name}{self._labels(key)} {_format(value)}"
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def total(self) -> float:
+        """Sum of all the series."""
+
+        with self._lock:
+            return sum(self._series.values())
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Histogram with cumulative buckets, as expected by `histogram_quantile`.
+
+    Args:
+        buckets (tuple[float, ...]): Upper bounds of the buckets, in increasing order.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One count per bucket, plus +Inf, then the sum.
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def _render_series(self, key: tuple[str, ...], value: Any) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), value[:-1]):
+            cumulative += count
+            labels = self._labels(key, le=_format(bound))
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        yield f"{self.name}_sum{self._labels(key)} {_format(value[-1])}"
+        yield f"{self.name}_count{self._labels(key)} {cumulative}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+NODE_DURATION = Histogram(
+    "philoagents_node_duration_seconds",
+    "Duration of the LangGraph nodes.",
+    ("node",),
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "philoagents_llm_time_to_first_token_seconds",
+    "Time from the LLM request to the first streamed token.",
+    ("provider", "model"),
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "philoagents_llm_tokens_per_second",
+    "Output tokens per second of the LLM generations, after the first token.",
+    ("provider", "model"),
+    buckets=THROUGHPUT_BUCKETS,
+)
+LLM_ERRORS = Counter(
+    "philoagents_llm_errors_total",
+    "LLM requests that failed.",
+    ("provider", "model"),
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "philoagents_mongo_command_duration_seconds",
+    "Duration of the MongoDB commands, e.g. the checkpoint reads and writes.",
+    ("collection", "command"),
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "philoagents_http_request_duration_seconds",
+    "Duration of the HTTP requests.",
+    ("method", "route", "status"),
+)
+ACTIVE_WEBSOCKETS = Gauge(
+    "philoagents_active_websockets",
+    "WebSocket connections currently open.",
+)
+SUMMARIES = Counter(
+    "philoagents_summaries_total",
+    "Conversation summaries generated, inline or in the background.",
+    ("mode",),
+)
+LLM_INPUT_TOKENS = Counter(
+    "philoagents_llm_input_tokens_total",
+    "Prompt tokens sent to the LLM providers, including the cached ones.",
+    ("provider", "model"),
+)
+LLM_CACHE_READ_TOKENS = Counter(
+    "philoagents_llm_cache_read_tokens_total",
+    "Prompt tokens read from the provider's prompt cache.",
+    ("provider", "model"),
+)
+LLM_CACHE_CREATION_TOKENS = Counter(
+    "philoagents_llm_cache_creation_tokens_total",
+    "Prompt tokens written to the provider's prompt cache.",
+    ("provider", "model"),
+)
+
+_METRICS: tuple[_Metric, ...] = (
+    NODE_DURATION,
+    LLM_TIME_TO_FIRST_TOKEN,
+    LLM_TOKENS_PER_SECOND,
+    LLM_ERRORS,
+    MONGO_COMMAND_DURATION,
+    HTTP_REQUEST_DURATION,
+    ACTIVE_WEBSOCKETS,
+    SUMMARIES,
+    LLM_INPUT_TOKENS,
+    LLM_CACHE_READ_TOKENS,
+    LLM_CACHE_CREATION_TOKENS,
+)
+
+
+def render_metrics() -> str:
+    """Render all the metrics in the Prometheus text exposition format."""
+
+    return "\n".join(line for metric in _METRICS for line in metric.render()) + "\n"
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Records the durations of the graph nodes and the LLM latencies of every turn.
+
+    The handler runs inline on the event loop and only stores timestamps, so its cost
+    is a few dictionary operations per node and per token.
+    """
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self._nodes: dict[UUID, tuple[str, float]] = {}
+        # run_id -> [provider, model, start, first token, chunks]
+        self._llm_runs: dict[UUID, list[Any]] = {}
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        # A node runs as the chain named after it; its children share the metadata.
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node and not node.startswith("__"):
+            self._nodes[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self.__end_node(run_id)
+
+    def on_chain_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self.__end_node(run_id)
+
+    def __end_node(self, run_id: UUID) -> None:
+        started = self._nodes.pop(run_id, None)
+        if started is None:
+            return
+
+        node, start = started
+        NODE_DURATION.observe(time.perf_counter() - start, node=node)
+        if node == "summarize_conversation_node":
+            SUMMARIES.inc(mode="inline")
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: Any,
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        metadata = metadata or {}
+        self._llm_runs[run_id] = [
+            metadata.get("ls_provider"),
+            metadata.get("ls_model_name"),
+            time.perf_counter(),
+            None,
+            0,
+        ]
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        llm_run = self._llm_runs.get(run_id)
+        if llm_run is None:
+            return
+
+        if llm_run[3] is None:
+            llm_run[3] = time.perf_counter()
+        llm_run[4] += 1
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        llm_run = self._llm_runs.pop(run_id, None)
+        if llm_run is None:
+            return
+
+        end = time.perf_counter()
+        provider, model, start, first_token, chunks = llm_run
+        message = getattr(response.generations[0][0], "message", None)
+        output_tokens = chunks
+        usage = None
+        if message is not None:
+            # Set by the routing model to the provider that answered.
+            metadata = message.response_metadata
+            provider = metadata.get("routed_provider") or provider
+            model = (
+                metadata.get("routed_model")
+                or metadata.get("model_name")
+                or metadata.get("model")
+                or model
+            )
+            usage = getattr(message, "usage_metadata", None)
+            if usage and usage.get("output_tokens"):
+                output_tokens = usage["output_tokens"]
+
+        labels = {"provider": provider or "unknown", "model": model or "unknown"}
+        if usage:
+            details = usage.get("input_token_details") or {}
+            LLM_INPUT_TOKENS.inc(usage.get("input_tokens", 0), **labels)
+            LLM_CACHE_READ_TOKENS.inc(details.get("cache_read", 0), **labels)
+            LLM_CACHE_CREATION_TOKENS.inc(details.get("cache_creation", 0), **labels)
+        if first_token is not None:
+            LLM_TIME_TO_FIRST_TOKEN.observe(first_token - start, **labels)
+        generation_seconds = end - (first_token if first_token is not None else start)
+        if output_tokens > 1 and generation_seconds > 0:
+            LLM_TOKENS_PER_SECOND.observe(
+                (output_tokens - 1 if first_token is not None else output_tokens)
+                / generation_seconds,
+                **labels,
+            )
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        llm_run = self._llm_runs.pop(run_id, None)
+        if llm_run is not None:
+            LLM_ERRORS.inc(
+                provider=llm_run[0] or "unknown", model=llm_run[1] or "unknown"
+            )
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records the duration of the MongoDB commands, by collection and command."""
+
+    def __init__(self) -> None:
+        self._commands: dict[tuple[Any, int], tuple[str, str]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        command = event.command_name
+        collection = event.command.get(
+            "collection" if command == "getMore" else command
+        )
+        # Commands on the database or the server (e.g. "ping") have no collection.
+        if isinstance(collection, str):
+            self._commands[(event.connection_id, event.request_id)] = (
+                collection,
+                command,
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self.__observe(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self.__observe(event)
+
+    def __observe(
+        self, event: monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent
+    ) -> None:
+        command = self._commands.pop((event.connection_id, event.request_id), None)
+        if command is not None:
+            collection, command_name = command
+            MONGO_COMMAND_DURATION.observe(
+                event.duration_micros / 1_000_000,
+                collection=collection,
+                command=command_name,
+            )
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing the HTTP requests and counting the open WebSockets.
+
+    Requests are labelled with their route template instead of their path, so the
+    number of series stays bounded.
+
+    Args:
+        app: The wrapped ASGI application.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "websocket":
+            ACTIVE_WEBSOCKETS.inc()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                ACTIVE_WEBSOCKETS.dec()
+            return
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+
+
+_callback_handler = MetricsCallbackHandler()
+_mongo_listener = MongoCommandMetrics()
+
+
+def get_prompt_cache_stats() -> dict[str, Any]:
+    """Prompt tokens sent to the providers and the share read from their cache."""
+
+    input_tokens = LLM_INPUT_TOKENS.total()
+    cache_read_tokens = LLM_CACHE_READ_TOKENS.total()
+
+    return {
+        "input_tokens": input_tokens,
+        "cache_read_tokens": cache_read_tokens,
+        "cache_creation_tokens": LLM_CACHE_CREATION_TOKENS.total(),
+        "cache_hit_ratio": cache_read_tokens / input_tokens if input_tokens else None,
+    }
+
+
+def get_callback_handler() -> MetricsCallbackHandler:
+    """Get the callback handler shared by all the graph runs."""
+
+    return _callback_handler
+
+
+def get_mongo_listener() -> MongoCommandMetrics:
+    """Get the command listener shared by all the MongoDB clients."""
+
+    return _mongo_listener
@@ -1,3 +1,17 @@
+from .async_client import (
+    AsyncMongoClientWrapper,
+    close_async_mongo_clients,
+    get_async_mongo_client,
+)
+from .checkpointer import WriteBehindMongoDBSaver
 from .client import MongoClientWrapper
+from .retention import CheckpointRetention
 
-__all__ = ["MongoClientWrapper"]
+__all__ = [
+    "AsyncMongoClientWrapper",
+    "CheckpointRetention",
+    "MongoClientWrapper",
+    "WriteBehindMongoDBSaver",
+    "close_async_mongo_clients",
+    "get_async_mongo_client",
+]
@@ -0,0 +1,284 @@
+from itertools import islice
+from typing import AsyncIterator, Generic, Iterable, Type, TypeVar
+
+from bson import ObjectId
+from loguru import logger
+from pydantic import BaseModel
+from pymongo import AsyncMongoClient, errors
+
+from philoagents.config import settings
+from philoagents.infrastructure.metrics import get_mongo_listener
+
+T = TypeVar("T", bound=BaseModel)
+
+_clients: dict[str, AsyncMongoClient] = {}
+
+
+def get_async_mongo_client(mongodb_uri: str = settings.MONGO_URI) -> AsyncMongoClient:
+    """Get the process-wide async client, and connection pool, of a MongoDB instance.
+
+    Args:
+        mongodb_uri (str, optional): URI for connecting to MongoDB instance.
+            Defaults to value from settings.
+
+    Returns:
+        AsyncMongoClient: A client shared by every caller using the same URI.
+    """
+
+    client = _clients.get(mongodb_uri)
+    if client is None:
+        client = AsyncMongoClient(
+            mongodb_uri,
+            appname="philoagents",
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            event_listeners=[get_mongo_listener()] if settings.METRICS_ENABLED else [],
+        )
+        _clients[mongodb_uri] = client
+
+    return client
+
+
+async def close_async_mongo_clients() -> None:
+    """Close the shared async clients, releasing their connection pools."""
+
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.close()
+
+
+class AsyncMongoClientWrapper(Generic[T]):
+    """Async counterpart of `MongoClientWrapper`, for use inside the event loop.
+
+    Every wrapper uses the shared client of its URI, so creating one is cheap and
+    doesn't open a connection: the pool connects on the first operation. Documents
+    are streamed in batches instead of being loaded all at once, and large ingestions
+    are split into unordered bulk inserts.
+
+    Args:
+        model (Type[T]): The Pydantic model class to use for document serialization.
+        collection_name (str): Name of the MongoDB collection to use.
+        database_name (str, optional): Name of the MongoDB database to use.
+        mongodb_uri (str, optional): URI for connecting to MongoDB instance.
+
+    Attributes:
+        model (Type[T]): The Pydantic model class used for document serialization.
+        collection_name (str): Name of the MongoDB collection.
+        database_name (str): Name of the MongoDB database.
+        client (AsyncMongoClient): Shared async client of `mongodb_uri`.
+        database (AsyncDatabase): Reference to the target MongoDB database.
+        collection (AsyncCollection): Reference to the target MongoDB collection.
+    """
+
+    def __init__(
+        self,
+        model: Type[T],
+        collection_name: str,
+        database_name: str = settings.MONGO_DB_NAME,
+        mongodb_uri: str = settings.MONGO_URI,
+    ) -> None:
+        self.model = model
+        self.collection_name = collection_name
+        self.database_name = database_name
+
+        self.client = get_async_mongo_client(mongodb_uri)
+        self.database = self.client[database_name]
+        self.collection = self.database[collection_name]
+
+    async def __aenter__(self) -> "AsyncMongoClientWrapper":
+        """Enable async context manager support.
+
+        Returns:
+            AsyncMongoClientWrapper: The current instance.
+        """
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Nothing to release: the shared pool is closed by `close_async_mongo_clients`."""
+
+    async def ping(self) -> None:
+        """Check that MongoDB is reachable.
+
+        Raises:
+            errors.PyMongoError: If MongoDB can't be reached.
+        """
+
+        await self.client.admin.command("ping")
+
+    async def clear_collection(self) -> None:
+        """Remove all documents from the collection.
+
+        Raises:
+            errors.PyMongoError: If the deletion operation fails.
+        """
+
+        try:
+            result = await self.collection.delete_many({})
+            logger.debug(
+                f"Cleared collection. Deleted {result.deleted_count} documents."
+            )
+        except errors.PyMongoError as e:
+            logger.error(f"Error clearing the collection: {e}")
+            raise
+
+    async def ingest_documents(
+        self, documents: Iterable[T], chunk_size: int = 1000
+    ) -> int:
+        """Insert documents into the collection, in unordered chunks of `chunk_size`.
+
+        `documents` is consumed lazily, so it can be a generator over a large input.
+        Within a chunk, a failing document doesn't prevent the others from being
+        inserted.
+
+        Args:
+            documents (Iterable[T]): Pydantic model instances to insert.
+            chunk_size (int): Maximum number of documents sent in one bulk insert.
+
+        Returns:
+            int: Number of documents inserted.
+
+        Raises:
+            ValueError: If a document is not a Pydantic model.
+            errors.PyMongoError: If a chunk can't be inserted.
+        """
+
+        inserted = 0
+        documents = iter(documents)
+        while chunk := list(islice(documents, chunk_size)):
+            if not all(isinstance(doc, BaseModel) for doc in chunk):
+                raise ValueError("Documents must be Pydantic models.")
+
+            dict_documents = [doc.model_dump() for doc in chunk]
+            # Remove '_id' fields to avoid duplicate key errors
+            for doc in dict_documents:
+                doc.pop("_id", None)
+
+            try:
+                result = await self.collection.insert_many(
+                    dict_documents, ordered=False
+                )
+            except errors.BulkWriteError as e:
+                inserted += e.details.get("nInserted", 0)
+                logger.error(
+                    f"Error inserting documents: {len(e.details.get('writeErrors', []))} "
+                    f"failed after {inserted} were inserted."
+                )
+                raise
+            except errors.PyMongoError as e:
+                logger.error(f"Error inserting documents: {e}")
+                raise
+            inserted += len(result.inserted_ids)
+
+        logger.debug(f"Inserted {inserted} documents into MongoDB.")
+
+        return inserted
+
+    async def stream_documents(
+        self,
+        query: dict,
+        projection: dict | None = None,
+        limit: int = 0,
+        batch_size: int = 100,
+    ) -> AsyncIterator[list[T]]:
+        """Stream the documents matching a query, parsed into models, in batches.
+
+        Only `batch_size` documents are held in memory at once, however many match.
+
+        Args:
+            query (dict): MongoDB query filter to apply.
+            projection (dict | None): Fields to return (or to leave out). The fields
+                the model requires must be returned.
+            limit (int): Maximum number of documents to return (0 for no limit).
+            batch_size (int): Number of documents fetched and parsed together.
+
+        Yields:
+            list[T]: Up to `batch_size` Pydantic model instances.
+
+        Raises:
+            errors.PyMongoError: If the query operation fails.
+        """
+
+        cursor = self.collection.find(
+            query, projection, limit=limit, batch_size=batch_size
+        )
+        batch: list[dict] = []
+        try:
+            async for document in cursor:
+                batch.append(document)
+                if len(batch) >= batch_size:
+                    yield self.__parse_documents(batch)
+                    batch = []
+            if batch:
+                yield self.__parse_documents(batch)
+        finally:
+            await cursor.close()
+
+    async def fetch_documents(
+        self, limit: int, query: dict, projection: dict | None = None
+    ) -> list[T]:
+        """Retrieve documents from the MongoDB collection based on a query.
+
+        Args:
+            limit (int): Maximum number of documents to retrieve.
+            query (dict): MongoDB query filter to apply.
+            projection (dict | None): Fields to return (or to leave out).
+
+        Returns:
+            list[T]: List of Pydantic model instances matching the query criteria.
+
+        Raises:
+            Exception: If the query operation fails.
+        """
+
+        try:
+            documents = [
+                document
+                async for batch in self.stream_documents(
+                    query, projection=projection, limit=limit
+                )
+                for document in batch
+            ]
+            logger.debug(f"Fetched {len(documents)} documents with query: {query}")
+            return documents
+        except Exception as e:
+            logger.error(f"Error fetching documents: {e}")
+            raise
+
+    def __parse_documents(self, documents: list[dict]) -> list[T]:
+        parsed_documents = []
+        for doc in documents:
+            for key, value in doc.items():
+                if isinstance(value, ObjectId):
+                    doc[key] = str(value)
+
+            _id = doc.pop("_id", None)
+            doc["id"] = _id
+
+            parsed_documents.append(self.model.model_validate(doc))
+
+        return parsed_documents
+
+    async def get_collection_count(self, query: dict | None = None) -> int:
+        """Count the documents in the collection, or the ones matching a query.
+
+        Without a query, the count is read from the collection metadata instead of
+        scanning it.
+
+        Args:
+            query (dict | None): MongoDB query filter to apply.
+
+        Returns:
+            int: Number of documents.
+
+        Raises:
+            errors.PyMongoError: If the count operation fails.
+        """
+
+        try:
+            if query is None:
+                return await self.collection.estimated_document_count()
+            return await self.collection.count_documents(query)
+        except errors.PyMongoError as e:
+            logger.error(f"Error counting documents in MongoDB: {e}")
+            raise
@@ -0,0 +1,396 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from langgraph.checkpoint.mongodb.utils import dumps_metadata, loads_metadata
+from loguru import logger
+from pymongo import AsyncMongoClient, UpdateOne
+
+
+@dataclass
+class _BufferedCheckpoint:
+    """Latest checkpoint of a thread, as serialized for Mongo."""
+
+    checkpoint_id: str
+    parent_checkpoint_id: str | None
+    checkpoint: tuple[str, bytes]
+    metadata: dict[str, Any]
+    # (task_id, idx) -> (task_id, channel, serialized value)
+    writes: dict[tuple[str, int], tuple[str, str, tuple[str, bytes]]] = field(
+        default_factory=dict
+    )
+
+
+class WriteBehindMongoDBSaver(AsyncMongoDBSaver):
+    """MongoDB checkpointer that writes behind an in-memory buffer.
+
+    Checkpoints and pending writes are kept in memory and flushed to Mongo in bulk
+    writes, every `flush_interval_ms` or as soon as `max_pending_ops` operations are
+    pending, and fully by `aclose()`. The latest checkpoint of the active threads is
+    read back from memory, so turns don't wait for Mongo.
+
+    If the process crashes, up to `flush_interval_ms` of conversation is lost. The
+    buffer is per process, so the turns of a thread must be served by one process.
+
+    Args:
+        client (AsyncMongoClient): Async MongoDB client.
+        db_name (str): Name of the database.
+        checkpoint_collection_name (str): Collection of the checkpoints.
+        writes_collection_name (str): Collection of the pending writes.
+        ttl (int | None): Expiration of the documents, in seconds.
+        flush_interval_ms (float): Maximum time an operation stays only in memory.
+        max_pending_ops (int): Pending operations that trigger an early flush.
+        max_buffered_threads (int): Threads whose latest checkpoint is kept in memory.
+    """
+
+    def __init__(
+        self,
+        client: AsyncMongoClient,
+        db_name: str,
+        checkpoint_collection_name: str,
+        writes_collection_name: str,
+        ttl: Optional[int] = None,
+        flush_interval_ms: float = 500,
+        max_pending_ops: int = 500,
+        max_buffered_threads: int = 10000,
+    ) -> None:
+        super().__init__(
+            client,
+            db_name=db_name,
+            checkpoint_collection_name=checkpoint_collection_name,
+            writes_collection_name=writes_collection_name,
+            ttl=ttl,
+        )
+        self.flush_interval_ms = flush_interval_ms
+        self.max_pending_ops = max_pending_ops
+        self.max_buffered_threads = max_buffered_threads
+
+        self._latest: OrderedDict[tuple[str, str], _BufferedCheckpoint] = OrderedDict()
+        self._pending_checkpoints: dict[tuple, UpdateOne] = {}
+        self._pending_writes: dict[tuple, UpdateOne] = {}
+        self._pending_threads: set[str] = set()
+        self._flushing_threads: set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._flusher: asyncio.Task | None = None
+        self._counters = {
+            "buffer_hits": 0,
+            "buffer_misses": 0,
+            "flushes": 0,
+            "flushed_ops": 0,
+            "failed_flushes": 0,
+        }
+        self._last_flush_ms: float | None = None
+
+    def start(self) -> None:
+        """Start flushing the buffer in the background."""
+
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def aclose(self) -> None:
+        """Stop the background flushes and flush everything left in the buffer."""
+
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        await self.flush()
+        if self._pending_checkpoints or self._pending_writes:
+            logger.error(
+                f"Lost {len(self._pending_checkpoints)} checkpoints and "
+                f"{len(self._pending_writes)} writes that couldn't be flushed to Mongo."
+            )
+
+    async def flush(self) -> None:
+        """Write the pending checkpoints and writes to Mongo in bulk."""
+
+        async with self._flush_lock:
+            checkpoint_ops, self._pending_checkpoints = self._pending_checkpoints, {}
+            write_ops, self._pending_writes = self._pending_writes, {}
+            self._flushing_threads, self._pending_threads = self._pending_threads, set()
+            if not checkpoint_ops and not write_ops:
+                return
+
+            start = time.perf_counter()
+            try:
+                if checkpoint_ops:
+                    await self.checkpoint_collection.bulk_write(
+                        list(checkpoint_ops.values()), ordered=False
+                    )
+                if write_ops:
+                    await self.writes_collection.bulk_write(
+                        list(write_ops.values()), ordered=False
+                    )
+            except Exception as e:
+                # Retry with the next flush, without overwriting newer operations.
+                for key, operation in checkpoint_ops.items():
+                    self._pending_checkpoints.setdefault(key, operation)
+                for key, operation in write_ops.items():
+                    self._pending_writes.setdefault(key, operation)
+                self._pending_threads |= self._flushing_threads
+                self._counters["failed_flushes"] += 1
+                logger.warning(f"Couldn't flush checkpoints to Mongo: {e}")
+                return
+            finally:
+                self._flushing_threads = set()
+
+            self._last_flush_ms = (time.perf_counter() - start) * 1000
+            self._counters["flushes"] += 1
+            self._counters["flushed_ops"] += len(checkpoint_ops) + len(write_ops)
+
+    async def adiscard_threads(self, predicate: Callable[[str], bool]) -> None:
+        """Drop the buffered state of the threads matching `predicate`, unflushed.
+
+        Waits for the flush in progress, so nothing of those threads reaches Mongo
+        afterwards and they can be deleted there.
+        """
+
+        async with self._flush_lock:
+            self._latest = OrderedDict(
+                (key, buffered)
+                for key, buffered in self._latest.items()
+                if not predicate(key[0])
+            )
+            self._pending_checkpoints = {
+                key: operation
+                for key, operation in self._pending_checkpoints.items()
+                if not predicate(key[0])
+            }
+            self._pending_writes = {
+                key: operation
+                for key, operation in self._pending_writes.items()
+                if not predicate(key[0])
+            }
+            self._pending_threads = {
+                thread_id
+                for thread_id in self._pending_threads
+                if not predicate(thread_id)
+            }
+
+    async def _run_flusher(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), timeout=self.flush_interval_ms / 1000
+                )
+            except TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    def _request_flush_if_full(self) -> None:
+        if (
+            len(self._pending_checkpoints) + len(self._pending_writes)
+            >= self.max_pending_ops
+        ):
+            self._flush_requested.set()
+
+    async def _flush_thread(self, thread_id: str) -> None:
+        # Reads that Mongo serves must see the thread's buffered operations.
+        if thread_id in self._pending_threads or thread_id in self._flushing_threads:
+            await self.flush()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        buffered = self._latest.get((thread_id, checkpoint_ns))
+        if buffered is not None and checkpoint_id in (None, buffered.checkpoint_id):
+            self._counters["buffer_hits"] += 1
+            self._latest.move_to_end((thread_id, checkpoint_ns))
+            return self._to_tuple(thread_id, checkpoint_ns, buffered)
+
+        self._counters["buffer_misses"] += 1
+        await self._flush_thread(thread_id)
+
+        return await super().aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ):
+        await self.flush()
+        async for checkpoint_tuple in super().alist(
+            config, filter=filter, before=before, limit=limit
+        ):
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self._setup()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_id = checkpoint["id"]
+        metadata = {**metadata, **config.get("metadata", {})}
+        buffered = _BufferedCheckpoint(
+            checkpoint_id=checkpoint_id,
+            parent_checkpoint_id=config["configurable"].get("checkpoint_id"),
+            checkpoint=self.serde.dumps_typed(checkpoint),
+            metadata=dumps_metadata(metadata),
+        )
+
+        doc: dict[str, Any] = {
+            "parent_checkpoint_id": buffered.parent_checkpoint_id,
+            "type": buffered.checkpoint[0],
+            "checkpoint": buffered.checkpoint[1],
+            "metadata": buffered.metadata,
+        }
+        if self.ttl:
+            doc["created_at"] = datetime.now()
+        key = (thread_id, checkpoint_ns, checkpoint_id)
+        self._pending_checkpoints[key] = UpdateOne(
+            {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            },
+            {"$set": doc},
+            upsert=True,
+        )
+        self._pending_threads.add(thread_id)
+
+        self._latest[(thread_id, checkpoint_ns)] = buffered
+        self._latest.move_to_end((thread_id, checkpoint_ns))
+        while len(self._latest) > self.max_buffered_threads:
+            # Evicted threads are read from Mongo, after flushing their operations.
+            self._latest.popitem(last=False)
+        self._request_flush_if_full()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self._setup()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Allow replacement on existing writes only if there were errors.
+        replace = all(w[0] in WRITES_IDX_MAP for w in writes)
+        buffered = self._latest.get((thread_id, checkpoint_ns))
+        if buffered is not None and buffered.checkpoint_id != checkpoint_id:
+            buffered = None
+        now = datetime.now()
+
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            serialized_value = self.serde.dumps_typed(value)
+
+            if buffered is not None and (
+                replace or (task_id, idx) not in buffered.writes
+            ):
+                buffered.writes[(task_id, idx)] = (task_id, channel, serialized_value)
+
+            update_doc: dict[str, Any] = {
+                "channel": channel,
+                "type": serialized_value[0],
+                "value": serialized_value[1],
+            }
+            if self.ttl:
+                update_doc["created_at"] = now
+            key = (thread_id, checkpoint_ns, checkpoint_id, task_id, task_path, idx)
+            if replace or key not in self._pending_writes:
+                self._pending_writes[key] = UpdateOne(
+                    {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": checkpoint_id,
+                        "task_id": task_id,
+                        "task_path": task_path,
+                        "idx": idx,
+                    },
+                    {"$set" if replace else "$setOnInsert": update_doc},
+                    upsert=True,
+                )
+
+        self._pending_threads.add(thread_id)
+        self._request_flush_if_full()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._flush_thread(thread_id)
+        for key in [key for key in self._latest if key[0] == thread_id]:
+            del self._latest[key]
+
+        await super().adelete_thread(thread_id)
+
+    def _to_tuple(
+        self, thread_id: str, checkpoint_ns: str, buffered: _BufferedCheckpoint
+    ) -> CheckpointTuple:
+        return CheckpointTuple(
+            {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": buffered.checkpoint_id,
+                }
+            },
+            self.serde.loads_typed(buffered.checkpoint),
+            loads_metadata(buffered.metadata),
+            (
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": buffered.parent_checkpoint_id,
+                    }
+                }
+                if buffered.parent_checkpoint_id
+                else None
+            ),
+            [
+                (task_id, channel, self.serde.loads_typed(value))
+                for task_id, channel, value in buffered.writes.values()
+            ],
+        )
+
+    def get_stats(self) -> dict:
+        """Buffer counters and the operations waiting to be flushed."""
+
+        return {
+            **self._counters,
+            "pending_checkpoints": len(self._pending_checkpoints),
+            "pending_writes": len(self._pending_writes),
+            "buffered_threads": len(self._latest),
+            "last_flush_ms": round(self._last_flush_ms, 1)
+            if self._last_flush_ms is not None
+            else None,
+            "flush_interval_ms": self.flush_interval_ms,
+        }
@@ -0,0 +1,313 @@
+import asyncio
+import time
+from typing import Any
+
+from loguru import logger
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import OperationFailure
+
+# Error codes of `create_index` when an index with the same keys has other options.
+INDEX_CONFLICT_CODES = (85, 86)
+
+# Fields identifying a checkpoint, and the pending writes attached to it.
+CHECKPOINT_KEY = ("thread_id", "checkpoint_ns", "checkpoint_id")
+
+
+class CheckpointRetention:
+    """Keeps the LangGraph state collections from growing forever.
+
+    A background task periodically:
+
+    - deletes all but the last `keep_last` checkpoints of every thread, with their
+      pending writes,
+    - deletes the writes of those threads whose checkpoint doesn't exist anymore.
+
+    With `ttl_seconds`, MongoDB also expires documents through a TTL index on
+    `created_at`. It is an age limit, not an idle time: every checkpoint and write
+    expires `ttl_seconds` after it was written, even if the thread is still in use,
+    so it must be much longer than a play session. A thread lives on through its
+    newest checkpoint, written on every turn, and the writes of expired checkpoints
+    expire with their own TTL. The checkpointer must be
+    created with the same `ttl`, since it only stamps `created_at` when it has one;
+    documents written before are never expired.
+
+    Args:
+        client (AsyncMongoClient): Async MongoDB client.
+        db_name (str): Name of the database.
+        checkpoint_collection_name (str): Collection of the checkpoints.
+        writes_collection_name (str): Collection of the pending writes.
+        keep_last (int): Checkpoints kept for every thread.
+        ttl_seconds (int | None): Age after which a document expires.
+        interval_seconds (float): Time between two retention passes.
+        batch_size (int): Maximum threads pruned per pass.
+    """
+
+    def __init__(
+        self,
+        client: AsyncMongoClient,
+        db_name: str,
+        checkpoint_collection_name: str,
+        writes_collection_name: str,
+        keep_last: int = 5,
+        ttl_seconds: int | None = None,
+        interval_seconds: float = 300,
+        batch_size: int = 500,
+    ) -> None:
+        if keep_last < 1:
+            raise ValueError("At least the last checkpoint of a thread must be kept.")
+
+        self.db = client[db_name]
+        self.checkpoint_collection = self.db[checkpoint_collection_name]
+        self.writes_collection = self.db[writes_collection_name]
+        self.keep_last = keep_last
+        self.ttl_seconds = ttl_seconds
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+
+        self._task: asyncio.Task | None = None
+        self._counters = {
+            "passes": 0,
+            "failed_passes": 0,
+            "threads_pruned": 0,
+            "checkpoints_deleted": 0,
+            "writes_deleted": 0,
+            "orphaned_writes_deleted": 0,
+            "bytes_reclaimed": 0,
+        }
+        self._last_pass_ms: float | None = None
+
+    async def ensure_indexes(self) -> None:
+        """Create the indexes used by the checkpointer and by the retention passes."""
+
+        await self.checkpoint_collection.create_index(
+            [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)],
+            unique=True,
+        )
+        await self.writes_collection.create_index(
+            [
+                ("thread_id", 1),
+                ("checkpoint_ns", 1),
+                ("checkpoint_id", -1),
+                ("task_id", 1),
+                ("idx", 1),
+            ],
+            unique=True,
+        )
+        for collection in (self.checkpoint_collection, self.writes_collection):
+            await self._ensure_ttl_index(collection)
+
+    async def _ensure_ttl_index(self, collection: AsyncCollection) -> None:
+        indexes = await (await collection.list_indexes()).to_list()
+        ttl_index = next(
+            (index for index in indexes if dict(index["key"]) == {"created_at": 1}),
+            None,
+        )
+
+        if self.ttl_seconds is None:
+            if ttl_index is not None and "expireAfterSeconds" in ttl_index:
+                await collection.drop_index(ttl_index["name"])
+                logger.info(f"Dropped the TTL index of '{collection.name}'.")
+            return
+
+        try:
+            await collection.create_index(
+                [("created_at", 1)], expireAfterSeconds=self.ttl_seconds
+            )
+        except OperationFailure as e:
+            if e.code not in INDEX_CONFLICT_CODES:
+                raise
+            await self.db.command(
+                "collMod",
+                collection.name,
+                index={
+                    "keyPattern": {"created_at": 1},
+                    "expireAfterSeconds": self.ttl_seconds,
+                },
+            )
+            logger.info(
+                f"Changed the TTL of '{collection.name}' to {self.ttl_seconds}s."
+            )
+
+    def start(self) -> None:
+        """Start the periodic retention passes in the background."""
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the retention passes, interrupting the current one."""
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self._counters["failed_passes"] += 1
+                logger.warning(f"Checkpoint retention pass failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self) -> dict:
+        """Run a single retention pass.
+
+        Returns:
+            dict: Documents and bytes deleted by the pass.
+        """
+
+        start = time.perf_counter()
+        result = {
+            "threads_pruned": 0,
+            "checkpoints_deleted": 0,
+            "writes_deleted": 0,
+            "orphaned_writes_deleted": 0,
+            "bytes_reclaimed": 0,
+        }
+
+        pruned_threads: list[dict[str, str]] = []
+        async for thread in await self.checkpoint_collection.aggregate(
+            [
+                # Sorted on the index prefix, so the scan is covered by the index.
+                {"$sort": {"thread_id": 1, "checkpoint_ns": 1}},
+                {
+                    "$group": {
+                        "_id": {
+                            "thread_id": "$thread_id",
+                            "checkpoint_ns": "$checkpoint_ns",
+                        },
+                        "count": {"$sum": 1},
+                    }
+                },
+                {"$match": {"count": {"$gt": self.keep_last}}},
+                {"$limit": self.batch_size},
+            ]
+        ):
+            checkpoints, writes, bytes_deleted = await self._prune_thread(thread["_id"])
+            pruned_threads.append(thread["_id"])
+            result["threads_pruned"] += 1
+            result["checkpoints_deleted"] += checkpoints
+            result["writes_deleted"] += writes
+            result["bytes_reclaimed"] += bytes_deleted
+
+        orphans, bytes_deleted = await self._prune_orphaned_writes(pruned_threads)
+        result["orphaned_writes_deleted"] += orphans
+        result["bytes_reclaimed"] += bytes_deleted
+
+        for key, value in result.items():
+            self._counters[key] += value
+        self._counters["passes"] += 1
+        self._last_pass_ms = (time.perf_counter() - start) * 1000
+        if result["bytes_reclaimed"]:
+            logger.info(
+                f"Checkpoint retention pruned {result['threads_pruned']} threads, "
+                f"reclaiming {result['bytes_reclaimed'] / 1024:.1f} KB."
+            )
+
+        return result
+
+    async def _prune_thread(self, thread: dict[str, str]) -> tuple[int, int, int]:
+        # Checkpoint IDs are time-ordered, so everything before the last kept goes.
+        last_kept = await self.checkpoint_collection.find(
+            thread,
+            {"checkpoint_id": 1},
+            sort=[("checkpoint_id", -1)],
+            skip=self.keep_last - 1,
+            limit=1,
+        ).to_list()
+        if not last_kept:
+            return 0, 0, 0
+
+        older = {**thread, "checkpoint_id": {"$lt": last_kept[0]["checkpoint_id"]}}
+        checkpoints, checkpoint_bytes = await self._delete(
+            self.checkpoint_collection, older
+        )
+        writes, writes_bytes = await self._delete(self.writes_collection, older)
+
+        return checkpoints, writes, checkpoint_bytes + writes_bytes
+
+    async def _prune_orphaned_writes(
+        self, threads: list[dict[str, str]]
+    ) -> tuple[int, int]:
+        # Only the threads pruned by the pass are checked, a chunk at a time, so the
+        # queries stay on the index prefix instead of scanning the whole collection.
+        deleted, bytes_deleted = 0, 0
+        for start in range(0, len(threads), self.batch_size):
+            chunk = {"$or": threads[start : start + self.batch_size]}
+            written = await (
+                await self.writes_collection.aggregate(
+                    [
+                        {"$match": chunk},
+                        {
+                            "$group": {
+                                "_id": {
+                                    "thread_id": "$thread_id",
+                                    "checkpoint_ns": "$checkpoint_ns",
+                                    "checkpoint_id": "$checkpoint_id",
+                                }
+                            }
+                        },
+                    ]
+                )
+            ).to_list()
+            existing = {
+                (c["thread_id"], c["checkpoint_ns"], c["checkpoint_id"])
+                async for c in self.checkpoint_collection.find(
+                    chunk, {"thread_id": 1, "checkpoint_ns": 1, "checkpoint_id": 1}
+                )
+            }
+            orphans = [
+                w["_id"]
+                for w in written
+                if tuple(w["_id"][field] for field in CHECKPOINT_KEY) not in existing
+            ]
+            if orphans:
+                chunk_deleted, chunk_bytes = await self._delete(
+                    self.writes_collection, {"$or": orphans}
+                )
+                deleted += chunk_deleted
+                bytes_deleted += chunk_bytes
+
+        return deleted, bytes_deleted
+
+    async def _delete(
+        self, collection: AsyncCollection, query: dict[str, Any]
+    ) -> tuple[int, int]:
+        sizes = await (
+            await collection.aggregate(
+                [
+                    {"$match": query},
+                    {
+                        "$group": {
+                            "_id": None,
+                            "bytes": {"$sum": {"$bsonSize": "$$ROOT"}},
+                        }
+                    },
+                ]
+            )
+        ).to_list()
+        if not sizes:
+            return 0, 0
+
+        result = await collection.delete_many(query)
+
+        return result.deleted_count, sizes[0]["bytes"]
+
+    def get_stats(self) -> dict:
+        """Retention counters, cumulated over the passes."""
+
+        return {
+            **self._counters,
+            "running": self._task is not None,
+            "keep_last": self.keep_last,
+            "ttl_seconds": self.ttl_seconds,
+            "last_pass_ms": round(self._last_pass_ms, 1)
+            if self._last_pass_ms is not None
+            else None,
+        }
@@ -1,14 +1,46 @@
+import asyncio
 import os
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Iterator
 
-import opik
 from loguru import logger
-from opik.configurator.configure import OpikConfigurator
 
 from philoagents.config import settings
 
+if TYPE_CHECKING:
+    import opik
+
+# Importing opik is slow (it pulls in litellm), so it's only imported when tracing is
+# enabled or when one of the helpers below is used.
+_configured = False
+
+# Route of the request being handled, whose sample rate applies to its traces.
+_route: ContextVar[str | None] = ContextVar("opik_route", default=None)
+_flush_task: asyncio.Task | None = None
+_counters = {"sampled": 0, "not_sampled": 0, "flushes": 0, "coalesced_flushes": 0}
+
+
+def is_opik_configured() -> bool:
+    return bool(settings.COMET_API_KEY and settings.COMET_PROJECT)
+
+
+def is_tracing_enabled() -> bool:
+    return settings.OPIK_TRACING_ENABLED and is_opik_configured()
+
 
 def configure() -> None:
-    if settings.COMET_API_KEY and settings.COMET_PROJECT:
+    global _configured
+
+    if _configured:
+        return
+    _configured = True
+
+    if is_opik_configured():
+        import opik
+        from opik.configurator.configure import OpikConfigurator
+
         try:
             client = OpikConfigurator(api_key=settings.COMET_API_KEY)
             default_workspace = client._get_default_workspace()
@@ -19,6 +51,11 @@ def configure() -> None:
             default_workspace = None
 
         os.environ["OPIK_PROJECT_NAME"] = settings.COMET_PROJECT
+        # Spans are sent by Opik's background workers. Past this many queued messages,
+        # the oldest are dropped instead of growing the queue. Opik divides the size
+        # by the batching factor, so the factor is 1 to keep the setting as the bound.
+        os.environ["OPIK_MAXIMAL_QUEUE_SIZE"] = str(settings.OPIK_MAX_QUEUE_SIZE)
+        os.environ["OPIK_MAXIMAL_QUEUE_SIZE_BATCH_FACTOR"] = "1"
 
         try:
             opik.configure(
@@ -34,13 +71,127 @@ def configure() -> None:
             logger.warning(
                 "Couldn't configure Opik. There is probably a problem with the COMET_API_KEY or COMET_PROJECT environment variables or with the Opik server."
             )
+        if not settings.OPIK_TRACING_ENABLED:
+            logger.info("Opik tracing is disabled by OPIK_TRACING_ENABLED.")
     else:
         logger.warning(
             "COMET_API_KEY and COMET_PROJECT are not set. Set them to enable prompt monitoring with Opik (powered by Comet ML)."
         )
 
 
-def get_dataset(name: str) -> opik.Dataset | None:
+@contextmanager
+def tracing_scope(route: str) -> Iterator[None]:
+    """Set the route whose sample rate applies to the traces created within the block.
+
+    Args:
+        route: Route of the request, e.g. "/ws/chat".
+    """
+
+    token = _route.set(route)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def get_sample_rate(route: str | None = None) -> float:
+    """Get the fraction of the runs traced on a route.
+
+    Args:
+        route: Route of the request. Defaults to the route of the current
+            `tracing_scope`.
+
+    Returns:
+        float: OPIK_ROUTE_SAMPLE_RATES of the route, or OPIK_SAMPLE_RATE.
+    """
+
+    route = route or _route.get()
+    return settings.OPIK_ROUTE_SAMPLE_RATES.get(route, settings.OPIK_SAMPLE_RATE)
+
+
+def create_tracer(**kwargs: Any) -> Any | None:
+    """Create an Opik LangChain tracer for a sampled run.
+
+    Returns:
+        OpikTracer | None: The tracer, or None if tracing is disabled or the run
+            isn't sampled.
+    """
+
+    if not is_tracing_enabled():
+        return None
+
+    if random.random() >= get_sample_rate():
+        _counters["not_sampled"] += 1
+        return None
+    _counters["sampled"] += 1
+
+    configure()
+    from opik.integrations.langchain import OpikTracer
+
+    return OpikTracer(**kwargs)
+
+
+def flush(timeout: int | None = None) -> None:
+    """Flush the pending Opik traces, if tracing is enabled.
+
+    Blocks until the traces are sent: use `flush_in_background` inside the event loop.
+
+    Args:
+        timeout: Seconds to wait at most. Defaults to Opik's flush timeout.
+    """
+
+    if not is_tracing_enabled():
+        return
+
+    configure()
+    from opik.api_objects.opik_client import get_client_cached
+
+    get_client_cached().flush(timeout)
+
+
+def flush_in_background() -> None:
+    """Flush the pending Opik traces in a worker thread, without waiting.
+
+    Flushes requested while one is in progress are coalesced into it.
+    """
+
+    global _flush_task
+
+    if not is_tracing_enabled():
+        return
+    if _flush_task is not None and not _flush_task.done():
+        _counters["coalesced_flushes"] += 1
+        return
+
+    _counters["flushes"] += 1
+    _flush_task = asyncio.get_running_loop().create_task(
+        asyncio.to_thread(flush, settings.OPIK_FLUSH_TIMEOUT_SECONDS)
+    )
+
+
+async def aflush() -> None:
+    """Flush the pending Opik traces without blocking the event loop."""
+
+    if _flush_task is not None:
+        await asyncio.gather(_flush_task, return_exceptions=True)
+    await asyncio.to_thread(flush, settings.OPIK_FLUSH_TIMEOUT_SECONDS)
+
+
+def get_stats() -> dict:
+    """Tracing configuration and the sampling counters."""
+
+    return {
+        "enabled": is_tracing_enabled(),
+        "sample_rate": settings.OPIK_SAMPLE_RATE,
+        "route_sample_rates": settings.OPIK_ROUTE_SAMPLE_RATES,
+        "max_queue_size": settings.OPIK_MAX_QUEUE_SIZE,
+        **_counters,
+    }
+
+
+def get_dataset(name: str) -> "opik.Dataset | None":
+    import opik
+
     client = opik.Opik()
     try:
         dataset = client.get_dataset(name=name)
@@ -50,7 +201,9 @@ def get_dataset(name: str) -> opik.Dataset | None:
     return dataset
 
 
-def create_dataset(name: str, description: str, items: list[dict]) -> opik.Dataset:
+def create_dataset(name: str, description: str, items: list[dict]) -> "opik.Dataset":
+    import opik
+
     client = opik.Opik()
 
     client.delete_dataset(name=name)
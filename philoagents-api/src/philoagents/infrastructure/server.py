@@ -0,0 +1,90 @@
+"""Production entry point of the API, serving it with one or more worker processes.
+
+Run it with `python -m philoagents.infrastructure.server`. Every worker is a separate
+process with its own event loop, so JSON encoding and LangChain overhead are spread
+over `API_WORKERS` cores. Each worker runs the API lifespan before accepting
+connections, so it warms its own Mongo pool, chat model clients and prompt cache,
+and it keeps its own caches and statistics (e.g. /metrics describes one worker).
+"""
+
+import socket
+
+import uvicorn
+from loguru import logger
+from uvicorn.supervisors import Multiprocess
+
+from philoagents.config import settings
+from philoagents.infrastructure import draining
+
+APP = "philoagents.infrastructure.api:app"
+
+
+class DrainingServer(uvicorn.Server):
+    """Uvicorn server that lets the conversation turns in flight complete on shutdown.
+
+    Uvicorn closes the open WebSockets as soon as it shuts down, cutting the replies
+    being streamed. This server first stops accepting connections and waits, up to
+    the graceful shutdown timeout, for the turns in flight. Each WebSocket is then
+    closed with code 1012 (service restart), so the client reconnects.
+    """
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+
+        if draining.get_turns_in_flight():
+            logger.info(
+                f"Draining {draining.get_turns_in_flight()} conversation turns..."
+            )
+        remaining = await draining.drain(self.config.timeout_graceful_shutdown or 0)
+        if remaining:
+            logger.warning(f"Shutting down with {remaining} turns still in flight.")
+
+        await super().shutdown(sockets=sockets)
+
+
+def _warn_about_worker_state() -> None:
+    """Warn about the conversation state kept by each worker on its own."""
+
+    if settings.CHECKPOINTER_BACKEND == "memory":
+        logger.warning(
+            "CHECKPOINTER_BACKEND=memory keeps a separate conversation store in every "
+            "worker: a player reaching another worker starts over, and resets only "
+            "delete the conversations of the worker that handles them. Use it only "
+            "for load tests, or set CHECKPOINTER_BACKEND=mongodb."
+        )
+    if settings.CHECKPOINT_WRITE_BEHIND:
+        logger.warning(
+            "CHECKPOINT_WRITE_BEHIND buffers checkpoints per worker: a player "
+            "reconnecting to another worker may not see their last turns until "
+            "they are flushed, and a reset only discards the buffer of the worker "
+            "that handles it, so the others may flush deleted conversations back. "
+            "Use sticky sessions or disable write-behind."
+        )
+
+
+def main() -> None:
+    """Serve the API with API_WORKERS worker processes."""
+
+    config = uvicorn.Config(
+        APP,
+        host=settings.API_HOST,
+        port=settings.PORT,
+        workers=settings.API_WORKERS,
+        timeout_graceful_shutdown=settings.API_GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
+    )
+    server = DrainingServer(config)
+
+    if config.workers > 1:
+        _warn_about_worker_state()
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, AsyncIterator
+
+import orjson
+from fastapi import WebSocket
+
+STREAMING_MODES = ("token", "coalesced")
+
+
+async def send_json(websocket: WebSocket, data: dict[str, Any]) -> None:
+    """Send a JSON text frame, encoded with orjson."""
+
+    await websocket.send_text(orjson.dumps(data).decode())
+
+
+async def coalesce_chunks(
+    chunks: AsyncIterator[str], max_bytes: int, interval_ms: float
+) -> AsyncIterator[str]:
+    """Merge streamed chunks into fewer, larger ones.
+
+    Buffered text is flushed as soon as it reaches `max_bytes`, or `interval_ms` after
+    the first chunk of the buffer arrived, whichever comes first.
+
+    Args:
+        chunks: Chunks of the response, as produced by the LLM.
+        max_bytes: Size of the buffered text that triggers a flush.
+        interval_ms: Maximum time a chunk waits in the buffer.
+
+    Yields:
+        Coalesced chunks of the response.
+    """
+
+    loop = asyncio.get_running_loop()
+    iterator = aiter(chunks)
+    buffer: list[str] = []
+    buffer_bytes = 0
+    deadline = 0.0
+    next_chunk = asyncio.ensure_future(anext(iterator))
+
+    try:
+        while True:
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({next_chunk}, timeout=timeout)
+
+            if not done:
+                yield "".join(buffer)
+                buffer, buffer_bytes = [], 0
+                continue
+
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                break
+            next_chunk = asyncio.ensure_future(anext(iterator))
+
+            if not buffer:
+                deadline = loop.time() + interval_ms / 1000
+            buffer.append(chunk)
+            buffer_bytes += len(chunk.encode())
+
+            if buffer_bytes >= max_bytes:
+                yield "".join(buffer)
+                buffer, buffer_bytes = [], 0
+    finally:
+        if not next_chunk.done():
+            next_chunk.cancel()
+
+    if buffer:
+        yield "".join(buffer)
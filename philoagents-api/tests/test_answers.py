@@ -0,0 +1,46 @@
+import pytest
+
+from philoagents.application.conversation_service.workflow.answers import match_answer
+
+
+@pytest.mark.parametrize(
+    "message",
+    ["Bobby", "È Bobby!", "Il rapitore è Bobby.", "Si chiama Bobby", "B-O-B-B-Y"],
+)
+def test_victory_name_is_matched(message):
+    match = match_answer("nicolo", message)
+
+    assert match is not None
+    assert match.game_event == "victory"
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "is it not Bobby?",
+        "bobby? no idea",
+        "Non è Bobby",
+        "Chi è Bobby?",
+        "Bobby è il mio amico, ma il rapitore è un altro",
+        "Ciao!",
+    ],
+)
+def test_victory_name_is_not_matched_when_only_mentioned(message):
+    assert match_answer("nicolo", message) is None
+
+
+def test_victory_name_only_wins_with_the_guide():
+    assert match_answer("akane", "Bobby") is None
+
+
+@pytest.mark.parametrize("message", ["bara", "Forse è una bara?", "FERETRO!"])
+def test_riddle_answer_is_matched(message):
+    match = match_answer("akane", message)
+
+    assert match is not None
+    assert match.game_event == "riddle_solved"
+
+
+@pytest.mark.parametrize("message", ["Non è una bara", "bara o chiodo?"])
+def test_riddle_answer_is_not_matched_when_only_mentioned(message):
+    assert match_answer("akane", message) is None
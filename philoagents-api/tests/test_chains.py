@@ -0,0 +1,23 @@
+from philoagents.application.conversation_service.workflow import chains
+from philoagents.config import settings
+from philoagents.domain.philosopher_factory import PhilosopherFactory
+
+
+def test_warm_up_prompt_cache_is_hit_by_the_response_chain(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "fake")
+    chains.get_philosopher_prompt.cache_clear()
+
+    chains.warm_up_prompt_cache()
+    warmed_up = chains.get_philosopher_prompt.cache_info()
+
+    philosopher = PhilosopherFactory.get_philosopher("nicolo")
+    chains.get_philosopher_response_chain(
+        philosopher_id=philosopher.id,
+        philosopher_name=philosopher.name,
+        philosopher_perspective=philosopher.perspective,
+        philosopher_style=philosopher.style,
+    )
+    after_turn = chains.get_philosopher_prompt.cache_info()
+
+    assert after_turn.hits == warmed_up.hits + 1
+    assert after_turn.currsize == warmed_up.currsize
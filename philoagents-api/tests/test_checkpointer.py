@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import START, MessagesState, StateGraph
+from pymongo import AsyncMongoClient
+
+from philoagents.infrastructure.mongo.checkpointer import WriteBehindMongoDBSaver
+
+
+class FakeCollection:
+    """Records the bulk writes instead of sending them, failing the first `failures`."""
+
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Mongo is down")
+        self.operations.extend(operations)
+
+    async def find(self, *args, **kwargs):
+        # Nothing was written before the test, so reads that miss the buffer are empty.
+        for document in ():
+            yield document
+
+    def thread_ids(self) -> set[str]:
+        return {operation._filter["thread_id"] for operation in self.operations}
+
+
+async def reply(state: MessagesState):
+    return {"messages": AIMessage(content=f"Risposta {len(state['messages'])}")}
+
+
+def create_graph(checkpointer):
+    graph_builder = StateGraph(MessagesState)
+    graph_builder.add_node("reply", reply)
+    graph_builder.add_edge(START, "reply")
+
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+def create_saver(failures: int = 0) -> WriteBehindMongoDBSaver:
+    with pytest.warns(DeprecationWarning):
+        saver = WriteBehindMongoDBSaver(
+            AsyncMongoClient(connect=False),
+            db_name="test",
+            checkpoint_collection_name="checkpoints",
+            writes_collection_name="writes",
+            flush_interval_ms=10,
+        )
+    saver.checkpoint_collection = FakeCollection(failures)
+    saver.writes_collection = FakeCollection()
+
+    async def setup():
+        pass
+
+    saver._setup = setup
+
+    return saver
+
+
+async def run_turns(graph, thread_id: str, messages: list[str]) -> dict:
+    config = {"configurable": {"thread_id": thread_id}}
+    for message in messages:
+        await graph.ainvoke({"messages": [HumanMessage(content=message)]}, config)
+
+    return (await graph.aget_state(config)).values
+
+
+def contents(state: dict) -> list[str]:
+    return [message.content for message in state["messages"]]
+
+
+def test_turns_are_served_from_the_buffer():
+    async def run():
+        saver = create_saver()
+        state = await run_turns(create_graph(saver), "akane", ["Ciao", "Chi sei?"])
+        expected = await run_turns(
+            create_graph(InMemorySaver()), "akane", ["Ciao", "Chi sei?"]
+        )
+        return saver, state, expected
+
+    saver, state, expected = asyncio.run(run())
+    stats = saver.get_stats()
+
+    assert contents(state) == contents(expected)
+    assert stats["buffer_hits"] > 0
+    assert stats["flushes"] == 0
+    assert stats["pending_checkpoints"] > 0
+    assert not saver.checkpoint_collection.operations
+
+
+def test_failed_flush_is_retried():
+    async def run():
+        saver = create_saver(failures=1)
+        graph = create_graph(saver)
+        await run_turns(graph, "akane", ["Ciao"])
+        await saver.flush()
+        failed = saver.get_stats()
+        # Operations of a later turn are flushed together with the retried ones.
+        await run_turns(graph, "akane", ["Chi sei?"])
+        await saver.flush()
+        return saver, failed
+
+    saver, failed = asyncio.run(run())
+    stats = saver.get_stats()
+
+    assert failed["failed_flushes"] == 1
+    assert failed["pending_checkpoints"] > 0
+    assert (stats["flushes"], stats["pending_checkpoints"]) == (1, 0)
+    assert stats["flushed_ops"] == len(saver.checkpoint_collection.operations) + len(
+        saver.writes_collection.operations
+    )
+    assert len(saver.checkpoint_collection.operations) > failed["pending_checkpoints"]
+
+
+def test_discarded_threads_are_never_flushed():
+    async def run():
+        saver = create_saver()
+        graph = create_graph(saver)
+        await run_turns(graph, "s1:akane", ["Ciao"])
+        await run_turns(graph, "s2:akane", ["Ciao"])
+        await saver.adiscard_threads(lambda thread_id: thread_id.startswith("s1:"))
+        await saver.flush()
+        return saver
+
+    saver = asyncio.run(run())
+
+    assert saver.get_stats()["buffered_threads"] == 1
+    assert saver.checkpoint_collection.thread_ids() == {"s2:akane"}
+    assert saver.writes_collection.thread_ids() == {"s2:akane"}
+
+
+def test_close_flushes_everything_left():
+    async def run():
+        saver = create_saver()
+        saver.start()
+        await run_turns(create_graph(saver), "akane", ["Ciao"])
+        await saver.aclose()
+        return saver
+
+    saver = asyncio.run(run())
+    stats = saver.get_stats()
+
+    assert saver._flusher is None
+    assert (stats["pending_checkpoints"], stats["pending_writes"]) == (0, 0)
+    assert saver.checkpoint_collection.thread_ids() == {"akane"}
+
+
+def test_background_flush_runs_every_interval():
+    async def run():
+        saver = create_saver()
+        saver.start()
+        await run_turns(create_graph(saver), "akane", ["Ciao"])
+        await asyncio.sleep(0.05)
+        stats = saver.get_stats()
+        await saver.aclose()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert stats["flushes"] >= 1
+    assert stats["pending_checkpoints"] == 0
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from philoagents.application.conversation_service.generate_response import get_response
+from philoagents.application.conversation_service.runtime import (
+    close_conversation_runtime,
+    start_conversation_runtime,
+)
+from philoagents.config import settings
+from philoagents.domain.philosopher_factory import PhilosopherFactory
+
+
+@pytest.fixture
+def runtime_settings(monkeypatch):
+    for name, value in {
+        "LLM_PROVIDER": "fake",
+        "LLM_FALLBACK_PROVIDERS": "",
+        "LLM_RATE_LIMITS": {},
+        "CHECKPOINTER_BACKEND": "memory",
+        "CHECKPOINT_WRITE_BEHIND": False,
+        "CHECKPOINT_RETENTION_ENABLED": False,
+        "SUMMARIZE_IN_BACKGROUND": False,
+        "LOCAL_ANSWER_MATCHING": False,
+        "RESPONSE_CACHE_ENABLED": True,
+        "RESPONSE_CACHE_VARIANTS": 3,
+        "FAKE_LLM_TTFT_MS": 0,
+        "FAKE_LLM_TOKENS_PER_SECOND": 100000,
+        "FAKE_LLM_RESPONSE_TOKENS": 20,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+    return monkeypatch
+
+
+def run_turns(session_id: str, messages: list[str]) -> dict:
+    philosopher = PhilosopherFactory.get_philosopher("akane")
+
+    async def run() -> dict:
+        runtime = await start_conversation_runtime()
+        try:
+            for message in messages:
+                await get_response(
+                    messages=message,
+                    philosopher_id=philosopher.id,
+                    philosopher_name=philosopher.name,
+                    philosopher_perspective=philosopher.perspective,
+                    philosopher_style=philosopher.style,
+                    session_id=session_id,
+                )
+            return runtime.response_cache.get_stats()
+        finally:
+            await close_conversation_runtime()
+
+    return asyncio.run(run())
+
+
+def test_opening_turn_is_cached(runtime_settings):
+    stats = run_turns("opening", ["Ciao"])
+
+    assert stats["stores"] == 1
+
+
+def test_turns_of_a_summarized_thread_are_not_cached(runtime_settings):
+    # Every turn is summarized, leaving the thread with its last two messages.
+    runtime_settings.setattr(settings, "MAX_CONTEXT_TOKENS", 60)
+    runtime_settings.setattr(settings, "CONTEXT_TOKENS_AFTER_SUMMARY", 60)
+
+    stats = run_turns("summarized", ["Ciao", "e poi?", "Ciao"])
+
+    assert stats["stores"] == 1
+    assert stats["misses"] == 1
+    assert stats["not_opening"] == 2
+
+
+def test_only_opening_turns_count_as_lookups(runtime_settings):
+    runtime_settings.setattr(settings, "RESPONSE_CACHE_VARIANTS", 1)
+    philosopher = PhilosopherFactory.get_philosopher("akane")
+
+    async def run() -> dict:
+        runtime = await start_conversation_runtime()
+        try:
+            for session_id in ("first", "second", "first"):
+                await get_response(
+                    messages="Ciao",
+                    philosopher_id=philosopher.id,
+                    philosopher_name=philosopher.name,
+                    philosopher_perspective=philosopher.perspective,
+                    philosopher_style=philosopher.style,
+                    session_id=session_id,
+                )
+            return runtime.response_cache.get_stats()
+        finally:
+            await close_conversation_runtime()
+
+    stats = asyncio.run(run())
+
+    assert (stats["hits"], stats["misses"], stats["not_opening"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import START, StateGraph
+
+from philoagents.application.conversation_service.workflow.graph import (
+    create_workflow_graph,
+)
+from philoagents.application.conversation_service.workflow.nodes import victory_node
+from philoagents.application.conversation_service.workflow.state import PhilosopherState
+from philoagents.application.llm_service.tokens import count_message_tokens
+from philoagents.config import settings
+from philoagents.domain.philosopher_factory import PhilosopherFactory
+
+CONFIG = {"configurable": {"thread_id": "akane"}}
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    for name, value in {
+        "LLM_PROVIDER": "fake",
+        "LLM_FALLBACK_PROVIDERS": "",
+        "LLM_RATE_LIMITS": {},
+        "FAKE_LLM_TTFT_MS": 0,
+        "FAKE_LLM_TOKENS_PER_SECOND": 100000,
+        "FAKE_LLM_RESPONSE_TOKENS": 20,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+def test_victory_node_counts_its_tool_messages():
+    graph_builder = StateGraph(PhilosopherState)
+    graph_builder.add_node("victory_node", victory_node)
+    graph_builder.add_edge(START, "victory_node")
+    messages = [
+        HumanMessage(content="Bobby", id="1"),
+        AIMessage(
+            content="",
+            id="2",
+            tool_calls=[{"name": "trigger_victory", "args": {}, "id": "call"}],
+        ),
+    ]
+
+    state = asyncio.run(
+        graph_builder.compile().ainvoke(
+            {"messages": messages, "token_count": count_message_tokens(messages)}
+        )
+    )
+
+    assert isinstance(state["messages"][-1], ToolMessage)
+    assert state["token_count"] == count_message_tokens(state["messages"])
+
+
+def test_thread_without_token_count_is_counted_on_its_next_turn(fake_model):
+    philosopher = PhilosopherFactory.get_philosopher("akane")
+    history = [
+        HumanMessage(content="Ciao", id="1"),
+        AIMessage(content="Ciao, viaggiatore. " * 20, id="2"),
+    ]
+
+    async def run_turn(graph, message: str) -> dict:
+        input_message = HumanMessage(content=message)
+        return await graph.ainvoke(
+            {
+                "messages": [input_message],
+                "token_count": count_message_tokens(input_message),
+                "philosopher_id": philosopher.id,
+                "philosopher_name": philosopher.name,
+                "philosopher_perspective": philosopher.perspective,
+                "philosopher_style": philosopher.style,
+            },
+            CONFIG,
+        )
+
+    async def run() -> list[dict]:
+        graph = create_workflow_graph(summarize_in_background=True).compile(
+            checkpointer=InMemorySaver()
+        )
+        # A thread saved before token_count existed.
+        await graph.aupdate_state(
+            CONFIG, {"messages": history}, as_node="connector_node"
+        )
+        return [await run_turn(graph, "Chi sei?"), await run_turn(graph, "E poi?")]
+
+    for state in asyncio.run(run()):
+        assert state["token_count"] == count_message_tokens(state["messages"])
@@ -0,0 +1,192 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+from pydantic import Field
+
+from philoagents.application.llm_service import scheduler
+from philoagents.application.llm_service.fake_model import FakeStreamingChatModel
+from philoagents.application.llm_service.routing import (
+    ProviderRouter,
+    RoutingChatModel,
+)
+from philoagents.config import settings
+
+MESSAGES = [HumanMessage(content="Ciao")]
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FlakyChatModel(FakeStreamingChatModel):
+    """Fake model failing its first `failures` calls, optionally after a token."""
+
+    failures: int = 1
+    error: type[Exception] = ConnectionError
+    fail_after_first_token: bool = False
+    calls: list = Field(default_factory=list)
+
+    def _fail(self) -> None:
+        self.calls.append(None)
+        if len(self.calls) <= self.failures:
+            raise self.error("Provider unavailable")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._fail()
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._fail()
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if not self.fail_after_first_token:
+            self._fail()
+        async for index, chunk in _enumerate(
+            super()._astream(messages, stop, run_manager, **kwargs)
+        ):
+            if index == 1:
+                self._fail()
+            yield chunk
+
+
+async def _enumerate(iterator):
+    index = 0
+    async for item in iterator:
+        yield index, item
+        index += 1
+
+
+def fake(ttft_ms: float = 0) -> FakeStreamingChatModel:
+    return FakeStreamingChatModel(
+        ttft_ms=ttft_ms, tokens_per_second=100000, response_tokens=5
+    )
+
+
+def flaky(**kwargs) -> FlakyChatModel:
+    return FlakyChatModel(
+        ttft_ms=0, tokens_per_second=100000, response_tokens=5, **kwargs
+    )
+
+
+@pytest.fixture
+def router(monkeypatch):
+    for name, value in {
+        "LLM_RATE_LIMITS": {},
+        "LLM_HEDGING_ENABLED": False,
+        "LLM_HEDGE_MIN_DELAY_MS": 50,
+        "LLM_PROVIDER_COOLDOWN_SECONDS": 60,
+        "LLM_RATE_LIMIT_BACKOFF_SECONDS": 0.01,
+        "LLM_REQUEST_TIMEOUT_SECONDS": 5,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(scheduler, "_schedulers", {})
+
+    return ProviderRouter()
+
+
+def routing_model(router: ProviderRouter, **models) -> RoutingChatModel:
+    return RoutingChatModel(routes=list(models.items()), router=router)
+
+
+def test_failed_provider_fails_over_and_cools_down(router):
+    model = routing_model(router, primary=flaky(), secondary=fake())
+
+    response = asyncio.run(model.ainvoke(MESSAGES))
+    stats = router.get_stats()
+
+    assert response.response_metadata["routed_provider"] == "secondary"
+    assert stats["failovers"] == 1
+    assert stats["providers"]["primary"]["failures"] == 1
+    assert router.order(["primary", "secondary"]) == ["secondary", "primary"]
+
+
+def test_sync_calls_fail_over(router):
+    model = routing_model(router, primary=flaky(), secondary=fake())
+
+    response = model.invoke(MESSAGES)
+
+    assert response.response_metadata["routed_provider"] == "secondary"
+    assert router.get_stats()["failovers"] == 1
+
+
+def test_rate_limited_provider_is_retried_after_backoff(router):
+    primary = flaky(error=RateLimitError)
+    model = routing_model(router, primary=primary)
+
+    response = asyncio.run(model.ainvoke(MESSAGES))
+
+    assert response.response_metadata["routed_provider"] == "primary"
+    assert len(primary.calls) == 2
+    assert scheduler.get_provider_scheduler("primary").get_stats()["rate_limited"] == 1
+
+
+def test_all_providers_failing_raises_the_last_error(router):
+    model = routing_model(router, primary=flaky(), secondary=flaky())
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(model.ainvoke(MESSAGES))
+    assert router.get_stats()["failed"] == 1
+
+
+def test_slow_provider_is_hedged(router, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGING_ENABLED", True)
+    model = routing_model(router, primary=fake(ttft_ms=2000), secondary=fake())
+
+    start = time.perf_counter()
+    response = asyncio.run(model.ainvoke(MESSAGES))
+    stats = router.get_stats()
+
+    assert time.perf_counter() - start < 1
+    assert response.response_metadata["routed_provider"] == "secondary"
+    assert (stats["hedged"], stats["hedge_wins"], stats["failovers"]) == (1, 1, 0)
+
+
+def test_hedge_delay_follows_the_p95_latency(router):
+    health = router.health("primary")
+    for latency_ms in range(1, 20):
+        health.record_success("stream", latency_ms * 10)
+
+    # Too few samples: the minimum delay is used.
+    assert router.hedge_delay("primary", "stream") == 0.05
+    health.record_success("stream", 1000)
+    assert router.hedge_delay("primary", "stream") == 0.19
+    assert router.hedge_delay("primary", "invoke") == 0.05
+
+
+def test_stream_fails_over_before_the_first_token(router):
+    model = routing_model(router, primary=flaky(), secondary=fake())
+
+    async def run() -> list:
+        return [chunk async for chunk in model.astream(MESSAGES)]
+
+    chunks = asyncio.run(run())
+
+    assert "".join(chunk.content for chunk in chunks) == "".join(fake()._tokens())
+    assert chunks[0].response_metadata["routed_provider"] == "secondary"
+
+
+def test_stream_is_committed_after_the_first_token(router):
+    secondary = flaky(failures=0)
+    model = routing_model(
+        router,
+        primary=flaky(fail_after_first_token=True),
+        secondary=secondary,
+    )
+    chunks = []
+
+    async def run() -> None:
+        async for chunk in model.astream(MESSAGES):
+            chunks.append(chunk)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(run())
+    assert len(chunks) == 1
+    assert chunks[0].response_metadata["routed_provider"] == "primary"
+    assert not secondary.calls
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from philoagents.application.llm_service import scheduler
+from philoagents.application.llm_service.scheduler import (
+    AdmissionRejected,
+    Priority,
+    ProviderScheduler,
+    TokenBucket,
+    admission_scope,
+    get_retry_after,
+    is_rate_limit_error,
+)
+from philoagents.config import settings
+
+MESSAGES = [HumanMessage(content="Ciao")]
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the code under test sleeps."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds: float) -> None:
+        clock.sleep(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(
+        scheduler,
+        "time",
+        SimpleNamespace(
+            monotonic=clock.monotonic, sleep=clock.sleep, perf_counter=time.perf_counter
+        ),
+    )
+    monkeypatch.setattr(scheduler.asyncio, "sleep", sleep)
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_BACKOFF_SECONDS", 1)
+
+    return clock
+
+
+def test_token_bucket_refills_continuously(clock):
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.wait_time(1) == 0
+    bucket.consume(60)
+    assert bucket.wait_time(1) == 1.0
+    clock.sleep(0.5)
+    assert bucket.wait_time(1) == 0.5
+    clock.sleep(120)
+    assert bucket.wait_time(60) == 0
+
+
+def test_token_bucket_caps_requests_larger_than_its_capacity(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.consume(1000)
+
+    assert bucket.wait_time(1000) == 60.0
+
+
+def test_queued_requests_are_admitted_by_priority(clock):
+    provider = ProviderScheduler("fake", requests_per_minute=60)
+    admitted = []
+
+    async def request(priority: Priority) -> None:
+        with admission_scope(priority=priority):
+            await provider.acquire(MESSAGES)
+        admitted.append(priority)
+
+    async def run():
+        await provider.acquire(MESSAGES)
+        provider._requests.consume(60)
+        await asyncio.gather(
+            *(
+                request(priority)
+                for priority in (
+                    Priority.BACKGROUND,
+                    Priority.NEW,
+                    Priority.IN_PROGRESS,
+                )
+            )
+        )
+
+    asyncio.run(run())
+
+    assert admitted == [Priority.IN_PROGRESS, Priority.NEW, Priority.BACKGROUND]
+    assert provider.get_stats()["queued"] == 3
+
+
+def test_admitted_scope_becomes_in_progress(clock):
+    provider = ProviderScheduler("fake")
+
+    async def run() -> Priority:
+        with admission_scope() as scope:
+            await provider.acquire(MESSAGES)
+            return scope.priority
+
+    assert asyncio.run(run()) == Priority.IN_PROGRESS
+
+
+def test_full_queue_rejects_requests(clock):
+    provider = ProviderScheduler("fake", requests_per_minute=1, max_queue=1)
+
+    async def run():
+        await provider.acquire(MESSAGES)
+        waiting = asyncio.create_task(provider.acquire(MESSAGES))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await provider.acquire(MESSAGES)
+        waiting.cancel()
+
+    asyncio.run(run())
+
+    assert provider.get_stats()["rejected"] == 1
+
+
+def test_rate_limit_blocks_for_retry_after(clock):
+    provider = ProviderScheduler("fake")
+    provider.backoff(retry_after=5)
+
+    provider.acquire_blocking(MESSAGES)
+
+    assert clock.now == 5
+    assert provider.get_stats()["rate_limited"] == 1
+
+
+def test_backoff_doubles_until_a_success(clock):
+    provider = ProviderScheduler("fake")
+    delays = []
+    for _ in range(3):
+        provider.backoff()
+        delays.append(provider._wait_time(0))
+        clock.sleep(delays[-1])
+    provider.record_success()
+    provider.backoff()
+
+    assert delays == [1, 2, 4]
+    assert provider._wait_time(0) == 1
+
+
+def test_acquire_blocking_waits_for_the_budget(clock):
+    provider = ProviderScheduler("fake", requests_per_minute=60)
+    for _ in range(61):
+        provider.acquire_blocking(MESSAGES)
+
+    assert clock.now == 1.0
+    assert provider.get_stats()["admitted"] == 61
+
+
+def test_token_budget_counts_the_expected_completion(clock, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_EXPECTED_OUTPUT_TOKENS", 100)
+    provider = ProviderScheduler("fake", tokens_per_minute=150)
+    provider.acquire_blocking(MESSAGES)
+    provider.acquire_blocking(MESSAGES)
+
+    # 105 tokens a request: the second waits for the 60 missing, at 2.5 per second.
+    assert clock.now == pytest.approx(24)
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (SimpleNamespace(status_code=429), True),
+        (SimpleNamespace(response=SimpleNamespace(status_code=429)), True),
+        (SimpleNamespace(status_code=500), False),
+        (type("RateLimitError", (Exception,), {})(), True),
+    ],
+)
+def test_rate_limit_errors_are_recognized(error, expected):
+    assert is_rate_limit_error(error) is expected
+
+
+@pytest.mark.parametrize(
+    "headers, expected", [({"retry-after": "2.5"}, 2.5), ({}, None), (None, None)]
+)
+def test_retry_after_is_read_from_the_response(headers, expected):
+    error = SimpleNamespace(response=SimpleNamespace(headers=headers))
+
+    assert get_retry_after(error) == expected
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from philoagents.application.conversation_service import summarization
+from philoagents.application.conversation_service.summarization import (
+    BackgroundSummarizer,
+)
+from philoagents.application.conversation_service.workflow.graph import (
+    create_workflow_graph,
+)
+from philoagents.application.llm_service.tokens import count_message_tokens
+from philoagents.config import settings
+
+CONFIG = {"configurable": {"thread_id": "akane"}}
+
+MESSAGES = [
+    HumanMessage(content="Ciao", id="1"),
+    AIMessage(content="Ciao, viaggiatore.", id="2"),
+    HumanMessage(content="Chi sei?", id="3"),
+    AIMessage(content="Sono Akane.", id="4"),
+]
+
+
+@pytest.fixture
+def fake_summary(monkeypatch):
+    """Replace the summary model: the first two messages are always removed."""
+
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(settings, "MAX_CONTEXT_TOKENS", 0)
+    calls = []
+
+    async def summarize_conversation_node(state):
+        calls.append(state)
+        return {
+            "summary": "Akane si è presentata.",
+            "messages": [RemoveMessage(id=m.id) for m in MESSAGES[:2]],
+            "token_count": -count_message_tokens(MESSAGES[:2]),
+        }
+
+    monkeypatch.setattr(
+        summarization, "summarize_conversation_node", summarize_conversation_node
+    )
+
+    return calls
+
+
+async def create_graph(messages=MESSAGES):
+    graph = create_workflow_graph(summarize_in_background=True).compile(
+        checkpointer=InMemorySaver()
+    )
+    await graph.aupdate_state(
+        CONFIG,
+        {"messages": messages, "token_count": count_message_tokens(messages)},
+        as_node="connector_node",
+    )
+
+    return graph
+
+
+def test_summary_removes_messages_and_their_tokens(fake_summary):
+    async def run():
+        graph = await create_graph()
+        summarizer = BackgroundSummarizer(graph, max_concurrency=1)
+        summarizer.schedule(CONFIG)
+        await summarizer.close()
+        return (await graph.aget_state(CONFIG)).values, summarizer.get_stats()
+
+    state, stats = asyncio.run(run())
+
+    assert [m.id for m in state["messages"]] == ["3", "4"]
+    assert state["summary"] == "Akane si è presentata."
+    assert state["token_count"] == count_message_tokens(MESSAGES[2:])
+    assert stats["summarized"] == 1
+
+
+def test_jobs_of_a_thread_are_coalesced(fake_summary):
+    async def run():
+        graph = await create_graph()
+        summarizer = BackgroundSummarizer(graph, max_concurrency=1)
+        summarizer.schedule(CONFIG)
+        summarizer.schedule(CONFIG)
+        await summarizer.close()
+        return summarizer.get_stats()
+
+    stats = asyncio.run(run())
+
+    assert (stats["scheduled"], stats["coalesced"]) == (1, 1)
+    assert len(fake_summary) == 1
+
+
+def test_summary_waits_for_the_turn_of_its_thread(fake_summary):
+    async def run():
+        graph = await create_graph()
+        summarizer = BackgroundSummarizer(graph, max_concurrency=1)
+        async with summarizer.thread_lock("akane"):
+            summarizer.schedule(CONFIG)
+            await asyncio.sleep(0.01)
+            # The turn still sees its whole thread.
+            messages = (await graph.aget_state(CONFIG)).values["messages"]
+        await summarizer.close()
+        return messages, (await graph.aget_state(CONFIG)).values["messages"]
+
+    during_turn, after_turn = asyncio.run(run())
+
+    assert len(during_turn) == 4
+    assert len(after_turn) == 2
+
+
+def test_only_messages_still_in_the_thread_are_removed(fake_summary):
+    async def run():
+        graph = await create_graph()
+        summarizer = BackgroundSummarizer(graph, max_concurrency=1)
+        async with summarizer.thread_lock("akane"):
+            summarizer.schedule(CONFIG)
+            await asyncio.sleep(0.01)
+            # A turn removes a message while the summary is generated.
+            await graph.aupdate_state(
+                CONFIG,
+                {
+                    "messages": [RemoveMessage(id="1")],
+                    "token_count": -count_message_tokens(MESSAGES[0]),
+                },
+                as_node="connector_node",
+            )
+        await summarizer.close()
+        return (await graph.aget_state(CONFIG)).values
+
+    state = asyncio.run(run())
+
+    assert [m.id for m in state["messages"]] == ["3", "4"]
+    assert state["token_count"] == count_message_tokens(MESSAGES[2:])
@@ -0,0 +1,480 @@
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+
+import click
+import httpx
+import orjson
+import websockets
+
+from philoagents.domain.philosopher_factory import AVAILABLE_PHILOSOPHERS
+
+PLAYER_MESSAGES = (
+    "Ciao! Chi sei?",
+    "Cosa fai qui a Babilonia?",
+    "Puoi darmi un indizio?",
+    "Non ho capito, puoi ripetere?",
+    "Grazie, ci vediamo più tardi!",
+)
+
+
+def async_command(f):
+    """Decorator to run an async click command."""
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+
+    return wrapper
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def read_rss_mb(pid: int) -> float | None:
+    """Read the resident set size of a process and its children, in MB (Linux only).
+
+    With several workers, the API is a supervisor process and one child per worker.
+    """
+
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+        children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+    except OSError:
+        return None
+
+    rss = next(
+        (
+            int(line.split()[1]) / 1024
+            for line in status.splitlines()
+            if line.startswith("VmRSS:")
+        ),
+        None,
+    )
+    if rss is None:
+        return None
+
+    return rss + sum(read_rss_mb(int(child)) or 0 for child in children)
+
+
+def percentiles(values: list[float]) -> dict[str, float | None]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+
+    values = sorted(values)
+
+    def percentile(p: float) -> float:
+        return round(values[int(p * (len(values) - 1))], 1)
+
+    return {
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "mean": round(statistics.mean(values), 1),
+        "max": round(values[-1], 1),
+    }
+
+
+async def start_server(
+    port: int, workers: int, env: dict[str, str], log_path: Path | None
+):
+    """Start the API in a separate process and wait until all its workers are ready."""
+
+    log_file = open(log_path, "a") if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, "-m", "philoagents.infrastructure.server"],
+        env={
+            **env,
+            "API_HOST": "127.0.0.1",
+            "PORT": str(port),
+            "API_WORKERS": str(workers),
+        },
+        stdout=log_file,
+        stderr=log_file,
+    )
+
+    # The runtime is started by the lifespan, before a worker serves requests.
+    ready_workers = set()
+    for _ in range(600):
+        if process.poll() is not None:
+            raise click.ClickException(
+                "The API exited during startup. Use --server-log to see why."
+            )
+        try:
+            # A new connection each time, so the requests reach all the workers.
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+                response = await client.get("/health")
+            ready_workers.add(response.json()["worker_pid"])
+            if len(ready_workers) >= workers:
+                return process
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+
+    process.terminate()
+    raise click.ClickException("The API didn't start within 60s.")
+
+
+async def sample_rss(pid: int, samples: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = read_rss_mb(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.1)
+        except TimeoutError:
+            pass
+
+
+async def chat_player(
+    client: httpx.AsyncClient,
+    player: int,
+    run_id: str,
+    turns: int,
+    think_ms: float,
+    stats: dict,
+) -> None:
+    session_id = f"load-{run_id}-chat-{player}"
+    philosopher_id = AVAILABLE_PHILOSOPHERS[player % len(AVAILABLE_PHILOSOPHERS)]
+
+    for turn in range(turns):
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                "/chat",
+                json={
+                    "message": PLAYER_MESSAGES[turn % len(PLAYER_MESSAGES)],
+                    "philosopher_id": philosopher_id,
+                    "session_id": session_id,
+                },
+            )
+            response.raise_for_status()
+        except httpx.HTTPError:
+            stats["errors"] += 1
+        else:
+            stats["turn_ms"].append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(think_ms / 1000)
+
+
+async def ws_player(
+    connection,
+    player: int,
+    run_id: str,
+    turns: int,
+    think_ms: float,
+    stats: dict,
+) -> None:
+    session_id = f"load-{run_id}-ws-{player}"
+    philosopher_id = AVAILABLE_PHILOSOPHERS[player % len(AVAILABLE_PHILOSOPHERS)]
+
+    for turn in range(turns):
+        start = time.perf_counter()
+        first_chunk_at = None
+        await connection.send(
+            orjson.dumps(
+                {
+                    "message": PLAYER_MESSAGES[turn % len(PLAYER_MESSAGES)],
+                    "philosopher_id": philosopher_id,
+                    "session_id": session_id,
+                }
+            ).decode()
+        )
+        while True:
+            frame = orjson.loads(await connection.recv())
+            if "error" in frame:
+                stats["errors"] += 1
+                break
+            if "chunk" in frame and first_chunk_at is None:
+                first_chunk_at = time.perf_counter()
+                stats["ttft_ms"].append((first_chunk_at - start) * 1000)
+            if frame.get("streaming") is False:
+                stats["turn_ms"].append((time.perf_counter() - start) * 1000)
+                break
+        await asyncio.sleep(think_ms / 1000)
+
+
+async def run_phase(
+    protocol: str,
+    base_url: str,
+    pid: int,
+    players: int,
+    turns: int,
+    think_ms: float,
+    run_id: str,
+) -> dict:
+    """Drive `players` concurrent players through one protocol."""
+
+    stats = {"ttft_ms": [], "turn_ms": [], "errors": 0}
+    rss_samples: list[float] = []
+    stop_sampling = asyncio.Event()
+    baseline_rss = read_rss_mb(pid)
+
+    if protocol == "chat":
+        async with httpx.AsyncClient(
+            base_url=base_url,
+            timeout=120,
+            limits=httpx.Limits(max_connections=players),
+        ) as client:
+            sampler = asyncio.create_task(sample_rss(pid, rss_samples, stop_sampling))
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    chat_player(client, player, run_id, turns, think_ms, stats)
+                    for player in range(players)
+                )
+            )
+            duration = time.perf_counter() - start
+    else:
+        ws_url = base_url.replace("http://", "ws://") + "/ws/chat"
+        connections = [
+            await websockets.connect(ws_url, max_size=None) for _ in range(players)
+        ]
+        try:
+            sampler = asyncio.create_task(sample_rss(pid, rss_samples, stop_sampling))
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    ws_player(connection, player, run_id, turns, think_ms, stats)
+                    for player, connection in enumerate(connections)
+                )
+            )
+            duration = time.perf_counter() - start
+        finally:
+            await asyncio.gather(*(connection.close() for connection in connections))
+
+    stop_sampling.set()
+    await sampler
+    peak_rss = max(rss_samples, default=None)
+
+    return {
+        "turns": len(stats["turn_ms"]),
+        "errors": stats["errors"],
+        "duration_s": round(duration, 2),
+        "turns_per_second": round(len(stats["turn_ms"]) / duration, 2),
+        "ttft_ms": percentiles(stats["ttft_ms"]) if protocol == "ws" else None,
+        "turn_ms": percentiles(stats["turn_ms"]),
+        "rss_mb": {
+            "baseline": round(baseline_rss, 1) if baseline_rss else None,
+            "peak": round(peak_rss, 1) if peak_rss else None,
+        },
+        "rss_per_connection_kb": round((peak_rss - baseline_rss) * 1024 / players, 1)
+        if baseline_rss and peak_rss
+        else None,
+    }
+
+
+async def run_server(
+    port: int,
+    workers: int,
+    env: dict[str, str],
+    server_log: Path | None,
+    protocols: list[str],
+    players: int,
+    turns: int,
+    think_ms: float,
+    run_id: str,
+) -> dict:
+    """Start the API with `workers` workers and drive the players through it."""
+
+    process = await start_server(port, workers, env, server_log)
+    try:
+        # Pay the one-off costs of the first turns before measuring the baseline RSS.
+        for worker in range(workers * 2):
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+                await client.post(
+                    "/chat",
+                    json={
+                        "message": PLAYER_MESSAGES[0],
+                        "philosopher_id": AVAILABLE_PHILOSOPHERS[0],
+                        "session_id": f"load-{run_id}-warmup-{worker}",
+                    },
+                    timeout=120,
+                )
+
+        results = {}
+        for phase in protocols:
+            click.echo(f"Running {players} players x {turns} turns on {phase}...")
+            results[phase] = await run_phase(
+                phase,
+                f"http://127.0.0.1:{port}",
+                process.pid,
+                players,
+                turns,
+                think_ms,
+                run_id,
+            )
+            summary = results[phase]
+            click.echo(
+                f"  {summary['turns_per_second']} turns/s, "
+                f"turn p95={summary['turn_ms']['p95']}ms, "
+                f"errors={summary['errors']}"
+            )
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+    return results
+
+
+@click.command()
+@click.option("--players", type=int, default=50, help="Concurrent simulated players.")
+@click.option("--turns", type=int, default=5, help="Turns played by each player.")
+@click.option(
+    "--think-ms",
+    type=float,
+    default=500,
+    help="Pause of a player between two turns.",
+)
+@click.option(
+    "--protocol",
+    type=click.Choice(["chat", "ws", "both"]),
+    default="both",
+    help="Endpoints to drive: /chat, /ws/chat or both (one after the other).",
+)
+@click.option(
+    "--workers",
+    type=int,
+    multiple=True,
+    default=(1,),
+    help="Worker processes of the API. Repeat it to compare how throughput scales.",
+)
+@click.option(
+    "--ttft-ms", type=float, default=200, help="Fake model time to first token."
+)
+@click.option(
+    "--tokens-per-second", type=float, default=50, help="Fake model streaming rate."
+)
+@click.option(
+    "--response-tokens", type=int, default=60, help="Tokens of every fake response."
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=Path("load_test_results.json"),
+    help="JSON file the results are written to.",
+)
+@click.option(
+    "--server-log",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="File the API output is written to (discarded by default).",
+)
+@async_command
+async def main(
+    players: int,
+    turns: int,
+    think_ms: float,
+    protocol: str,
+    workers: tuple[int, ...],
+    ttft_ms: float,
+    tokens_per_second: float,
+    response_tokens: int,
+    output: Path,
+    server_log: Path | None,
+) -> None:
+    """Load test /chat and /ws/chat without spending tokens.
+
+    The API runs in a separate process with the 'fake' LLM provider, which streams
+    canned text at the given pace, and with the in-memory checkpointer instead of
+    MongoDB. Tracing is disabled. Results are written as JSON, so runs can be compared.
+
+    With several --workers values, the test is repeated for each worker count and
+    the throughput is compared with the first one (e.g. --workers 1 --workers 4).
+
+    Args:
+        players: Concurrent simulated players.
+        turns: Turns played by each player.
+        think_ms: Pause of a player between two turns.
+        protocol: Endpoints to drive.
+        workers: Worker counts the API is run with.
+        ttft_ms: Fake model time to first token.
+        tokens_per_second: Fake model streaming rate.
+        response_tokens: Tokens of every fake response.
+        output: JSON file the results are written to.
+        server_log: File the API output is written to.
+    """
+
+    port = free_port()
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "fake",
+        "LLM_FALLBACK_PROVIDERS": "",
+        "CHECKPOINTER_BACKEND": "memory",
+        "COMET_API_KEY": "",
+        "FAKE_LLM_TTFT_MS": str(ttft_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(tokens_per_second),
+        "FAKE_LLM_RESPONSE_TOKENS": str(response_tokens),
+    }
+    run_id = uuid.uuid4().hex[:8]
+    protocols = ["chat", "ws"] if protocol == "both" else [protocol]
+
+    results = {}
+    for worker_count in workers:
+        click.echo(f"Starting the API with {worker_count} workers...")
+        results[str(worker_count)] = await run_server(
+            port,
+            worker_count,
+            env,
+            server_log,
+            protocols,
+            players,
+            turns,
+            think_ms,
+            run_id,
+        )
+
+    baseline = results[str(workers[0])]
+    scaling = {
+        phase: {
+            worker_count: round(
+                phase_results[phase]["turns_per_second"]
+                / baseline[phase]["turns_per_second"],
+                2,
+            )
+            if baseline[phase]["turns_per_second"]
+            else None
+            for worker_count, phase_results in results.items()
+        }
+        for phase in protocols
+    }
+    if len(workers) > 1:
+        for phase, speedups in scaling.items():
+            click.echo(
+                f"Throughput on {phase} relative to {workers[0]} workers: "
+                + ", ".join(f"{w} workers x{s}" for w, s in speedups.items())
+            )
+
+    report = {
+        "run": {
+            "id": run_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "players": players,
+            "turns": turns,
+            "think_ms": think_ms,
+            "workers": list(workers),
+            "fake_llm": {
+                "ttft_ms": ttft_ms,
+                "tokens_per_second": tokens_per_second,
+                "response_tokens": response_tokens,
+            },
+        },
+        "results": results,
+        "scaling": scaling,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    click.echo(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import statistics
+import timeit
+
+import click
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from philoagents.application.conversation_service.workflow.chains import (
+    get_philosopher_prompt,
+    get_prompt_cache_options,
+    warm_up_prompt_cache,
+)
+from philoagents.domain.philosopher_factory import PhilosopherFactory
+from philoagents.domain.prompts import PHILOSOPHER_CHARACTER_CARD
+
+MESSAGES = [
+    HumanMessage(content="Ciao! Chi sei?"),
+    AIMessage(content="Hmph! Sono Akane. Che vuoi?"),
+    HumanMessage(content="La risposta è la bara?"),
+]
+SUMMARY = "Il giocatore ha chiesto un indizio sull'enigma della mercante."
+
+
+@click.command()
+@click.option(
+    "--philosopher-id",
+    type=str,
+    default="akane",
+    help="ID of the philosopher whose prompt is built.",
+)
+@click.option(
+    "--turns",
+    type=int,
+    default=2000,
+    help="Number of simulated turns to measure for each mode.",
+)
+def main(philosopher_id: str, turns: int) -> None:
+    """Compare per-turn prompt construction time with and without the chain cache.
+
+    Args:
+        philosopher_id: ID of the philosopher whose prompt is built.
+        turns: Number of simulated turns to measure for each mode.
+    """
+
+    philosopher = PhilosopherFactory.get_philosopher(philosopher_id)
+    variables = {
+        "messages": MESSAGES,
+        "philosopher_name": philosopher.name,
+        "philosopher_perspective": philosopher.perspective,
+        "philosopher_style": philosopher.style,
+        "summary": SUMMARY,
+    }
+
+    def per_turn_template() -> None:
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", PHILOSOPHER_CHARACTER_CARD.prompt),
+                MessagesPlaceholder(variable_name="messages"),
+            ],
+            template_format="jinja2",
+        )
+        prompt.invoke(variables)
+
+    def cached_template() -> None:
+        prompt = get_philosopher_prompt(
+            philosopher.name,
+            philosopher.perspective,
+            philosopher.style,
+            with_hint=False,
+            **get_prompt_cache_options(),
+        )
+        prompt.invoke(variables)
+
+    warm_up_prompt_cache()
+
+    results = {}
+    for label, func in (
+        ("per-turn jinja2", per_turn_template),
+        ("cached chain", cached_template),
+    ):
+        timings_us = [t * 1e6 for t in timeit.repeat(func, number=1, repeat=turns)]
+        results[label] = statistics.mean(timings_us)
+        print(
+            f"{label:<16} mean={results[label]:8.1f}us "
+            f"p50={statistics.median(timings_us):8.1f}us"
+        )
+
+    print(
+        f"speedup: {results['per-turn jinja2'] / results['cached chain']:.1f}x per turn"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import click
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+DEFAULT_BUDGET_PATH = Path(__file__).parent / "startup_budget.json"
+
+
+def measure_import(module: str) -> dict[str, tuple[int, int]]:
+    """Import `module` in a fresh interpreter with `-X importtime`.
+
+    Returns:
+        dict: Top-level (self, cumulative) import times in microseconds by module.
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us))
+
+    return timings
+
+
+@click.command()
+@click.option(
+    "--budget",
+    "budget_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=DEFAULT_BUDGET_PATH,
+    help="JSON file with the tracked startup budget.",
+)
+@click.option(
+    "--runs",
+    type=int,
+    default=3,
+    help="Number of fresh interpreters to measure. The median is reported.",
+)
+@click.option(
+    "--top",
+    type=int,
+    default=15,
+    help="Number of slowest modules to show.",
+)
+def main(budget_path: Path, runs: int, top: int) -> None:
+    """Measure the API import time and check it against the tracked budget.
+
+    Exits with status 1 if the median import time is over budget or if a module that
+    must be imported lazily (e.g., Opik or an unused LLM provider) is imported.
+
+    Args:
+        budget_path: JSON file with the tracked startup budget.
+        runs: Number of fresh interpreters to measure.
+        top: Number of slowest modules to show.
+    """
+
+    budget = json.loads(budget_path.read_text())
+    module = budget["module"]
+
+    measurements = [measure_import(module) for _ in range(runs)]
+    import_ms = statistics.median(m[module][1] / 1000 for m in measurements)
+    timings = measurements[-1]
+
+    print(f"Slowest modules imported by {module}:")
+    slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, cumulative_us) in slowest[:top]:
+        print(
+            f"  {self_us / 1000:8.1f}ms self {cumulative_us / 1000:8.1f}ms total  {name}"
+        )
+
+    failures = []
+    if import_ms > budget["import_ms"]:
+        failures.append(
+            f"import took {import_ms:.0f}ms, over the {budget['import_ms']}ms budget"
+        )
+    for name in budget.get("forbidden_modules", []):
+        if name in timings:
+            failures.append(f"'{name}' is imported at startup")
+
+    print(f"\n{module}: {import_ms:.0f}ms (budget {budget['import_ms']}ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
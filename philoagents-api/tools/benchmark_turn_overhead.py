@@ -0,0 +1,97 @@
+import asyncio
+import statistics
+import time
+from functools import wraps
+
+import click
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from opik.integrations.langchain import OpikTracer
+
+from philoagents.application.conversation_service.runtime import ConversationRuntime
+from philoagents.application.conversation_service.workflow.graph import (
+    create_workflow_graph,
+)
+from philoagents.config import settings
+
+
+def async_command(f):
+    """Decorator to run an async click command."""
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        return asyncio.run(f(*args, **kwargs))
+
+    return wrapper
+
+
+async def per_turn_setup() -> None:
+    """Setup paid by every turn before the shared runtime existed."""
+
+    async with AsyncMongoDBSaver.from_conn_string(
+        conn_string=settings.MONGO_URI,
+        db_name=settings.MONGO_DB_NAME,
+        checkpoint_collection_name=settings.MONGO_STATE_CHECKPOINT_COLLECTION,
+        writes_collection_name=settings.MONGO_STATE_WRITES_COLLECTION,
+    ) as checkpointer:
+        graph = create_workflow_graph().compile(checkpointer=checkpointer)
+        OpikTracer(graph=graph.get_graph(xray=True))
+        await checkpointer.aget_tuple({"configurable": {"thread_id": "benchmark"}})
+
+
+async def shared_runtime_setup(runtime: ConversationRuntime) -> None:
+    """Setup paid by every turn with the shared runtime."""
+
+    runtime.get_callbacks()
+    await runtime.checkpointer.aget_tuple({"configurable": {"thread_id": "benchmark"}})
+
+
+def report(label: str, timings: list[float]) -> None:
+    timings_ms = sorted(t * 1000 for t in timings)
+    p95 = timings_ms[int(0.95 * (len(timings_ms) - 1))]
+    print(
+        f"{label:<16} mean={statistics.mean(timings_ms):8.2f}ms "
+        f"p50={statistics.median(timings_ms):8.2f}ms p95={p95:8.2f}ms"
+    )
+
+
+@click.command()
+@click.option(
+    "--turns",
+    type=int,
+    default=50,
+    help="Number of simulated turns to measure for each mode.",
+)
+@async_command
+async def main(turns: int) -> None:
+    """Compare per-turn setup overhead with and without the shared conversation runtime.
+
+    Both modes read the latest checkpoint of a thread, so the numbers include one
+    Mongo round trip. Requires the MongoDB instance configured in `MONGO_URI`.
+
+    Args:
+        turns: Number of simulated turns to measure for each mode.
+    """
+
+    before = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        await per_turn_setup()
+        before.append(time.perf_counter() - start)
+
+    runtime = await ConversationRuntime.create()
+    after = []
+    try:
+        for _ in range(turns):
+            start = time.perf_counter()
+            await shared_runtime_setup(runtime)
+            after.append(time.perf_counter() - start)
+    finally:
+        await runtime.close()
+
+    report("per-turn setup", before)
+    report("shared runtime", after)
+    print(f"speedup: {statistics.mean(before) / statistics.mean(after):.1f}x per turn")
+
+
+if __name__ == "__main__":
+    main()
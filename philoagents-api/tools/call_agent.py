@@ -6,7 +6,11 @@ import click
 from philoagents.application.conversation_service.generate_response import (
     get_streaming_response,
 )
+from philoagents.application.conversation_service.runtime import (
+    close_conversation_runtime,
+)
 from philoagents.domain.philosopher_factory import PhilosopherFactory
+from philoagents.infrastructure.opik_utils import configure
 
 
 def async_command(f):
@@ -32,15 +36,24 @@ def async_command(f):
     required=True,
     help="Query to call the agent with.",
 )
+@click.option(
+    "--session-id",
+    type=str,
+    default=None,
+    help="Player session to continue. Defaults to the shared philosopher thread.",
+)
 @async_command
-async def main(philosopher_id: str, query: str) -> None:
+async def main(philosopher_id: str, query: str, session_id: str | None) -> None:
     """CLI command to query a philosopher.
 
     Args:
         philosopher_id: ID of the philosopher to call.
         query: Query to call the agent with.
+        session_id: Player session to continue.
     """
 
+    configure()
+
     philosopher_factory = PhilosopherFactory()
     philosopher = philosopher_factory.get_philosopher(philosopher_id)
 
@@ -55,8 +68,10 @@ async def main(philosopher_id: str, query: str) -> None:
         philosopher_name=philosopher.name,
         philosopher_perspective=philosopher.perspective,
         philosopher_style=philosopher.style,
+        session_id=session_id,
     ):
         print(f"\033[32m{chunk}\033[0m", end="", flush=True)
+    await close_conversation_runtime()
     print("\033[32m--------------------------------\033[0m")
 
 
@@ -1,3 +1,5 @@
+import SessionService from './SessionService';
+
 class ApiService {
   constructor() {
     // Check for build-time API_URL (Railway deployment)
@@ -41,7 +43,8 @@ class ApiService {
     try {
       const data = await this.request('/chat', 'POST', {
         message,
-        philosopher_id: philosopher.id
+        philosopher_id: philosopher.id,
+        session_id: SessionService.getSessionId()
       });
       
       return data.response;
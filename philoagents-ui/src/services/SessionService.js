@@ -0,0 +1,42 @@
+const SESSION_STORAGE_KEY = 'philoagents_session_id';
+
+class SessionService {
+  constructor() {
+    this.sessionId = null;
+  }
+
+  getSessionId() {
+    if (this.sessionId) {
+      return this.sessionId;
+    }
+
+    // Keep the same session across reloads, so conversations are remembered
+    try {
+      this.sessionId = window.localStorage.getItem(SESSION_STORAGE_KEY);
+    } catch (error) {
+      console.warn('Session storage unavailable:', error);
+    }
+
+    if (!this.sessionId) {
+      this.sessionId = this.generateSessionId();
+      try {
+        window.localStorage.setItem(SESSION_STORAGE_KEY, this.sessionId);
+      } catch (error) {
+        console.warn('Could not persist the session id:', error);
+      }
+    }
+
+    return this.sessionId;
+  }
+
+  generateSessionId() {
+    // Letters, digits and '-' only, as required by the API
+    if (window.crypto && window.crypto.randomUUID) {
+      return window.crypto.randomUUID();
+    }
+
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+  }
+}
+
+export default new SessionService();
@@ -1,3 +1,5 @@
+import SessionService from './SessionService';
+
 class WebSocketApiService {
   constructor() {
     // Initialize connection-related properties
@@ -87,6 +89,10 @@ class WebSocketApiService {
       return;
     }
 
+    if (data.queued) {
+      this.triggerCallback('queued', data);
+    }
+
     if (data.streaming !== undefined) {
       this.handleStreamingUpdate(data.streaming);
     }
@@ -128,7 +134,8 @@ class WebSocketApiService {
 
       this.socket.send(JSON.stringify({
         message: message,
-        philosopher_id: philosopher.id
+        philosopher_id: philosopher.id,
+        session_id: SessionService.getSessionId()
       }));
     } catch (error) {
       console.error('Error sending message via WebSocket:', error);
@@ -158,6 +165,10 @@ class WebSocketApiService {
     if (callbacks.onGameEvent) {
       this.messageCallbacks.set('gameEvent', callbacks.onGameEvent);
     }
+
+    if (callbacks.onQueued) {
+      this.messageCallbacks.set('queued', callbacks.onQueued);
+    }
   }
 
   getFallbackResponse(philosopher) {